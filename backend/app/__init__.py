@@ -1,3 +1,14 @@
-from .main import *
-from .orchestrator import *
-from .utils.config import settings
\ No newline at end of file
+# Subsystems are imported on first use; main.py runs one role per process
+_EXPORTS = {
+    "main": ".main",
+    "run": ".main",
+    "Orchestrator": ".orchestrator",
+    "settings": ".utils.config",
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
@@ -0,0 +1,65 @@
+"""Benchmark: per-holder getBalance vs packed getMultipleAccounts.
+
+Run from backend/app:  python -m bench.balances --counts 100 1000 10000
+"""
+import argparse
+import asyncio
+import time
+import aiohttp
+from bench.mock_rpc import MockRPC
+from parcing.balances import BalanceResolver
+from utils.http_client import HttpClient
+from utils.ratelimit import RateLimiter
+from utils.rpc import SolanaRPC
+
+
+def make_holders(count):
+    return [f"Holder{i:038d}" for i in range(count)]
+
+
+async def legacy_balances(rpc_url, holders):
+    """The old path: one getBalance (and one session) per holder, no sleeps"""
+    balances = {}
+    for holder in holders:
+        payload = {"jsonrpc": "2.0", "id": "bench", "method": "getBalance", "params": [holder]}
+        async with aiohttp.ClientSession() as session:
+            async with session.post(rpc_url, json=payload) as response:
+                data = await response.json()
+                balances[holder] = data["result"]["value"]
+    return balances
+
+
+async def run(counts, latency, legacy_limit):
+    rpc = await MockRPC(latency=latency).start()
+    try:
+        print(f"{'holders':>8} {'mode':>8} {'rpc calls':>10} {'wall (s)':>10}")
+        for count in counts:
+            holders = make_holders(count)
+
+            if count <= legacy_limit:
+                rpc.requests = 0
+                started = time.perf_counter()
+                await legacy_balances(rpc.url, holders)
+                print(f"{count:>8} {'legacy':>8} {rpc.requests:>10} {time.perf_counter() - started:>10.3f}")
+
+            rpc.requests = 0
+            async with HttpClient() as http:
+                # The limiter is opened wide so the benchmark measures batching alone
+                client = SolanaRPC(rpc.url, http, RateLimiter(rate=10000))
+                resolver = BalanceResolver(client)
+                started = time.perf_counter()
+                await resolver.resolve(holders)
+                elapsed = time.perf_counter() - started
+            print(f"{count:>8} {'batched':>8} {rpc.requests:>10} {elapsed:>10.3f}")
+    finally:
+        await rpc.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated RPC latency in seconds")
+    parser.add_argument("--legacy-limit", type=int, default=1000,
+                        help="skip the serial baseline above this many holders")
+    args = parser.parse_args()
+    asyncio.run(run(args.counts, args.latency, args.legacy_limit))
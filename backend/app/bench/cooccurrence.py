@@ -0,0 +1,85 @@
+"""Benchmark: holder sets as base58 string sets vs the co-occurrence index.
+
+Feeds `--tokens` scans of `--holders` holders each into an in-memory
+CoOccurrenceIndex. Holders are drawn from a pool of `--pool` wallets with a
+heavy tail, so some wallets show up in many tokens. Reports the memory of
+one token's holders as a Python set of strings and as index postings, the
+update time per scan and the intersection and top-K query times.
+
+Run from backend/app:  python -m bench.cooccurrence --holders 10000 --tokens 200
+"""
+import argparse
+import os
+import random
+import time
+import tracemalloc
+from storage.cooccurrence import CoOccurrenceIndex, encode_pubkey
+
+
+def make_pool(size, rng):
+    return [encode_pubkey(os.urandom(32)) for _ in range(size)]
+
+
+def sample_holders(pool, count, rng):
+    # Power-law reuse: low pool indexes are drawn far more often
+    picked = set()
+    while len(picked) < count:
+        picked.add(pool[min(int(rng.paretovariate(0.6)) - 1, len(pool) - 1)]
+                   if rng.random() < 0.3 else pool[rng.randrange(len(pool))])
+    return list(picked)
+
+
+def traced(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return value, size
+
+
+def main(holders, tokens, pool_size, k):
+    rng = random.Random(5)
+    pool = make_pool(pool_size, rng)
+    scans = [(f"Mint{i:040d}", sample_holders(pool, holders, rng)) for i in range(tokens)]
+
+    # The strings are decoded from the wire, so each set owns its own copies
+    wire = [address.encode() for address in scans[0][1]]
+    _, set_bytes = traced(lambda: {address.decode() for address in wire})
+
+    index = CoOccurrenceIndex(path="")
+    started = time.perf_counter()
+    for mint, holder_list in scans:
+        index.update(mint, holder_list, holder_list[:50])
+    update_ms = (time.perf_counter() - started) * 1000 / tokens
+
+    first = index.mints[scans[0][0]]
+    # Until a mint is scanned again its early and seen postings are one array
+    postings = first.seen.nbytes + (first.early.nbytes if first.early is not first.seen else 0)
+    # The wallet dictionary is shared by every token, charged here per distinct wallet
+    per_wallet = (index._keys[:index.wallets].nbytes + index._sorted_keys.nbytes
+                  + index._sorted_ids.nbytes) / index.wallets
+
+    started = time.perf_counter()
+    common = index.intersect([mint for mint, _ in scans[:10]])
+    intersect_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    top = index.top_wallets(k, min_tokens=2)
+    top_ms = (time.perf_counter() - started) * 1000
+
+    print(f"one {holders}-holder token: string set {set_bytes / 1024:.0f} KB, "
+          f"postings {postings / 1024:.0f} KB (+{per_wallet:.0f} B per distinct wallet, shared)")
+    print(f"{tokens} tokens, {index.wallets} distinct wallets: update {update_ms:.1f} ms/scan, "
+          f"10-way intersection {intersect_ms:.2f} ms ({len(common)} wallets), top-{k} {top_ms:.2f} ms")
+    if top:
+        print(f"most frequent wallet: {top[0][0]} in {top[0][1]} tokens")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--holders", type=int, default=10000)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--pool", type=int, default=200000, help="distinct wallets holders are drawn from")
+    parser.add_argument("-k", type=int, default=20)
+    args = parser.parse_args()
+    main(args.holders, args.tokens, args.pool, args.k)
@@ -0,0 +1,255 @@
+"""End-to-end benchmarks of the pipeline stages against local stand-in servers.
+
+Scenarios, each against MockDexScreener, MockRPC or MockAccountWS:
+  collect    DataCollector.collect_data polling the feeds, with conditional fetches
+  process    TokenManager.process_latest_raw_data over `--tokens` raw tokens per cycle
+  analyze    WhaleTracker.analyze_token over `--holders` holders
+  fanin      WhaleSubscription delivering notifications of `--whales` whales to a consumer
+
+`--latency` and `--throttle` (share of requests answered with HTTP 429)
+apply to every stand-in. `--json` writes the results for comparing runs,
+`--compare` prints the change against an earlier results file.
+
+Run from backend/app:  python -m bench.e2e --tokens 2000 --holders 5000 --json results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime, timedelta
+from bench.mock_dex import MockDexScreener
+from bench.mock_rpc import MockRPC
+from bench.mock_ws import MockAccountWS
+from utils.config import settings
+from utils.http_client import HttpClient
+
+SCENARIOS = ("collect", "process", "analyze", "fanin")
+FEEDS = ["token-boosts/latest/v1", "token-profiles/latest/v1"]
+
+
+async def wait_for(predicate, timeout=120):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("condition not reached")
+        await asyncio.sleep(0.01)
+
+
+async def bench_collect(args, tmp):
+    from parcing.collector import DataCollector
+    settings.RAW_DATA_FILEPATH = os.path.join(tmp, "collect", "raw")
+    os.makedirs(settings.RAW_DATA_FILEPATH)
+    dex = await MockDexScreener(latency=args.latency, token_count=args.tokens, throttle_rate=args.throttle).start()
+    try:
+        async with HttpClient() as http:
+            # One poll per second: snapshot files are named by the second
+            collector = DataCollector(FEEDS, http=http, intervals={feed: 1.0 for feed in FEEDS}, jitter=0,
+                                      min_interval=1.0, refresh_interval=10 ** 6)
+            collector.base_url = dex.url
+            started = time.perf_counter()
+            task = asyncio.create_task(collector.collect_data())
+            for cycle in range(args.cycles):
+                await asyncio.sleep(1.0)
+                # Every other cycle the feeds change, in between they answer 304
+                if cycle % 2:
+                    dex.advance(args.churn)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            elapsed = time.perf_counter() - started
+        files = os.listdir(settings.RAW_DATA_FILEPATH)
+        stats = collector.feed_stats()
+        return {
+            "seconds": elapsed,
+            "fetches": sum(feed["fetches"] for feed in stats.values()),
+            "changed": sum(feed["changed"] for feed in stats.values()),
+            "not_modified": dex.not_modified,
+            "throttled": dex.throttled,
+            "snapshots": len(files),
+            "snapshot_bytes": sum(os.path.getsize(os.path.join(settings.RAW_DATA_FILEPATH, f)) for f in files),
+        }
+    finally:
+        await dex.stop()
+
+
+async def bench_process(args, tmp):
+    from parcing.processor import TokenManager
+    from storage.history import PriceHistoryStore
+    from utils.snapshots import write_snapshot
+    for name in ("raw", "clean", "pumped"):
+        os.makedirs(os.path.join(tmp, "process", name))
+    settings.RAW_DATA_FILEPATH = os.path.join(tmp, "process", "raw")
+    settings.CLEAN_DATA_FILEPATH = os.path.join(tmp, "process", "clean")
+    settings.PUMPED_DATA_FILEPATH = os.path.join(tmp, "process", "pumped")
+    dex = await MockDexScreener(latency=args.latency, token_count=args.tokens, throttle_rate=args.throttle).start()
+    try:
+        async with HttpClient() as http:
+            processor = TokenManager(base_url=f"{dex.url}latest/dex/tokens", http=http,
+                                     history=PriceHistoryStore(path=os.path.join(tmp, "process", "history")))
+            collected_at = datetime(2026, 1, 1)
+            cycle_seconds = []
+            for cycle in range(args.cycles):
+                if cycle:
+                    dex.advance(args.churn)
+                feed = [{"chainId": "solana", "tokenAddress": address, "amount": 10, "totalAmount": 100}
+                        for address in dex.prices]
+                timestamp = (collected_at + timedelta(minutes=cycle)).strftime("%Y%m%d_%H%M%S")
+                write_snapshot(os.path.join(settings.RAW_DATA_FILEPATH, f"data_{timestamp}.jsonl"), feed)
+                started = time.perf_counter()
+                pumped = await processor.process_latest_raw_data()
+                cycle_seconds.append(time.perf_counter() - started)
+        return {
+            "seconds_per_cycle": sum(cycle_seconds) / len(cycle_seconds),
+            "first_cycle_seconds": cycle_seconds[0],
+            "tokens_per_second": args.tokens * len(cycle_seconds) / sum(cycle_seconds),
+            "enrichment_requests": dex.requests["tokens"],
+            "throttled": dex.throttled,
+            "changed_last_cycle": len(processor.last_changes.changed),
+            "pumped_last_cycle": len(pumped or []),
+        }
+    finally:
+        await dex.stop()
+
+
+async def bench_analyze(args, tmp):
+    from parcing.cache import BalanceCache
+    from parcing.holders import HolderIndex
+    from parcing.registry import WhaleRegistry
+    from parcing.valuation import SOL_MINT, PriceTable
+    from parcing.whales import WhaleTracker
+    from storage.cooccurrence import CoOccurrenceIndex
+    from utils.ratelimit import RateLimiter
+    rpc = await MockRPC(latency=args.latency, holder_count=args.holders, zipf=True,
+                        throttle_rate=args.throttle, retry_after=0).start()
+    settings.HELIUS_URL, settings.HELIUS_API_KEY = rpc.url, ""
+    settings.WHALE_DATA_PATH = os.path.join(tmp, "analyze", "whales")
+    try:
+        async with HttpClient() as http:
+            price_table = PriceTable(http, refresh_interval=3600)
+            price_table.prices[SOL_MINT] = settings.SOL_PRICE_FALLBACK
+            price_table.updated_at = time.monotonic()
+            tracker = WhaleTracker(
+                http=http,
+                limiter=RateLimiter(rate=args.rps),
+                balance_cache=BalanceCache(path=""),
+                holder_index=HolderIndex(path=os.path.join(tmp, "analyze", "holders")),
+                price_table=price_table,
+                registry=WhaleRegistry(path="", legacy_dir=""),
+                cooccurrence=CoOccurrenceIndex(path=""),
+            )
+            tracker.min_balance_usd = args.min_balance
+            tracker.max_holders = args.holders
+            started = time.perf_counter()
+            whales = await tracker.analyze_token("MockMint")
+            elapsed = time.perf_counter() - started
+        return {
+            "seconds": elapsed,
+            "holders": args.holders,
+            "rpc_requests": rpc.requests,
+            "throttled": rpc.throttled,
+            "whales": len(whales or []),
+        }
+    finally:
+        await rpc.stop()
+
+
+async def bench_fanin(args, tmp):
+    from parcing.registry import WhaleRegistry
+    from parcing.subscription import WhaleSubscription
+    server = await MockAccountWS().start()
+    settings.HELIUS_WS_URL = server.url
+    settings.WS_SUBSCRIBE_RPS = 100000
+    whales = [f"Whale{i:039d}" for i in range(args.whales)]
+    registry = WhaleRegistry(path="", legacy_dir="")
+    registry.record(whales)
+    subscription = WhaleSubscription(registry)
+    try:
+        async with subscription.subscribe_to_transactions(maxsize=args.notifications) as events:
+            started = time.perf_counter()
+            await wait_for(lambda: server.subscribed() == len(whales)
+                           and subscription.manager.subscribed_count() == len(whales))
+            subscribed = time.perf_counter() - started
+
+            received = 0
+
+            async def consume():
+                nonlocal received
+                async for _ in events:
+                    received += 1
+                    if received == args.notifications:
+                        return
+
+            consumer = asyncio.create_task(consume())
+            started = time.perf_counter()
+            for n in range(args.notifications):
+                await server.notify(whales[n % len(whales)], lamports=10**9 + n, slot=n + 1)
+            await asyncio.wait_for(consumer, 120)
+            elapsed = time.perf_counter() - started
+        return {
+            "whales": len(whales),
+            "subscribe_seconds": subscribed,
+            "notifications": args.notifications,
+            "delivered": received,
+            "events_per_second": received / elapsed,
+        }
+    finally:
+        if subscription._run_task is not None:
+            subscription._run_task.cancel()
+            await asyncio.gather(subscription._run_task, return_exceptions=True)
+        await server.stop()
+
+
+RUNNERS = {"collect": bench_collect, "process": bench_process, "analyze": bench_analyze, "fanin": bench_fanin}
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"\nagainst {baseline_path}:")
+    for scenario, values in results.items():
+        for name, value in values.items():
+            old = (baseline.get(scenario) or {}).get(name)
+            if isinstance(old, (int, float)) and old:
+                print(f"  {scenario}.{name}: {old:g} -> {value:g} ({(value - old) / old:+.1%})")
+
+
+async def run(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scenario in args.scenarios:
+            results[scenario] = await RUNNERS[scenario](args, tmp)
+            print(f"{scenario}: " + ", ".join(f"{name} {value:.3g}" if isinstance(value, float) else f"{name} {value}"
+                                              for name, value in results[scenario].items()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--latency", type=float, default=0.01, help="simulated server latency in seconds")
+    parser.add_argument("--throttle", type=float, default=0.0, help="share of requests answered with HTTP 429")
+    parser.add_argument("--tokens", type=int, default=2000, help="tokens per feed snapshot")
+    parser.add_argument("--churn", type=float, default=0.05, help="share of tokens replaced or repriced per cycle")
+    parser.add_argument("--cycles", type=int, default=4)
+    parser.add_argument("--holders", type=int, default=5000)
+    parser.add_argument("--min-balance", type=float, default=5000, help="whale threshold in USD")
+    parser.add_argument("--rps", type=float, default=1000, help="RPC rate limit for the analysis")
+    parser.add_argument("--whales", type=int, default=2000)
+    parser.add_argument("--notifications", type=int, default=10000)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                       "args": vars(args), "results": results}, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
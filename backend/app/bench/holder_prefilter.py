@@ -0,0 +1,76 @@
+"""Benchmark: wallet valuation with and without the holder position pre-filter.
+
+Scans a mock mint with `--holders` heavy-tailed holders and values the
+holders of each position threshold against the mock RPC, reporting how many
+wallets were valued, the RPC requests of the valuation and the whales found.
+
+Run from backend/app:  python -m bench.holder_prefilter --holders 10000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from bench.mock_rpc import MockRPC
+from parcing.cache import BalanceCache
+from parcing.holders import HolderIndex
+from parcing.registry import WhaleRegistry
+from parcing.valuation import SOL_MINT, PriceTable
+from parcing.whales import WhaleTracker
+from utils.config import settings
+from utils.http_client import HttpClient
+from utils.ratelimit import RateLimiter
+
+
+async def analyze(rpc, tmp, min_position_share, max_holders):
+    settings.HELIUS_URL, settings.HELIUS_API_KEY = rpc.url, ""
+    async with HttpClient() as http:
+        price_table = PriceTable(http, refresh_interval=3600)
+        price_table.prices[SOL_MINT] = settings.SOL_PRICE_FALLBACK
+        price_table.updated_at = time.monotonic()
+        tracker = WhaleTracker(
+            http=http,
+            limiter=RateLimiter(rate=10000),
+            balance_cache=BalanceCache(path=""),
+            holder_index=HolderIndex(path=tmp),
+            price_table=price_table,
+            registry=WhaleRegistry(path="", legacy_dir=""),
+        )
+        tracker.min_position_share = min_position_share
+        tracker.max_holders = max_holders
+
+        started = time.perf_counter()
+        scan = await tracker.scan_holders("MockMint")
+        scanned = time.perf_counter()
+        rpc.requests = 0
+        wealthy = await tracker.process_holders_in_batches(scan.new, "")
+        valued = time.perf_counter()
+        return (len(scan.new), rpc.requests, len(wealthy), (scanned - started) * 1000, valued - scanned,
+                tracker.concentration["MockMint"])
+
+
+async def run(holders, latency, thresholds):
+    rpc = await MockRPC(latency=latency, holder_count=holders, zipf=True).start()
+    try:
+        print(f"{'min share':>10} {'valued':>7} {'rpc calls':>10} {'whales':>7} {'scan (ms)':>10} {'value (s)':>10}")
+        for threshold in thresholds:
+            with tempfile.TemporaryDirectory() as tmp:
+                valued, calls, whales, scan_ms, value_s, metrics = await analyze(
+                    rpc, os.path.join(tmp, "holders"), threshold, holders)
+            print(f"{threshold:>10g} {valued:>7} {calls:>10} {whales:>7} {scan_ms:>10.1f} {value_s:>10.3f}")
+        print(f"concentration: top10 {metrics['top10_share']:.1%}, gini {metrics['gini']:.2f}, "
+              f"{metrics['wallets_above']} wallets above {metrics['wallet_share']:.0%}")
+    finally:
+        await rpc.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--holders", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated RPC latency in seconds")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0, settings.HOLDER_MIN_POSITION_SHARE],
+                        help="position share thresholds to compare, 0 values every holder")
+    parser.add_argument("--min-balance", type=float, default=5000, help="whale threshold in USD")
+    args = parser.parse_args()
+    settings.MIN_WHALE_BALANCE_USD = args.min_balance
+    asyncio.run(run(args.holders, args.latency, args.thresholds))
@@ -0,0 +1,71 @@
+"""Benchmark: a fresh aiohttp session per request vs the shared pooled HttpClient.
+
+Run from backend/app:  python -m bench.http_pool --requests 2000
+"""
+import argparse
+import asyncio
+import time
+import aiohttp
+from aiohttp import web
+from utils.http_client import HttpClient
+
+
+async def start_server():
+    async def handle(request):
+        return web.json_response({"schemaVersion": "1.0.0", "pairs": []})
+
+    app = web.Application()
+    app.router.add_get("/latest/dex/tokens/{address}", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/latest/dex/tokens"
+
+
+async def session_per_request(url):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            await response.json()
+
+
+async def pooled(http, url):
+    async with http.session.get(url) as response:
+        await response.json()
+
+
+async def measure(label, requests, concurrency, call):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(i):
+        async with semaphore:
+            await call(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(bounded(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:>22} {concurrency:>12} {requests / elapsed:>12.1f}")
+
+
+async def run(requests, concurrency_levels):
+    runner, base_url = await start_server()
+    http = HttpClient()
+    try:
+        print(f"{'mode':>22} {'concurrency':>12} {'req/s':>12}")
+        for concurrency in concurrency_levels:
+            await measure("session per request", requests, concurrency,
+                          lambda i: session_per_request(f"{base_url}/token{i}"))
+            await measure("pooled HttpClient", requests, concurrency,
+                          lambda i: pooled(http, f"{base_url}/token{i}"))
+    finally:
+        await http.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 20])
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency))
@@ -0,0 +1,138 @@
+"""Benchmark: event-loop time spent logging during a whale analysis.
+
+Values N holders against the mock RPC twice: once with every hot-loop line
+written by a handler on the event loop thread (the old behavior), once with
+aggregated events behind the queue handler. The mock server runs in its own
+thread, so the main thread's CPU time is the analysis plus its logging.
+
+Run from backend/app:  python -m bench.logging_overhead --holders 10000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+from bench.mock_rpc import MockRPC
+from parcing.cache import BalanceCache
+from parcing.holders import HolderIndex
+from parcing.registry import WhaleRegistry
+from parcing.valuation import SOL_MINT, PriceTable
+from parcing.whales import WhaleTracker
+from utils.config import settings
+from utils.http_client import HttpClient
+from utils.ratelimit import RateLimiter
+from utils.slogger import SmartLogger, flush_loggers, setup_queue_logging, stop_queue_logging
+
+
+class _Counting(logging.Handler):
+    """Counts records reaching the real handler"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = 0
+
+    def emit(self, record):
+        self.records += 1
+
+
+def start_mock_rpc(latency):
+    """Runs MockRPC on a loop in a background thread, returns (rpc, stop)"""
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    holder = {}
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        holder["rpc"] = loop.run_until_complete(MockRPC(latency=latency).start())
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, name="mock-rpc", daemon=True)
+    thread.start()
+    started.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(holder["rpc"].stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return holder["rpc"], stop
+
+
+async def analyze(rpc_url, holders, tmp, aggregate):
+    settings.HELIUS_URL, settings.HELIUS_API_KEY = rpc_url, ""
+    async with HttpClient() as http:
+        price_table = PriceTable(http, refresh_interval=3600)
+        price_table.prices[SOL_MINT] = settings.SOL_PRICE_FALLBACK
+        price_table.updated_at = time.monotonic()
+        tracker = WhaleTracker(
+            http=http,
+            limiter=RateLimiter(rate=10000),
+            balance_cache=BalanceCache(path=""),
+            holder_index=HolderIndex(path=os.path.join(tmp, "holders")),
+            price_table=price_table,
+            registry=WhaleRegistry(path=os.path.join(tmp, "registry.jsonl"), legacy_dir=""),
+        )
+        tracker.logger = SmartLogger("WhaleTracker", aggregate=aggregate)
+
+        loop_cpu = time.thread_time()
+        wall = time.perf_counter()
+        await tracker.process_holders_in_batches(holders, "", batch_size=25)
+        tracker.logger.flush_all()
+        return time.thread_time() - loop_cpu, time.perf_counter() - wall
+
+
+def run_mode(mode, rpc_url, holders, log_path):
+    """One analysis with a fresh file handler; returns loop CPU, wall and record counts"""
+    root = logging.getLogger()
+    saved = root.handlers[:]
+    for handler in saved:
+        root.removeHandler(handler)
+    counting = _Counting()
+    file_handler = logging.FileHandler(log_path, mode="w")
+    file_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    root.addHandler(file_handler)
+    root.addHandler(counting)
+    if mode == "queue":
+        setup_queue_logging()
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            loop_cpu, wall = asyncio.run(analyze(rpc_url, holders, tmp, aggregate=mode == "queue"))
+    finally:
+        if mode == "queue":
+            flush_loggers()
+            stop_queue_logging()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        file_handler.close()
+        for handler in saved:
+            root.addHandler(handler)
+    return loop_cpu, wall, counting.records
+
+
+def main(holders_count, latency, rounds):
+    holders = [f"Holder{i:038d}" for i in range(holders_count)]
+    rpc, stop = start_mock_rpc(latency)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            print(f"{'mode':>7} {'loop cpu (ms)':>14} {'wall (s)':>9} {'records':>8}")
+            for mode in ("direct", "queue"):
+                results = [run_mode(mode, rpc.url, holders, os.path.join(tmp, f"{mode}.log")) for _ in range(rounds)]
+                loop_cpu, wall, records = min(results)
+                print(f"{mode:>7} {loop_cpu * 1000:>14.1f} {wall:>9.3f} {records:>8}")
+    finally:
+        stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--holders", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every mock RPC response")
+    parser.add_argument("--rounds", type=int, default=3, help="best of N runs per mode")
+    parser.add_argument("--min-balance", type=float, default=5000, help="whale threshold in USD")
+    args = parser.parse_args()
+    settings.MIN_WHALE_BALANCE_USD = args.min_balance
+    main(args.holders, args.latency, args.rounds)
@@ -0,0 +1,107 @@
+import asyncio
+import random
+from aiohttp import web
+
+
+class MockDexScreener:
+    """Local stand-in for the DexScreener API.
+
+    Serves the feed endpoints (`token-boosts/latest/v1` and any other
+    `token-*` path) as lists of `token_count` Solana tokens, answering
+    If-None-Match with 304 while the feed is unchanged, and
+    `latest/dex/tokens/{addresses}` with one pair per address. `advance`
+    replaces or reprices a share of the tokens, like a new polling cycle.
+    A share `throttle_rate` of the requests is answered with HTTP 429.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, token_count=1000, throttle_rate=0.0, seed=11):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.requests = {"feed": 0, "tokens": 0}
+        self.throttled = 0
+        self.not_modified = 0
+        self.version = 1
+        self._rng = random.Random(seed)
+        self._next_id = token_count
+        self.prices = {self.address(i): 1.0 for i in range(token_count)}
+        self._runner = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    @staticmethod
+    def address(i):
+        return f"Mock{i:040d}pump"
+
+    def advance(self, churn=0.05, move=0.1):
+        """A new cycle: `churn` of the tokens leave for new ones, as many move in price by `move`"""
+        count = int(len(self.prices) * churn)
+        for address in self._rng.sample(sorted(self.prices), count):
+            del self.prices[address]
+            self.prices[self.address(self._next_id)] = 1.0
+            self._next_id += 1
+        for address in self._rng.sample(sorted(self.prices), count):
+            self.prices[address] *= 1 + move
+        self.version += 1
+
+    def pair(self, address):
+        price = self.prices[address]
+        return {
+            "chainId": "solana",
+            "pairAddress": f"Pair{address}",
+            "baseToken": {"address": address, "name": f"Token {address[-12:-4]}", "symbol": address[-8:-4]},
+            "priceUsd": f"{price:.8f}",
+            "priceChange": {"m5": 1.0, "h1": 5.0, "h6": 10.0, "h24": 20.0},
+            "volume": {"m5": 500, "h1": 5000, "h6": 20000, "h24": 80000},
+            "txns": {w: {"buys": 50, "sells": 40} for w in ("m5", "h1", "h6", "h24")},
+            "liquidity": {"usd": 50000},
+            "fdv": price * 10**9,
+        }
+
+    async def _throttle(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.throttle_rate and self._rng.random() < self.throttle_rate:
+            self.throttled += 1
+            return web.json_response({"error": "rate limited"}, status=429, headers={"Retry-After": "1"})
+        return None
+
+    async def handle_feed(self, request):
+        self.requests["feed"] += 1
+        throttled = await self._throttle()
+        if throttled is not None:
+            return throttled
+        etag = f'"v{self.version}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        items = [{"chainId": "solana", "tokenAddress": address, "url": f"https://dexscreener.com/solana/{address}",
+                  "amount": 10, "totalAmount": 100} for address in self.prices]
+        return web.json_response(items, headers={"ETag": etag})
+
+    async def handle_tokens(self, request):
+        self.requests["tokens"] += 1
+        throttled = await self._throttle()
+        if throttled is not None:
+            return throttled
+        addresses = request.match_info["addresses"].split(",")
+        return web.json_response({"schemaVersion": "1.0.0",
+                                  "pairs": [self.pair(address) for address in addresses if address in self.prices]})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/latest/dex/tokens/{addresses}", self.handle_tokens)
+        app.router.add_get("/{feed:token-.*}", self.handle_feed)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
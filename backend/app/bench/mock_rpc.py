@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import random
+from aiohttp import web
+
+
+def fake_lamports(address):
+    """Deterministic pseudo-random balance so runs are comparable"""
+    digest = hashlib.sha256(address.encode()).digest()
+    return int.from_bytes(digest[:4], "little") * 1000
+
+
+class MockRPC:
+    """Local stand-in for the Helius JSON-RPC endpoint.
+
+    Answers `getBalance`, `getMultipleAccounts` (single requests or JSON-RPC
+    batch arrays), cursor-paginated `getTokenAccounts` and `getTokenSupply`,
+    and counts every HTTP request it receives. Holder amounts are uniform,
+    or heavy-tailed like a real token's with `zipf=True`. A share
+    `throttle_rate` of the requests is answered with HTTP 429 and
+    `retry_after` seconds in Retry-After, like a provider's rate limit.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, holder_count=2500, zipf=False,
+                 throttle_rate=0.0, retry_after=None, seed=7):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.holder_count = holder_count
+        self.zipf = zipf
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.token_mints = ["EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v", "MockMint1", "MockMint2"]
+        self.requests = 0
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._runner = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/?api-key="
+
+    def holder_amount(self, i):
+        if self.zipf:
+            # The i-th largest holder owns ~1/i of the top one, in shuffled page order
+            rank = i * 7919 % self.holder_count + 1
+            return 10**12 // rank
+        return fake_lamports(str(i)) % 10**9
+
+    def _answer(self, call):
+        method = call.get("method")
+        params = call.get("params") or []
+        if method == "getBalance":
+            result = {"context": {"slot": 1}, "value": fake_lamports(params[0])}
+        elif method == "getMultipleAccounts":
+            result = {
+                "context": {"slot": 1},
+                "value": [{"lamports": fake_lamports(address), "owner": "11111111111111111111111111111111"}
+                          for address in params[0]]
+            }
+        elif method == "getTokenAccountsByOwner":
+            seed = fake_lamports(params[0])
+            result = {
+                "context": {"slot": 1},
+                "value": [
+                    {"pubkey": f"Account{params[0]}{n}",
+                     "account": {"data": {"parsed": {"info": {
+                         "mint": self.token_mints[(seed + n) % len(self.token_mints)],
+                         "owner": params[0],
+                         "tokenAmount": {"uiAmount": (seed >> n) % 10000 / 10, "decimals": 6}
+                     }}}}}
+                    for n in range(seed % 4)
+                ]
+            }
+        elif method == "getTokenAccounts":
+            offset = int(params.get("cursor") or 0)
+            limit = params.get("limit", 1000)
+            end = min(offset + limit, self.holder_count)
+            result = {
+                "total": end - offset,
+                "limit": limit,
+                "cursor": str(end) if end < self.holder_count else None,
+                "token_accounts": [
+                    {"address": f"Account{i:037d}", "mint": params["mint"],
+                     "owner": f"Holder{i:038d}", "amount": self.holder_amount(i)}
+                    for i in range(offset, end)
+                ]
+            }
+        elif method == "getTokenSupply":
+            supply = sum(self.holder_amount(i) for i in range(self.holder_count))
+            result = {"context": {"slot": 1}, "value": {"amount": str(supply), "decimals": 6}}
+        else:
+            return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": "Method not found"}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+    async def handle(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.throttle_rate and self._rng.random() < self.throttle_rate:
+            self.throttled += 1
+            headers = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else None
+            return web.json_response({"jsonrpc": "2.0", "error": {"code": 429, "message": "Too many requests"}},
+                                     status=429, headers=headers)
+        body = await request.json()
+        if isinstance(body, list):
+            return web.json_response([self._answer(call) for call in body])
+        return web.json_response(self._answer(body))
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
@@ -0,0 +1,93 @@
+import asyncio
+import itertools
+import json
+from websockets.exceptions import ConnectionClosed
+from websockets.asyncio.server import serve
+
+
+class MockAccountWS:
+    """Local stand-in for the Helius WebSocket endpoint.
+
+    Handles `accountSubscribe`/`accountUnsubscribe`, pushes
+    `accountNotification`s on demand through `notify` and can drop
+    connections to exercise reconnects. Counts messages per method.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.connections = []        # live connections, in connect order
+        self.subscriptions = {}      # connection -> {subscription id: address}
+        self.routes = {}             # address -> {subscription id: connection}
+        self.messages = {"accountSubscribe": 0, "accountUnsubscribe": 0}
+        self.accepted = 0
+        self._ids = itertools.count(1)
+        self._server = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/"
+
+    def subscribed(self):
+        return sum(len(subs) for subs in self.subscriptions.values())
+
+    async def _handle(self, websocket):
+        self.accepted += 1
+        self.connections.append(websocket)
+        subs = self.subscriptions[websocket] = {}
+        try:
+            async for raw in websocket:
+                call = json.loads(raw)
+                method = call.get("method")
+                self.messages[method] = self.messages.get(method, 0) + 1
+                if method == "accountSubscribe":
+                    subscription = next(self._ids)
+                    subs[subscription] = call["params"][0]
+                    self.routes.setdefault(call["params"][0], {})[subscription] = websocket
+                    result = subscription
+                elif method == "accountUnsubscribe":
+                    address = subs.pop(call["params"][0], None)
+                    if address is not None:
+                        self.routes[address].pop(call["params"][0], None)
+                    result = address is not None
+                else:
+                    await websocket.send(json.dumps({"jsonrpc": "2.0", "id": call.get("id"),
+                                                     "error": {"code": -32601, "message": "Method not found"}}))
+                    continue
+                await websocket.send(json.dumps({"jsonrpc": "2.0", "id": call.get("id"), "result": result}))
+        except ConnectionClosed:
+            pass
+        finally:
+            self.connections.remove(websocket)
+            for subscription, address in self.subscriptions.pop(websocket).items():
+                self.routes[address].pop(subscription, None)
+
+    async def notify(self, address, lamports=1, slot=1):
+        """Sends an accountNotification to every subscription of `address`, returns how many were sent"""
+        sent = 0
+        for subscription, websocket in list(self.routes.get(address, {}).items()):
+            await websocket.send(json.dumps({
+                "jsonrpc": "2.0",
+                "method": "accountNotification",
+                "params": {"subscription": subscription, "result": {
+                    "context": {"slot": slot},
+                    "value": {"lamports": lamports, "owner": "11111111111111111111111111111111"},
+                }},
+            }))
+            sent += 1
+        return sent
+
+    async def drop(self, index=0):
+        """Closes one live connection abruptly"""
+        websocket = self.connections[index]
+        websocket.transport.abort()
+
+    async def start(self):
+        self._server = await serve(self._handle, self.host, self.port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
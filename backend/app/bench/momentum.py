@@ -0,0 +1,94 @@
+"""Benchmark: momentum detection over the history store vs the old h24 filter.
+
+Fills a temporary history store with `--snapshots` synthetic snapshots of
+`--tokens` tokens collected every `--interval` seconds (a few of them
+pumping in the last hour), then times one detection cycle.
+
+Run from backend/app:  python -m bench.momentum --tokens 5000 --snapshots 100
+"""
+import argparse
+import random
+import tempfile
+import time
+from parcing.momentum import MomentumDetector
+from storage.history import PriceHistoryStore
+
+
+def make_snapshot(hours_left, tokens, pumping, rng):
+    snapshot = []
+    for i in range(tokens):
+        base = 1 + i % 97
+        pump = i < pumping and hours_left < 1
+        price = base * (1 + rng.uniform(-0.02, 0.02)) * (1.8 if pump else 1)
+        volume_h1 = rng.uniform(2000, 20000) * (8 if pump else 1)
+        buys = rng.randint(20, 100)
+        snapshot.append({
+            "tokenAddress": f"Mint{i:040d}",
+            "baseToken": {"address": f"Mint{i:040d}", "symbol": f"T{i}", "name": f"Token {i}"},
+            "priceUsd": str(price),
+            "priceChange": {"m5": rng.uniform(-3, 3), "h1": 80.0 if pump else rng.uniform(-5, 5),
+                            "h6": rng.uniform(-10, 10), "h24": rng.uniform(-60, 120)},
+            "volume": {"m5": volume_h1 / 12, "h1": volume_h1, "h6": volume_h1 * 6, "h24": 24 * 10000},
+            "liquidity": {"usd": 50000 * (1.3 if pump else 1)},
+            "fdv": 1e6,
+            "txns": {w: {"buys": buys * (3 if pump else 1), "sells": rng.randint(20, 100)}
+                     for w in ("m5", "h1", "h6", "h24")},
+        })
+    return snapshot
+
+
+def legacy_filter(tokens):
+    """The old filter: priceChange.h24 > 50 in a Python loop over the latest snapshot"""
+    pumped = []
+    for token in tokens:
+        try:
+            change = float(token.get('priceChange', {}).get('h24', 0))
+            if change > 50:
+                pumped.append({'contract': token['baseToken']['address'], 'growth_24h': change})
+        except (ValueError, TypeError, AttributeError):
+            continue
+    return pumped
+
+
+def main(tokens, snapshots, interval, pumping, rounds):
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PriceHistoryStore(tmp)
+        started = time.perf_counter()
+        now = int(time.time())
+        latest = None
+        for step in range(snapshots):
+            age = (snapshots - 1 - step) * interval
+            latest = make_snapshot(age / 3600, tokens, pumping, rng)
+            store.append_snapshot(now - age, latest)
+        print(f"history: {store.rows} rows, {tokens} tokens x {snapshots} snapshots "
+              f"(filled in {time.perf_counter() - started:.1f}s)")
+
+        detector = MomentumDetector(store)
+        timings, flagged = [], []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            flagged = detector.detect()
+            timings.append(time.perf_counter() - started)
+        real = sum(1 for result in flagged if int(result["address"][4:]) < pumping)
+        print(f"momentum: {min(timings) * 1000:8.2f} ms per cycle, {len(flagged)} flagged, "
+              f"{real}/{pumping} planted pumps found")
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            legacy = legacy_filter(latest)
+        elapsed = (time.perf_counter() - started) / rounds
+        real = sum(1 for token in legacy if int(token["contract"][4:]) < pumping)
+        print(f"h24 > 50: {elapsed * 1000:8.2f} ms per cycle, {len(legacy)} flagged, "
+              f"{real}/{pumping} planted pumps found")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=5000)
+    parser.add_argument("--snapshots", type=int, default=100)
+    parser.add_argument("--interval", type=int, default=900, help="seconds between snapshots")
+    parser.add_argument("--pumping", type=int, default=20, help="tokens that pump in the last hour")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    main(args.tokens, args.snapshots, args.interval, args.pumping, args.rounds)
@@ -0,0 +1,91 @@
+"""Benchmark: peak RSS of whole-file json.loads vs the streaming snapshot reader.
+
+Each mode runs in a fresh interpreter so peaks don't leak between runs.
+Run from backend/app:  python -m bench.snapshot_memory --tokens 100000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from utils.snapshots import iter_snapshot, write_snapshot
+
+
+def synthetic_token(i):
+    return {
+        "url": f"https://dexscreener.com/solana/token{i}",
+        "chainId": "solana",
+        "tokenAddress": f"Token{i:039d}",
+        "icon": f"https://dd.dexscreener.com/ds-data/tokens/solana/Token{i:039d}.png",
+        "description": "Synthetic token used for the snapshot memory benchmark. " * 3,
+        "links": [{"type": "twitter", "url": f"https://x.com/token{i}"}],
+        "priceChange": {"m5": i % 7, "h1": i % 13, "h6": i % 29, "h24": i % 97},
+        "totalAmount": 10,
+        "amount": 10,
+    }
+
+
+def count_pumped(tokens):
+    return sum(1 for token in tokens if float(token.get("priceChange", {}).get("h24", 0)) > 50)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_mode(mode, path):
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == "json.loads":
+        with open(path, "r") as f:
+            pumped = count_pumped(json.loads(f.read()))
+    else:
+        pumped = count_pumped(iter_snapshot(path))
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"mode": mode, "file": os.path.basename(path), "pumped": pumped,
+                      "seconds": round(elapsed, 3), "peak_rss_mb": round(peak_rss_mb(), 1),
+                      "baseline_rss_mb": round(baseline, 1)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=100000)
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_mode(*args.run)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "data_legacy.json")
+        ndjson_path = os.path.join(tmp, "data_stream.jsonl")
+        # Both files are generated token by token: Linux keeps ru_maxrss across
+        # exec, so a big parent would inflate every child's peak
+        with open(legacy_path, "w") as f:
+            f.write("[\n")
+            for i in range(args.tokens):
+                f.write((",\n" if i else "") + json.dumps(synthetic_token(i), indent=4))
+            f.write("\n]")
+        write_snapshot(ndjson_path, (synthetic_token(i) for i in range(args.tokens)))
+        print(f"{args.tokens} tokens: legacy {os.path.getsize(legacy_path) / 1e6:.1f} MB, "
+              f"ndjson {os.path.getsize(ndjson_path) / 1e6:.1f} MB")
+
+        print(f"{'mode':>12} {'file':>18} {'seconds':>8} {'peak RSS MB':>12} {'baseline MB':>12}")
+        for mode, path in (("json.loads", legacy_path), ("streaming", legacy_path), ("streaming", ndjson_path)):
+            output = subprocess.run(
+                [sys.executable, "-m", "bench.snapshot_memory", "--run", mode, path],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(output)
+            print(f"{result['mode']:>12} {result['file']:>18} {result['seconds']:>8} "
+                  f"{result['peak_rss_mb']:>12} {result['baseline_rss_mb']:>12}")
+
+
+if __name__ == "__main__":
+    main()
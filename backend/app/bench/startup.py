@@ -0,0 +1,73 @@
+"""Benchmark: startup time and memory of each main.py role.
+
+Every role runs in a fresh interpreter that imports main.py, validates the
+settings and imports the modules the role loads before it starts working.
+Reports the median wall time of the whole process, the time spent in those
+imports and the peak RSS, next to a bare interpreter and a process that
+loads every subsystem, as each process did before roles were split.
+
+Run from backend/app:  python -m bench.startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# The imports inside each role function of main.py
+ROLE_MODULES = {
+    "collect": ["parcing.collector", "utils.http_client"],
+    "process": ["parcing.processor", "parcing.registry", "parcing.scheduler", "parcing.watcher",
+                "storage.cooccurrence", "utils.http_client", "utils.metrics"],
+    "track": ["parcing.worker"],
+    "subscribe": ["parcing.subscription", "parcing.valuation", "utils.http_client"],
+    "bot": ["telegram.bot"],
+    "all": ["orchestrator"],
+}
+EVERYTHING = sorted({module for modules in ROLE_MODULES.values() for module in modules})
+
+CHILD = """
+import importlib, resource, sys, time
+started = time.perf_counter()
+import main
+main.settings.validate()
+for module in sys.argv[1:]:
+    importlib.import_module(module)
+print(time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure(modules, runs, bare=False):
+    walls, imports, rss = [], [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        if bare:
+            output = subprocess.run([sys.executable, "-c", "import resource; print(0, resource.getrusage("
+                                     "resource.RUSAGE_SELF).ru_maxrss)"], capture_output=True, text=True, check=True)
+        else:
+            output = subprocess.run([sys.executable, "-c", CHILD, *modules], capture_output=True, text=True,
+                                    check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        walls.append(time.perf_counter() - started)
+        import_seconds, max_rss = output.stdout.split()
+        imports.append(float(import_seconds))
+        rss.append(int(max_rss))
+    return statistics.median(walls), statistics.median(imports), statistics.median(rss)
+
+
+def main(runs, roles):
+    print(f"{'role':<16} {'wall (ms)':>10} {'imports (ms)':>13} {'RSS (MB)':>9}")
+    rows = [("python", [], True)] + [(role, ROLE_MODULES[role], False) for role in roles]
+    rows.append(("every subsystem", EVERYTHING, False))
+    for name, modules, bare in rows:
+        wall, imports, rss = measure(modules, runs, bare)
+        # ru_maxrss is in KB on Linux
+        print(f"{name:<16} {wall * 1000:>10.0f} {imports * 1000:>13.0f} {rss / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--roles", nargs="+", default=list(ROLE_MODULES), choices=list(ROLE_MODULES))
+    args = parser.parse_args()
+    main(args.runs, args.roles)
@@ -0,0 +1,93 @@
+"""Benchmark: sharded per-address subscriptions against a local WebSocket stand-in.
+
+Subscribes N addresses, applies an add/remove diff, drops one connection and
+routes notifications, reporting the subscribe traffic each step costs.
+
+Run from backend/app:  python -m bench.ws_subscriptions --addresses 20000 --per-connection 1000
+"""
+import argparse
+import asyncio
+import time
+from bench.mock_ws import MockAccountWS
+from parcing.ws_manager import SubscriptionManager
+
+
+def make_addresses(count, offset=0):
+    return [f"Whale{i:039d}" for i in range(offset, offset + count)]
+
+
+async def wait_for(predicate, timeout=120):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("condition not reached")
+        await asyncio.sleep(0.01)
+
+
+async def run(count, per_connection, subscribe_rate, churn):
+    server = await MockAccountWS().start()
+    received = []
+    manager = SubscriptionManager(server.url, per_connection=per_connection, subscribe_rate=subscribe_rate,
+                                  on_notification=lambda address, result: received.append(address),
+                                  backoff=0.05)
+    addresses = make_addresses(count)
+    manager.add(addresses)
+    runner = asyncio.create_task(manager.run())
+    try:
+        print(f"{'step':>22} {'messages':>10} {'wall (s)':>10} {'subscribed':>11} {'connections':>12}")
+
+        def report(step, messages, started):
+            print(f"{step:>22} {messages:>10} {time.perf_counter() - started:>10.2f} "
+                  f"{server.subscribed():>11} {len(server.connections):>12}")
+
+        started = time.perf_counter()
+        await wait_for(lambda: server.subscribed() == count and manager.subscribed_count() == count)
+        report("initial subscribe", server.messages["accountSubscribe"], started)
+
+        # Diff: churn addresses leave, as many new ones arrive
+        before = dict(server.messages)
+        started = time.perf_counter()
+        manager.remove(addresses[:churn])
+        manager.add(make_addresses(churn, offset=count))
+        await wait_for(lambda: server.subscribed() == count and manager.subscribed_count() == count)
+        diff = sum(server.messages[m] - before[m] for m in before)
+        report(f"diff +{churn}/-{churn}", diff, started)
+        print(f"{'(full resubscribe)':>22} {count:>10}")
+
+        # One shard drops, only its addresses are restored
+        before = server.messages["accountSubscribe"]
+        accepted = server.accepted
+        started = time.perf_counter()
+        await server.drop(0)
+        await wait_for(lambda: server.accepted > accepted and server.subscribed() == count
+                       and manager.subscribed_count() == count)
+        report("shard reconnect", server.messages["accountSubscribe"] - before, started)
+
+        # Notifications are routed back to their address by subscription id
+        sample = make_addresses(min(1000, count - churn), offset=churn)
+        started = time.perf_counter()
+        sent = sum([await server.notify(address) for address in sample])
+        await wait_for(lambda: len(received) >= sent)
+        routed = len(set(received) & set(sample))
+        report(f"notify {len(sample)}", sent, started)
+        print(f"routed {routed}/{len(sample)} notifications to the right address; "
+              f"{len(manager.shards)} shards of <= {per_connection}")
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--addresses", type=int, default=20000)
+    parser.add_argument("--per-connection", type=int, default=1000)
+    parser.add_argument("--subscribe-rate", type=float, default=100000,
+                        help="subscribe messages/second across all shards")
+    parser.add_argument("--churn", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.addresses, args.per_connection, args.subscribe_rate, args.churn))
+
+
+if __name__ == "__main__":
+    main()
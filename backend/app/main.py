@@ -1,7 +1,9 @@
+import argparse
 import asyncio
 import logging
-from orchestrator import Orchestrator
-from utils.config import settings
+import sys
+from utils.config import ConfigError, settings
+from utils.slogger import setup_queue_logging
 
 
 logging.basicConfig(
@@ -10,9 +12,142 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-async def main():
-    orchestrator = Orchestrator()
+# Every role imports only the subsystems it runs, inside its function, so a
+# process starts without loading aiogram, watchdog, numpy or the whale tracker
+# unless it needs them. A split deployment runs one role per process:
+#   collect    DexScreener feeds -> raw snapshot files in RAW_DATA_FILEPATH
+#   process    raw files -> enrichment, pump detection -> analysis job queue; results -> whale registry
+#   track      worker processes analyzing the queued tokens
+#   subscribe  account subscriptions for the whales in the registry log
+#   bot        the Telegram bot, with a subscription following the registry log like subscribe
+#   all        everything in one process (the default), the bot if BOT_TOKEN is set; --workers N moves analyses to workers
+
+# Settings a role cannot start without; every other setting has a default
+ROLE_SETTINGS = {
+    "collect": ["ENDPOINTS"],
+    "process": [],
+    "track": ["HELIUS_URL", "HELIUS_API_KEY", "MIN_WHALE_BALANCE_USD"],
+    "subscribe": ["HELIUS_URL", "HELIUS_API_KEY", "HELIUS_WS_URL"],
+    "bot": ["BOT_TOKEN", "HELIUS_URL", "HELIUS_API_KEY", "HELIUS_WS_URL"],
+    "all": ["ENDPOINTS", "HELIUS_URL", "HELIUS_API_KEY", "HELIUS_WS_URL", "MIN_WHALE_BALANCE_USD"],
+}
+
+
+async def main(workers=None):
+    from orchestrator import Orchestrator
+    if settings.LOG_QUEUE:
+        setup_queue_logging(settings.LOG_FLUSH_INTERVAL)
+    orchestrator = Orchestrator(workers=workers)
     await orchestrator.start()
 
+
+async def run_collect():
+    """Polls the DexScreener feeds and writes raw snapshots for the process role"""
+    from parcing.collector import DataCollector
+    from utils.http_client import HttpClient
+    async with HttpClient() as http:
+        await DataCollector(settings.ENDPOINTS, http=http).collect_data()
+
+
+async def run_process():
+    """Turns raw snapshots into analysis jobs and records the whales the workers find"""
+    from parcing.processor import TokenManager
+    from parcing.registry import WhaleRegistry
+    from parcing.scheduler import QueueScheduler
+    from parcing.watcher import watch_raw_files
+    from storage.cooccurrence import CoOccurrenceIndex
+    from utils.http_client import HttpClient
+    from utils.metrics import MetricsServer
+
+    # The one writer of the registry log, subscribe processes follow it
+    registry = WhaleRegistry()
+
+    async def on_result(job):
+        registry.record(job.result, job.mint)
+        await asyncio.to_thread(registry.flush)
+
+    async with HttpClient() as http:
+        processor = TokenManager(http=http)
+        scheduler = QueueScheduler(on_result=on_result, cooccurrence=CoOccurrenceIndex())
+        scheduler.start()
+        observer = watch_raw_files(processor, scheduler, asyncio.get_running_loop())
+        # Pipeline metrics for Prometheus and the bot's /stats
+        metrics_server = await MetricsServer().start() if settings.METRICS_PORT else None
+        try:
+            while True:
+                await asyncio.sleep(600)
+                registry.expire()
+                await asyncio.to_thread(registry.flush)
+        finally:
+            observer.stop()
+            await scheduler.stop()
+            registry.flush()
+            if metrics_server is not None:
+                await metrics_server.stop()
+
+
+def run_workers(count):
+    """Worker pool only, for extra analysis capacity next to an orchestrator started with --workers"""
+    from parcing.worker import WorkerPool
+    pool = WorkerPool(count)
+    pool.start()
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+
+
+async def run_subscribe():
+    """Subscribes to the whales of the registry log and logs their balance changes"""
+    from parcing.subscription import WhaleSubscription
+    from parcing.valuation import PriceTable
+    from utils.http_client import HttpClient
+
+    async with HttpClient() as http:
+        price_table = PriceTable(http)
+        await price_table.ensure_fresh()
+        subscription = WhaleSubscription.following(http, price_table)
+        async with subscription.subscribe_to_transactions() as events:
+            async for event in events:
+                await price_table.ensure_fresh()
+                logger.info(f"Whale {event.address} moved {event.change / 1e9:+.4f} SOL (${event.amount_usd:,.2f})")
+
+
+async def run_bot():
+    from telegram.bot import main as bot_main
+    await bot_main()
+
+
+def run(role, workers=None):
+    try:
+        settings.validate(required=ROLE_SETTINGS[role])
+    except ConfigError as e:
+        sys.exit(f"Cannot start {role}: {e}")
+    if role == "track":
+        run_workers(workers or settings.ANALYSIS_WORKERS or 1)
+        return
+    if role in ("collect", "process", "subscribe") and settings.LOG_QUEUE:
+        setup_queue_logging(settings.LOG_FLUSH_INTERVAL)
+    runners = {
+        "collect": run_collect,
+        "process": run_process,
+        "subscribe": run_subscribe,
+        "bot": run_bot,
+        "all": lambda: main(workers),
+    }
+    asyncio.run(runners[role]())
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pump detection and whale tracking")
+    parser.add_argument("role", nargs="?", default="all", choices=list(ROLE_SETTINGS),
+                        help="subsystem to run in this process (default: all of them)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="run whale analyses in N worker processes fed by the SQLite job queue "
+                             "(default ANALYSIS_WORKERS, 0 analyzes in-process); with track, the pool size")
+    parser.add_argument("--worker-only", action="store_true",
+                        help="same as the track role: start only the worker pool")
+    args = parser.parse_args()
+    run("track" if args.worker_only else args.role, args.workers)
@@ -1,100 +1,123 @@
 import asyncio
 import logging
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
 from parcing.collector import DataCollector
 from parcing.processor import TokenManager
 from parcing.whales import WhaleTracker
 from parcing.subscription import WhaleSubscription
+from parcing.scheduler import AnalysisScheduler, QueueScheduler
+from parcing.worker import WorkerPool
+from parcing.cache import BalanceCache
+from parcing.registry import WhaleRegistry
+from parcing.valuation import PriceTable
+from pipeline import Pipeline, SnapshotFileSink
+from storage.history import PriceHistoryStore
 from utils.config import settings
+from utils.http_client import HttpClient
+from utils.metrics import MetricsServer
+from utils.ratelimit import RateLimiter
+from utils.slogger import setup_queue_logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-
-
-class DataFileHandler(FileSystemEventHandler):
-    def __init__(self, processor, whale_tracker, loop):
-        self.processor = processor
-        self.whale_tracker = whale_tracker
-        self.loop = loop
-        
-    async def process_new_file(self, file_path):
-        # Process raw data to clean data and find pumped tokens
-        pumped_tokens = await self.processor.process_latest_raw_data()
-        
-        # Analyze each pumped token for whales
-        if pumped_tokens:
-            for token in pumped_tokens:
-                wealthy_holders = await self.whale_tracker.analyze_token(token['mint'])
-                if wealthy_holders:
-                    # Start monitoring these whale addresses
-                    await self.whale_subscription.add_addresses(wealthy_holders)
-
-
-    def on_created(self, event):
-        if event.is_directory:
-            return
-        if event.src_path.endswith('.json') and '/raw/' in event.src_path:
-            logger.info(f"New raw data detected: {event.src_path}")
-            asyncio.run_coroutine_threadsafe(
-                self.process_new_file(event.src_path),
-                self.loop
-            )
-
 class Orchestrator:
-    def __init__(self):
+    def __init__(self, workers=None):
         self.loop = asyncio.get_event_loop()
-        self.collector = DataCollector(settings.ENDPOINTS)
-        self.processor = TokenManager()
-        self.whale_tracker = WhaleTracker()
-        self.whale_subscription = WhaleSubscription()
+        # One pooled HTTP client shared by every DexScreener and Helius caller
+        self.http = HttpClient()
+        # Shared by every Helius RPC caller
+        self.rate_limiter = RateLimiter(settings.HELIUS_RPS, max_rate=settings.HELIUS_MAX_RPS, name="helius")
+        self.balance_cache = BalanceCache(name="balances")
+        self.price_table = PriceTable(self.http)
+        # One live whale set for the trackers, the subscriptions and the bot
+        self.whale_registry = WhaleRegistry()
+        # Per-token market history, appended by the pipeline and read by the pump detector
+        self.history = PriceHistoryStore()
+        self.collector = DataCollector(settings.ENDPOINTS, http=self.http)
+        # One WhaleTracker for the processor and the scheduler
+        self.whale_tracker = WhaleTracker(http=self.http, limiter=self.rate_limiter, balance_cache=self.balance_cache,
+                                          price_table=self.price_table, registry=self.whale_registry)
+        self.processor = TokenManager(http=self.http, price_table=self.price_table, history=self.history)
+        self.whale_subscription = WhaleSubscription(self.whale_registry, self.price_table,
+                                                    balance_cache=self.balance_cache,
+                                                    balance_resolver=self.whale_tracker.balance_resolver)
+        # Analyses run in-process, or in worker processes fed through the SQLite job queue
+        self.workers = settings.ANALYSIS_WORKERS if workers is None else workers
+        if self.workers:
+            self.worker_pool = WorkerPool(self.workers)
+            self.scheduler = QueueScheduler(on_result=self.on_analysis_done,
+                                            cooccurrence=self.whale_tracker.cooccurrence)
+        else:
+            self.worker_pool = None
+            self.scheduler = AnalysisScheduler(self.whale_tracker, on_result=self.on_analysis_done)
+
+    async def on_analysis_done(self, job):
+        """Start monitoring the whales found for a token"""
+        logger.info(f"Found {len(job.result)} whale addresses for token {job.mint}")
+        await self.whale_subscription.add_addresses(job.result, job.mint)
         
-    async def process_pumped_tokens(self, pumped_tokens):
-        """Process pumped tokens and track their whales"""
-        if not pumped_tokens:
-            return
+    async def run_watchdog(self):
+        """Legacy mode: the collector writes raw files and a watchdog Observer picks them up"""
+        from parcing.watcher import watch_raw_files
+        observer = watch_raw_files(self.processor, self.scheduler, self.loop)
+        try:
+            await self.collector.collect_data()
+        finally:
+            observer.stop()
 
-        for token in pumped_tokens:
-            token_address = token.get('contract')
-            if token_address:
-                logger.info(f"Analyzing whales for pumped token: {token_address}")
-                wealthy_holders = await self.whale_tracker.analyze_token(token_address)
-                
-                if wealthy_holders:
-                    logger.info(f"Found {len(wealthy_holders)} whale addresses for token {token_address}")
-                    # Add these addresses to whale subscription
-                    await self.whale_subscription.add_addresses(wealthy_holders)
+    async def run_pipeline(self):
+        """Snapshots flow through bounded in-memory queues, files are an optional sink"""
+        sink = SnapshotFileSink() if settings.PERSIST_SNAPSHOTS else None
+        pipeline = Pipeline(self.collector, self.processor, self.scheduler, self.whale_subscription,
+                            sink=sink, history=self.history)
+        self.scheduler.on_result = pipeline.on_analysis_done
+        await pipeline.run()
+
+    async def start(self, mode=None):
+        mode = mode or settings.PIPELINE_MODE
+        logger.info(f"Starting orchestrator in {mode} mode")
+        if self.worker_pool is not None:
+            self.worker_pool.start()
+        self.scheduler.start()
+        metrics_server = await MetricsServer().start() if settings.METRICS_PORT else None
 
-    async def start(self):
-        # Set up file system monitoring
-        event_handler = DataFileHandler(
-            self.processor,
-            self.whale_tracker,
-            self.loop
-        )
-        observer = Observer()
-        observer.schedule(event_handler, settings.RAW_DATA_FILEPATH, recursive=False)
-        observer.start()
-        
         try:
-            # Start data collection
-            collector_task = asyncio.create_task(self.collector.collect_data())
+            # Start data collection and processing
+            if mode == "watchdog":
+                processing_task = asyncio.create_task(self.run_watchdog())
+            else:
+                processing_task = asyncio.create_task(self.run_pipeline())
             
             # Start whale subscription
-            subscription_task = asyncio.create_task(
-                self.whale_subscription.subscribe_to_transactions()
-            )
-            
-            # Wait for both tasks
-            await asyncio.gather(collector_task, subscription_task)
+            subscription_task = self.whale_subscription.start()
+            tasks = [processing_task, subscription_task]
+
+            # The bot alerts on this process's live whale set
+            if settings.BOT_TOKEN:
+                from telegram.bot import run_bot
+                tasks.append(asyncio.create_task(run_bot(self.whale_subscription, self.http, handle_signals=False)))
+            else:
+                logger.info("BOT_TOKEN is not set, running without the Telegram bot")
+
+            await asyncio.gather(*tasks)
             
         except Exception as e:
             logger.error(f"Error in orchestrator: {e}")
             raise
+        finally:
+            await self.scheduler.stop()
+            if self.worker_pool is not None:
+                await asyncio.to_thread(self.worker_pool.stop)
+            self.balance_cache.save()
+            self.whale_registry.flush()
+            if metrics_server is not None:
+                await metrics_server.stop()
+            await self.http.close()
             
 async def main():
+    if settings.LOG_QUEUE:
+        setup_queue_logging(settings.LOG_FLUSH_INTERVAL)
     orchestrator = Orchestrator()
     await orchestrator.start()
 
@@ -1,4 +1,14 @@
-from .collector import DataCollector
-from .processor import TokenManager
-from .whales import WhaleTracker
-from .subscription import WhaleSubscription
\ No newline at end of file
+# Submodules are imported on first use, so a role only loads what it runs
+_EXPORTS = {
+    "DataCollector": ".collector",
+    "TokenManager": ".processor",
+    "WhaleTracker": ".whales",
+    "WhaleSubscription": ".subscription",
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
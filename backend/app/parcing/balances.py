@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List
+from utils.ratelimit import PRIORITY_BULK
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class BalanceResolver:
+    """Resolves native SOL balances for many wallets with as few RPC calls as possible.
+
+    Holders are packed into `getMultipleAccounts` requests (100 pubkeys each, the
+    RPC limit) and a bounded number of those requests run concurrently.
+    """
+
+    MAX_KEYS_PER_REQUEST = 100
+
+    def __init__(self, rpc, chunk_size=MAX_KEYS_PER_REQUEST, max_concurrency=8):
+        self.rpc = rpc
+        self.chunk_size = min(chunk_size, self.MAX_KEYS_PER_REQUEST)
+        self.max_concurrency = max_concurrency
+        self.rpc_calls = 0
+        self.failed_calls = 0
+
+    def _chunks(self, addresses: List[str]):
+        for i in range(0, len(addresses), self.chunk_size):
+            yield addresses[i:i + self.chunk_size]
+
+    async def _fetch_chunk(self, chunk: List[str], priority) -> Dict[str, int]:
+        params = [
+            chunk,
+            # Only lamports are needed, so skip the account data entirely
+            {"encoding": "base64", "dataSlice": {"offset": 0, "length": 0}}
+        ]
+        self.rpc_calls += 1
+        data = await self.rpc.call("getMultipleAccounts", params, priority)
+        if not data or "result" not in data:
+            # Left out rather than reported as empty, so they are not cached as 0
+            self.failed_calls += 1
+            logger.error(f"Could not resolve balances for {len(chunk)} accounts")
+            return {}
+
+        accounts = (data.get("result") or {}).get("value") or []
+        return {
+            address: (account or {}).get("lamports", 0)
+            for address, account in zip(chunk, accounts)
+        }
+
+    async def resolve(self, addresses: Iterable[str], priority=PRIORITY_BULK) -> Dict[str, int]:
+        """Returns a holder -> lamports map.
+
+        Accounts that do not exist map to 0; accounts whose request failed
+        are left out, callers decide how to treat them.
+        """
+        addresses = list(dict.fromkeys(addresses))
+        if not addresses:
+            return {}
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(chunk):
+            async with semaphore:
+                return await self._fetch_chunk(chunk, priority)
+
+        results = await asyncio.gather(*(bounded(chunk) for chunk in self._chunks(addresses)))
+
+        balances = {}
+        for chunk_result in results:
+            balances.update(chunk_result)
+        return balances
@@ -0,0 +1,153 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from utils.config import settings
+from utils.metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CACHE_EVENTS = metrics.gauge("balance_cache_events", "Balance cache lookups and removals by kind", ["cache", "event"])
+CACHE_SIZE = metrics.gauge("balance_cache_size", "Balances held by a balance cache", ["cache"])
+CACHE_HIT_RATIO = metrics.gauge("balance_cache_hit_ratio", "Share of balance lookups served without an RPC call",
+                                ["cache"])
+_cache_ids = itertools.count(1)
+
+
+class BalanceCache:
+    """Bounded TTL/LRU cache of wallet balances (lamports) keyed by address.
+
+    Concurrent lookups of the same address share one in-flight fetch
+    (singleflight). If `path` is set the cache can be saved to and restored
+    from disk, so warm state survives restarts.
+    """
+
+    def __init__(self, ttl=None, max_size=None, path=None, name=None):
+        self.ttl = ttl if ttl is not None else settings.BALANCE_CACHE_TTL
+        self.max_size = max_size or settings.BALANCE_CACHE_SIZE
+        self.path = path if path is not None else settings.BALANCE_CACHE_PATH
+        self._entries = OrderedDict()  # address -> (lamports, fetched_at)
+        self._inflight = {}
+        self.stats = defaultdict(int)
+        # Metrics label; caches without a name are numbered
+        self.name = name or f"cache{next(_cache_ids)}"
+        for event in ("hits", "misses", "coalesced", "expired", "evictions", "failed"):
+            CACHE_EVENTS.labels(self.name, event).set_function(lambda event=event: self.stats[event])
+        CACHE_SIZE.labels(self.name).set_function(self.__len__)
+        CACHE_HIT_RATIO.labels(self.name).set_function(lambda: self.snapshot_stats()["hit_ratio"])
+        if self.path:
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, address, now=None):
+        """Fresh cached balance or None"""
+        entry = self._entries.get(address)
+        if entry is None:
+            return None
+        lamports, fetched_at = entry
+        if (now or time.time()) - fetched_at > self.ttl:
+            del self._entries[address]
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(address)
+        return lamports
+
+    def put(self, address, lamports, fetched_at=None):
+        self._entries[address] = (lamports, fetched_at or time.time())
+        self._entries.move_to_end(address)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get_many(self, addresses, fetch_many):
+        """Returns address -> lamports, calling `fetch_many(missing)` only for misses.
+
+        Addresses already being fetched by another caller are awaited instead
+        of fetched again. Addresses `fetch_many` leaves out (failed requests)
+        are left out of the result too and not cached, the next lookup retries them.
+        """
+        now = time.time()
+        result, waiting, missing = {}, {}, []
+        for address in dict.fromkeys(addresses):
+            lamports = self.get(address, now)
+            if lamports is not None:
+                result[address] = lamports
+                self.stats["hits"] += 1
+            elif address in self._inflight:
+                waiting[address] = self._inflight[address]
+                self.stats["coalesced"] += 1
+            else:
+                missing.append(address)
+                self.stats["misses"] += 1
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {address: loop.create_future() for address in missing}
+            self._inflight.update(futures)
+            try:
+                fetched = await fetch_many(missing)
+                for address in missing:
+                    lamports = fetched.get(address)
+                    futures[address].set_result(lamports)
+                    if lamports is None:
+                        self.stats["failed"] += 1
+                        continue
+                    self.put(address, lamports)
+                    result[address] = lamports
+            except BaseException as e:
+                for future in futures.values():
+                    if not future.done():
+                        future.set_exception(e)
+                        # Nobody may be waiting, don't warn about unretrieved errors
+                        future.exception()
+                raise
+            finally:
+                for address in missing:
+                    self._inflight.pop(address, None)
+
+        for address, future in waiting.items():
+            lamports = await future
+            if lamports is not None:
+                result[address] = lamports
+        return result
+
+    def snapshot_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "hit_ratio": (self.stats["hits"] + self.stats["coalesced"]) / lookups if lookups else 0.0,
+        }
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({address: list(entry) for address, entry in self._entries.items()}, f)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved {len(self._entries)} cached balances to {self.path}")
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not load balance cache from {self.path}: {e}")
+            return
+
+        now = time.time()
+        # Oldest first so LRU order roughly matches fetch order
+        for address, (lamports, fetched_at) in sorted(data.items(), key=lambda item: item[1][1]):
+            if now - fetched_at <= self.ttl:
+                self.put(address, lamports, fetched_at)
+        logger.info(f"Loaded {len(self._entries)} fresh cached balances from {self.path}")
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import List
+from utils.config import settings
+from utils.metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHURN_RATIO = metrics.gauge("snapshot_churn_ratio", "Share of tokens inserted, updated or removed in the last snapshot")
+CHANGES = metrics.counter("snapshot_changes", "Tokens by change type between snapshots", ["change"])
+
+
+def parse_thresholds(spec):
+    """"price=0.02,boost=0.1" -> {"price": 0.02, "boost": 0.1}"""
+    thresholds = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            if name.strip() not in METRICS:
+                raise ValueError(f"Unknown CDC metric {name.strip()!r}, expected one of {tuple(METRICS)}")
+            thresholds[name.strip()] = float(value)
+    return thresholds
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Key metrics compared between versions of a token. Raw feed items only carry boost amounts,
+# so tokens are diffed after enrichment, when they also carry the pair metrics
+METRICS = {
+    "price": lambda token: _number(token.get("priceUsd")),
+    "liquidity": lambda token: _number((token.get("liquidity") or {}).get("usd")),
+    "volume": lambda token: _number((token.get("volume") or {}).get("h1")),
+    "boost": lambda token: _number(token.get("totalAmount", token.get("amount"))),
+}
+
+
+def key_metrics(token):
+    return tuple(extract(token) for extract in METRICS.values())
+
+
+def content_hash(token):
+    return hashlib.blake2b(json.dumps(token, sort_keys=True, separators=(",", ":")).encode(),
+                           digest_size=16).digest()
+
+
+class _RawEntry:
+    __slots__ = ("hash", "enriched_at")
+
+    def __init__(self, hash, now):
+        self.hash = hash                # of the feed item, before enrichment
+        self.enriched_at = now
+
+
+class _Entry:
+    __slots__ = ("hash", "metrics", "seen_at", "emitted_at")
+
+    def __init__(self, hash, metrics, now):
+        self.hash = hash
+        self.metrics = metrics          # as of the last version handed downstream
+        self.seen_at = now
+        self.emitted_at = now
+
+
+@dataclass
+class ChangeSet:
+    """Difference between a snapshot and the index of earlier snapshots"""
+    inserted: List[dict] = field(default_factory=list)
+    updated: List[dict] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def changed(self):
+        return self.inserted + self.updated
+
+    @property
+    def seen(self):
+        return len(self.inserted) + len(self.updated) + self.unchanged
+
+    @property
+    def churn(self):
+        changes = len(self.inserted) + len(self.updated) + len(self.removed)
+        return changes / max(self.seen + len(self.removed), 1)
+
+    def superseded(self, pumped_tokens):
+        """Mints whose analyses are outdated: changed or removed and not pumped any more"""
+        pumped = {token.get('contract') for token in pumped_tokens or []}
+        changed = {token.get("tokenAddress") for token in self.changed}
+        return (changed | set(self.removed)) - pumped
+
+    def summary(self):
+        return (f"{len(self.inserted)} inserted, {len(self.updated)} updated, {len(self.removed)} removed, "
+                f"{self.unchanged} unchanged (churn {self.churn:.1%})")
+
+
+class ChangeTracker:
+    """One snapshot being diffed token by token, see SnapshotIndex.begin"""
+
+    def __init__(self, index, now):
+        self.index = index
+        self.now = now
+        self.changes = ChangeSet()
+        self._seen = set()
+        self._selected = set()
+
+    def select(self, raw_token):
+        """True if a feed item is to be enriched this cycle.
+
+        Items are enriched when they are new, changed in the feed, or were
+        last enriched `enrich_age` seconds ago. The others count as seen and
+        unchanged without an enrichment request.
+        """
+        address = raw_token.get("tokenAddress")
+        if not address or address in self._selected or address in self._seen:
+            return False
+        index = self.index
+        digest = content_hash(raw_token)
+        raw = index.raw.get(address)
+        entry = index.entries.get(address)
+        if raw is None or entry is None or raw.hash != digest or self.now - raw.enriched_at >= index.enrich_age:
+            index.raw[address] = _RawEntry(digest, self.now)
+            self._selected.add(address)
+            return True
+        entry.seen_at = self.now
+        self._seen.add(address)
+        self.changes.unchanged += 1
+        return False
+
+    def feed(self, token):
+        """Classifies one token; True if it is new or materially changed"""
+        address = token.get("tokenAddress")
+        if not address or address in self._seen:
+            return False
+        self._seen.add(address)
+        index = self.index
+        digest = content_hash(token)
+        entry = index.entries.get(address)
+        if entry is None:
+            index.entries[address] = _Entry(digest, key_metrics(token), self.now)
+            self.changes.inserted.append(token)
+            return True
+
+        entry.seen_at = self.now
+        if entry.hash != digest:
+            entry.hash = digest
+            metrics_now = key_metrics(token)
+            if index.material(entry.metrics, metrics_now):
+                entry.metrics = metrics_now
+                entry.emitted_at = self.now
+                self.changes.updated.append(token)
+                return True
+        if self.now - entry.emitted_at >= index.refresh_age:
+            # Unchanged for a long time, processed again so its prices keep being sampled
+            entry.emitted_at = self.now
+            self.changes.updated.append(token)
+            return True
+        self.changes.unchanged += 1
+        return False
+
+    def finish(self):
+        """Expires tokens missing for `remove_age` and reports the cycle"""
+        index = self.index
+        cutoff = self.now - index.remove_age
+        removed = [address for address, entry in index.entries.items() if entry.seen_at < cutoff]
+        for address in removed:
+            del index.entries[address]
+            index.raw.pop(address, None)
+        self.changes.removed = removed
+
+        changes = self.changes
+        CHURN_RATIO.set(changes.churn)
+        CHANGES.labels("inserted").inc(len(changes.inserted))
+        CHANGES.labels("updated").inc(len(changes.updated))
+        CHANGES.labels("removed").inc(len(removed))
+        CHANGES.labels("unchanged").inc(changes.unchanged)
+        logger.info(f"Snapshot changes: {changes.summary()}")
+        return changes
+
+
+class SnapshotIndex:
+    """Change data capture between snapshots.
+
+    Works at two levels. Feed items are hashed before enrichment, and only
+    new or changed ones, or ones last enriched `enrich_age` seconds ago, are
+    enriched and sampled into the history store (`ChangeTracker.select`).
+    Raw items only carry boosts, so a price move of an unchanged item shows
+    up within `enrich_age`. Enriched tokens are then diffed on their key
+    metrics (`ChangeTracker.feed`) and only the changed ones go on to pump
+    detection and analysis. A token is passed on when it is new, when one of its
+    key metrics moved by at least its threshold (any content change counts
+    for tokens without metrics), or when it was last passed on
+    `refresh_age` seconds ago. Feeds are polled on their own schedules, so a
+    token only counts as removed after `remove_age` seconds without being
+    seen in any snapshot.
+    """
+
+    def __init__(self, thresholds=None, refresh_age=None, remove_age=None, enrich_age=None):
+        self.thresholds = thresholds if thresholds is not None else parse_thresholds(settings.CDC_THRESHOLDS)
+        self._limits = tuple(self.thresholds.get(name) for name in METRICS)
+        self.refresh_age = refresh_age if refresh_age is not None else settings.CDC_REFRESH_AGE
+        self.remove_age = remove_age if remove_age is not None else settings.CDC_REMOVE_AGE
+        self.enrich_age = enrich_age if enrich_age is not None else settings.CDC_ENRICH_AGE
+        self.entries = {}
+        self.raw = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def material(self, before, after):
+        if all(value is None for value in before + after):
+            return True
+        for old, new, limit in zip(before, after, self._limits):
+            if (old is None) != (new is None):
+                return True
+            if old is None or limit is None:
+                continue
+            if old == 0:
+                if new != 0:
+                    return True
+            elif abs(new - old) / abs(old) >= limit:
+                return True
+        return False
+
+    def begin(self, now=None):
+        return ChangeTracker(self, now or time.time())
+
+    def diff(self, tokens, now=None):
+        """Diffs already enriched tokens"""
+        tracker = self.begin(now)
+        for token in tokens:
+            tracker.feed(token)
+        return tracker.finish()
@@ -1,61 +1,262 @@
 import asyncio
-import aiohttp
+import hashlib
+import json
 import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Optional
 from utils.config import settings
-import os
-import json
+from utils.http_client import HttpClient
+from utils.metrics import metrics
+from utils.snapshots import SNAPSHOT_EXTENSION, write_snapshot
 from datetime import datetime
 
 # Configure logging to display INFO-level messages
 logging.basicConfig(level=logging.INFO)
 
+FETCH_LATENCY = metrics.histogram("collector_fetch_seconds", "DexScreener feed fetch time", ["endpoint"],
+                                  buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+FETCH_RESULTS = metrics.counter("collector_fetches", "Feed fetches by outcome (changed, unchanged, not_modified, error)",
+                                ["endpoint", "result"])
+FEED_AGE = metrics.gauge("collector_feed_age_seconds", "Seconds since a feed last changed", ["endpoint"])
+FEED_INTERVAL = metrics.gauge("collector_poll_interval_seconds", "Current poll interval of a feed", ["endpoint"])
+FEED_CHURN = metrics.gauge("collector_feed_churn", "EWMA share of new items per changed response of a feed", ["endpoint"])
+
+
+def parse_intervals(spec):
+    """"token-boosts/latest/v1=30,token-profiles/latest/v1=60" -> {endpoint: seconds}"""
+    intervals = {}
+    for item in spec.split(","):
+        endpoint, _, seconds = item.partition("=")
+        if endpoint.strip() and seconds.strip():
+            intervals[endpoint.strip()] = float(seconds)
+    return intervals
+
+
+def _item_key(item):
+    if isinstance(item, dict) and (item.get("tokenAddress") or item.get("url")):
+        return item.get("tokenAddress") or item.get("url")
+    return json.dumps(item, sort_keys=True)
+
+
+@dataclass
+class FeedState:
+    """Polling schedule and change tracking of one endpoint"""
+    endpoint: str
+    base_interval: float            # poll interval of a quiet feed, also the upper bound
+    min_interval: float
+    interval: float = 0.0
+    next_due: float = 0.0           # monotonic time of the next fetch
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    keys: frozenset = frozenset()
+    items: list = field(default_factory=list)
+    churn: float = 0.0              # EWMA of the share of new items per changed response
+    changed_at: Optional[float] = None
+    emitted_at: Optional[float] = None
+    stats: dict = field(default_factory=lambda: {"fetches": 0, "changed": 0, "unchanged": 0,
+                                                 "not_modified": 0, "errors": 0, "latency": None})
+
+    def __post_init__(self):
+        self.interval = self.interval or self.base_interval
+        FEED_AGE.labels(self.endpoint).set_function(
+            lambda: time.monotonic() - self.changed_at if self.changed_at is not None else float("nan"))
+        FEED_INTERVAL.labels(self.endpoint).set_function(lambda: self.interval)
+        FEED_CHURN.labels(self.endpoint).set_function(lambda: self.churn)
+
+
 class DataCollector:
-    def __init__(self, endpoints):
+    """Polls the DexScreener feeds, each on its own schedule.
+
+    Due feeds are fetched concurrently. Responses carrying the last ETag or
+    Last-Modified come back as 304, and bodies identical to the previous one
+    are recognized by hash; either way the feed's tokens are not handed
+    downstream again until `refresh_interval` has passed. A feed whose
+    responses bring many new tokens is polled up to `min_interval`; a quiet
+    feed drifts back to its base interval.
+    """
+
+    # A changed response with at least this share of new items tightens the interval
+    CHURN_HIGH = 0.2
+    CHURN_ALPHA = 0.3
+    # Feeds due within this many seconds of each other are fetched as one snapshot
+    COALESCE = 1.0
+
+    def __init__(self, endpoints, http=None, intervals=None, jitter=None, min_interval=None, refresh_interval=None):
         self.base_url = "https://api.dexscreener.com/"  # Можно также использовать settings.DEX_URL
-        self.endpoints = endpoints
+        self.endpoints = [endpoint for endpoint in endpoints if endpoint]
+        self.http = http or HttpClient()
+        intervals = intervals if intervals is not None else parse_intervals(settings.ENDPOINT_INTERVALS)
+        self.jitter = jitter if jitter is not None else settings.COLLECT_JITTER
+        min_interval = min_interval if min_interval is not None else settings.COLLECT_MIN_INTERVAL
+        # Unchanged feeds are still re-emitted this often, so their prices keep being sampled
+        self.refresh_interval = refresh_interval if refresh_interval is not None else settings.COLLECT_INTERVAL
+        self.feeds = {}
+        for endpoint in self.endpoints:
+            base = intervals.get(endpoint, settings.COLLECT_INTERVAL)
+            self.feeds[endpoint] = FeedState(endpoint, base, min(min_interval, base))
+
+    def _schedule(self, feed, now, delay=None):
+        delay = feed.interval if delay is None else delay
+        feed.next_due = now + delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _adapt(self, feed, changed, new_share=0.0):
+        if changed:
+            feed.churn = self.CHURN_ALPHA * new_share + (1 - self.CHURN_ALPHA) * feed.churn
+            if new_share >= self.CHURN_HIGH:
+                feed.interval = max(feed.min_interval, feed.interval / 2)
+        else:
+            feed.interval = min(feed.base_interval, feed.interval * 1.25)
 
-    async def fetch_data(self, session, endpoint):
-        url = f"{self.base_url}{endpoint}"
+    async def fetch_feed(self, feed):
+        """Fetches one feed; returns its items if the content changed, else None"""
+        url = f"{self.base_url}{feed.endpoint}"
+        headers = {}
+        if feed.etag:
+            headers["If-None-Match"] = feed.etag
+        if feed.last_modified:
+            headers["If-Modified-Since"] = feed.last_modified
+
+        started = time.monotonic()
+        feed.stats["fetches"] += 1
         try:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    # Проверяем, является ли data словарём
-                    if isinstance(data, dict):
-                        return data
-                    # Если data — список, обрабатываем его
-                    elif isinstance(data, list):
-                        return {'data': data}
-                    else:
-                        logging.error(f"Unexpected data type received from {url}: {type(data)}")
-                        return None
-                else:
-                    logging.error(f"Failed to fetch data from {url}. Status: {response.status}")
-                    return None
+            async with self.http.session.get(url, headers=headers) as response:
+                status = response.status
+                body = await response.read() if status == 200 else None
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                retry_after = response.headers.get("Retry-After")
         except Exception as e:
             logging.error(f"Error fetching data from {url}: {e}")
-            return None
+            return self._record(feed, "error")
+        finally:
+            feed.stats["latency"] = time.monotonic() - started
+            FETCH_LATENCY.labels(feed.endpoint).observe(feed.stats["latency"])
+
+        if status == 304:
+            return self._record(feed, "not_modified")
+        if status != 200:
+            logging.error(f"Failed to fetch data from {url}. Status: {status}")
+            if status == 429 or status >= 500:
+                # Back off this feed only
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else feed.interval * 2
+                self._schedule(feed, time.monotonic(), min(delay, feed.base_interval * 4))
+            return self._record(feed, "error")
+        feed.etag, feed.last_modified = etag, last_modified
+
+        content_hash = hashlib.blake2b(body, digest_size=16).hexdigest()
+        if content_hash == feed.content_hash:
+            return self._record(feed, "unchanged")
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            logging.error(f"Invalid JSON from {url}: {e}")
+            return self._record(feed, "error")
+        # Проверяем, является ли data словарём или списком
+        if isinstance(data, dict):
+            items = data.get('data', [])
+        elif isinstance(data, list):
+            items = data
+        else:
+            logging.error(f"Unexpected data type received from {url}: {type(data)}")
+            return self._record(feed, "error")
+
+        keys = frozenset(_item_key(item) for item in items)
+        if feed.content_hash is not None:
+            self._adapt(feed, True, len(keys - feed.keys) / len(keys) if keys else 0.0)
+        feed.content_hash, feed.keys, feed.items = content_hash, keys, items
+        feed.changed_at = time.monotonic()
+        self._record(feed, "changed")
+        return items
+
+    def _record(self, feed, result):
+        feed.stats["errors" if result == "error" else result] += 1
+        FETCH_RESULTS.labels(feed.endpoint, result).inc()
+        if result in ("unchanged", "not_modified"):
+            self._adapt(feed, False)
+        return None
+
+    def due(self, now=None):
+        now = now or time.monotonic()
+        return [feed for feed in self.feeds.values() if feed.next_due <= now]
+
+    def next_due_in(self, now=None):
+        """Seconds until the next feed is due"""
+        if not self.feeds:
+            return self.refresh_interval
+        now = now or time.monotonic()
+        return max(0.0, min(feed.next_due for feed in self.feeds.values()) - now)
+
+    async def _poll(self, feed):
+        scheduled = feed.next_due
+        try:
+            items = await self.fetch_feed(feed)
+        except Exception as e:
+            logging.error(f"Error collecting data from {feed.endpoint}: {e}")
+            items = None
+        now = time.monotonic()
+        if feed.next_due == scheduled:
+            # Not rescheduled by a backoff
+            self._schedule(feed, now)
+        if items is None and feed.items and (feed.emitted_at is None or now - feed.emitted_at >= self.refresh_interval):
+            items = feed.items
+        if items is not None:
+            feed.emitted_at = now
+        return items
+
+    async def collect_once(self, feeds=None):
+        """Fetches the due feeds (all of them by default) concurrently.
+
+        Returns the combined tokens of the feeds that changed or are due for
+        a refresh, empty if nothing new arrived.
+        """
+        feeds = feeds if feeds is not None else list(self.feeds.values())
+        results = await asyncio.gather(*(self._poll(feed) for feed in feeds))
+        collected_data = []
+        seen = set()
+        for feed, items in zip(feeds, results):
+            if items is None:
+                continue
+            logging.info(f"Fetched {len(items)} items from {feed.endpoint} "
+                         f"(churn {feed.churn:.2f}, next poll in {feed.interval:.0f}s)")
+            for item in items:
+                key = _item_key(item)
+                if key not in seen:
+                    seen.add(key)
+                    collected_data.append(item)
+        return collected_data
+
+    async def snapshots(self):
+        """Yields a token list whenever a due feed brings new data"""
+        while True:
+            await asyncio.sleep(self.next_due_in())
+            feeds = self.due(time.monotonic() + self.COALESCE)
+            if not feeds:
+                continue
+            collected_data = await self.collect_once(feeds)
+            if collected_data:
+                yield collected_data
+
+    def feed_stats(self):
+        """Per-feed schedule, latency and freshness for status reports; the same figures are
+        exported as the collector_* metrics"""
+        now = time.monotonic()
+        return {
+            feed.endpoint: {
+                **feed.stats,
+                "interval": feed.interval,
+                "churn": round(feed.churn, 3),
+                "age": None if feed.changed_at is None else now - feed.changed_at,
+            }
+            for feed in self.feeds.values()
+        }
 
     async def collect_data(self):
-        async with aiohttp.ClientSession() as session:
-            while True:
-                collected_data = []
-                for endpoint in self.endpoints:
-                    try:
-                        data = await self.fetch_data(session, endpoint)
-                        if data and isinstance(data, dict):
-                            logging.info(f"Successfully fetched data from {endpoint}")
-                            collected_data.extend(data.get('data', []))
-                    except Exception as e:
-                        logging.error(f"Error collecting data from {endpoint}: {e}")
-                
-                if collected_data:
-                    os.makedirs(settings.RAW_DATA_FILEPATH, exist_ok=True)
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"{settings.RAW_DATA_FILEPATH}/data_{timestamp}.json"
-                    with open(filename, "w") as f:
-                        json.dump(collected_data, f, indent=4)
-                    logging.info(f"Data successfully saved to {filename}")
-                
-                # Wait 60 seconds before next collection
-                await asyncio.sleep(900)
+        """File-handoff mode: writes every snapshot to RAW_DATA_FILEPATH for the watchdog"""
+        async for collected_data in self.snapshots():
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"{settings.RAW_DATA_FILEPATH}/data_{timestamp}{SNAPSHOT_EXTENSION}"
+            await asyncio.to_thread(write_snapshot, filename, collected_data)
+            logging.info(f"Data successfully saved to {filename}")
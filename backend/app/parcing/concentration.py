@@ -0,0 +1,144 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List
+import numpy as np
+from utils.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_top_n(spec):
+    """"10,50" -> (10, 50)"""
+    return tuple(sorted({int(n) for n in spec.split(",") if n.strip()}))
+
+
+class HolderBook:
+    """Token amounts per owner, built page by page from getTokenAccounts.
+
+    Owners holding several token accounts are merged. Amounts stay in one
+    float64 array (raw units, only ratios are taken from them), so a 10k
+    holder scan costs a few hundred KB instead of the raw responses.
+    """
+
+    def __init__(self):
+        self.owners: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._codes = []
+        self._amounts = []
+
+    def __len__(self):
+        return len(self.owners)
+
+    def add_page(self, accounts):
+        """Adds the owners and amounts of one getTokenAccounts page, returns its owners"""
+        index = self._index
+        owners = []
+        for account in accounts:
+            owner = account["owner"]
+            code = index.get(owner)
+            if code is None:
+                code = index[owner] = len(self.owners)
+                self.owners.append(owner)
+            self._codes.append(code)
+            self._amounts.append(float(account.get("amount") or 0))
+            owners.append(owner)
+        return owners
+
+    @property
+    def amounts(self):
+        """Total amount per owner, aligned with `owners`"""
+        if not self._codes:
+            return np.zeros(0)
+        return np.bincount(np.asarray(self._codes, dtype=np.int64),
+                           weights=np.asarray(self._amounts, dtype=np.float64), minlength=len(self.owners))
+
+
+@dataclass
+class Concentration:
+    """Holder concentration of one mint; shares are fractions of the supply"""
+    holders: int
+    supply: float
+    top_shares: Dict[int, float] = field(default_factory=dict)
+    gini: float = 0.0
+    largest_share: float = 0.0
+    wallets_above: int = 0          # wallets holding more than `wallet_share` of the supply
+    wallet_share: float = 0.0
+    eligible: int = 0               # holders passing the position-size pre-filter
+    min_position_share: float = 0.0
+    truncated: bool = False
+
+    def as_dict(self):
+        return {
+            "holders": self.holders,
+            "supply": self.supply,
+            **{f"top{n}_share": round(share, 6) for n, share in self.top_shares.items()},
+            "gini": round(self.gini, 6),
+            "largest_share": round(self.largest_share, 6),
+            "wallets_above": self.wallets_above,
+            "wallet_share": self.wallet_share,
+            "eligible": self.eligible,
+            "min_position_share": self.min_position_share,
+            "truncated": self.truncated,
+        }
+
+
+def gini(amounts):
+    """Gini coefficient of non-negative amounts, 0 for an even split, towards 1 for one holder"""
+    n = len(amounts)
+    total = float(amounts.sum()) if n else 0.0
+    if n < 2 or total <= 0:
+        return 0.0
+    ranked = np.sort(amounts)
+    return float(2 * np.dot(np.arange(1, n + 1), ranked) / (n * total) - (n + 1) / n)
+
+
+def concentration(amounts, supply=None, top_n=None, wallet_share=None, min_position_share=None, truncated=False):
+    """Concentration metrics of a holder amount array in one vectorized pass.
+
+    `supply` defaults to the sum of the amounts, which undercounts it for a
+    truncated scan; pass the mint supply then.
+    """
+    top_n = top_n if top_n is not None else parse_top_n(settings.CONCENTRATION_TOP_N)
+    wallet_share = wallet_share if wallet_share is not None else settings.CONCENTRATION_WALLET_SHARE
+    min_position_share = (min_position_share if min_position_share is not None
+                          else settings.HOLDER_MIN_POSITION_SHARE)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    supply = float(supply) if supply else float(amounts.sum())
+    result = Concentration(len(amounts), supply, wallet_share=wallet_share,
+                           min_position_share=min_position_share, truncated=truncated)
+    if not len(amounts) or supply <= 0:
+        return result
+
+    shares = amounts / supply
+    # Only the largest max(top_n) positions need ordering
+    k = min(max(top_n, default=0), len(shares))
+    if k:
+        cumulative = np.cumsum(np.sort(np.partition(shares, len(shares) - k)[len(shares) - k:])[::-1])
+        result.top_shares = {n: float(cumulative[min(n, k) - 1]) for n in top_n}
+    result.largest_share = float(shares.max())
+    result.gini = gini(amounts)
+    result.wallets_above = int(np.count_nonzero(shares > wallet_share))
+    result.eligible = int(np.count_nonzero(position_mask(shares, min_position_share)))
+    return result
+
+
+def position_mask(shares, min_position_share):
+    """Holders whose position is large enough to be worth valuing their wallet"""
+    if not min_position_share:
+        return shares > 0
+    return shares >= min_position_share
+
+
+def eligible_owners(owners, amounts, supply=None, min_position_share=None):
+    """Owners passing the position-size pre-filter, as a set.
+
+    Without usable amounts (no supply) every owner passes, so a response
+    lacking them degrades to valuing everyone rather than no one.
+    """
+    min_position_share = (min_position_share if min_position_share is not None
+                          else settings.HOLDER_MIN_POSITION_SHARE)
+    supply = float(supply) if supply else float(amounts.sum())
+    if supply <= 0:
+        return set(owners)
+    return {owners[i] for i in np.flatnonzero(position_mask(amounts / supply, min_position_share))}
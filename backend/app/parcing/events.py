@@ -0,0 +1,150 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import List
+from utils.config import settings
+from utils.metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "coalesce")
+
+QUEUE_DEPTH = metrics.gauge("queue_depth", "Items waiting in an internal queue", ["queue"])
+EVENTS_DROPPED = metrics.counter("whale_events_dropped", "Whale events dropped by a full consumer buffer")
+
+
+@dataclass
+class WhaleEvent:
+    """A balance change of one watched account"""
+    address: str
+    slot: int
+    lamports: int
+    change: int                     # lamports since the previous notification, 0 without a baseline
+    sol_price: float
+    tokens: List[str] = field(default_factory=list)   # mints the whale was found in
+    received_at: float = field(default_factory=time.time)
+
+    @property
+    def amount_usd(self):
+        return abs(self.change) / 1e9 * self.sol_price
+
+    def merge(self, newer):
+        """One event covering this one and `newer` for the same account"""
+        return replace(newer, change=self.change + newer.change)
+
+
+class EventConsumer:
+    """One reader of an EventHub with its own bounded buffer.
+
+    Use as `async with hub.subscribe() as events: async for event in events`.
+    When the buffer is full, `block` makes the publisher wait, `drop_oldest`
+    discards the oldest buffered event and `coalesce` merges events of the
+    same account into one (dropping the oldest account if a new one arrives).
+    """
+
+    def __init__(self, hub, maxsize, overflow):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}")
+        self.hub = hub
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self._items = OrderedDict()
+        self._seq = itertools.count()
+        self._condition = asyncio.Condition()
+        self._closed = False
+        self.stats = {"received": 0, "dropped": 0, "coalesced": 0}
+
+    def __len__(self):
+        return len(self._items)
+
+    async def put(self, event):
+        async with self._condition:
+            self.stats["received"] += 1
+            if self.overflow == "coalesce":
+                previous = self._items.get(event.address)
+                if previous is not None:
+                    self._items[event.address] = previous.merge(event)
+                    self.stats["coalesced"] += 1
+                    return
+            if len(self._items) >= self.maxsize:
+                if self.overflow == "block":
+                    await self._condition.wait_for(lambda: len(self._items) < self.maxsize or self._closed)
+                    if self._closed:
+                        return
+                else:
+                    self._items.popitem(last=False)
+                    self.stats["dropped"] += 1
+                    EVENTS_DROPPED.inc()
+            key = event.address if self.overflow == "coalesce" else next(self._seq)
+            self._items[key] = event
+            self._condition.notify_all()
+
+    async def get(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._items or self._closed)
+            if not self._items:
+                raise StopAsyncIteration
+            _, event = self._items.popitem(last=False)
+            self._condition.notify_all()
+            return event
+
+    async def close(self):
+        self.hub.unsubscribe(self)
+        async with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class EventHub:
+    """Fans whale events out to any number of consumers.
+
+    Notifications repeated for the same (account, slot), e.g. by overlapping
+    subscriptions around a reconnect, are published once.
+    """
+
+    def __init__(self, dedup_size=4096):
+        self.consumers = []
+        self.dedup_size = dedup_size
+        self._seen = OrderedDict()
+        self.stats = {"published": 0, "duplicates": 0}
+        QUEUE_DEPTH.labels("whale_events").set_function(lambda: sum(len(consumer) for consumer in self.consumers))
+
+    def subscribe(self, maxsize=None, overflow=None):
+        consumer = EventConsumer(self, maxsize or settings.EVENT_QUEUE_SIZE, overflow or settings.EVENT_OVERFLOW)
+        self.consumers.append(consumer)
+        return consumer
+
+    def unsubscribe(self, consumer):
+        if consumer in self.consumers:
+            self.consumers.remove(consumer)
+
+    def is_duplicate(self, address, slot):
+        key = (address, slot)
+        if key in self._seen:
+            self.stats["duplicates"] += 1
+            return True
+        self._seen[key] = None
+        if len(self._seen) > self.dedup_size:
+            self._seen.popitem(last=False)
+        return False
+
+    async def publish(self, event):
+        self.stats["published"] += 1
+        for consumer in list(self.consumers):
+            await consumer.put(event)
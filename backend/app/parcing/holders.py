@@ -0,0 +1,78 @@
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Set
+from utils.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HolderScan:
+    """Result of one holder scan compared with the previous one for the same mint"""
+    mint: str
+    owners: Set[str]
+    new: Set[str]
+    departed: Set[str]
+    previous_wealthy: Set[str] = field(default_factory=set)
+    incremental: bool = False
+    truncated: bool = False
+
+
+class HolderIndex:
+    """Per-mint holder sets persisted between runs, one JSON file per mint.
+
+    Besides the owners, each entry keeps the wealthy holders found last time,
+    so a re-scan only has to value the holders that changed.
+    """
+
+    def __init__(self, path=None, max_age=None):
+        self.path = path or settings.HOLDER_INDEX_PATH
+        self.max_age = max_age if max_age is not None else settings.HOLDER_INDEX_MAX_AGE
+
+    def _file(self, mint):
+        return os.path.join(self.path, f"{mint}.json")
+
+    def load(self, mint) -> Optional[dict]:
+        try:
+            with open(self._file(mint), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not load holder index for {mint}: {e}")
+            return None
+
+    def save(self, mint, owners, wealthy):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = f"{self._file(mint)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "mint": mint,
+                "updated_at": time.time(),
+                "owners": list(owners),
+                "wealthy": list(wealthy),
+            }, f)
+        os.replace(tmp_path, self._file(mint))
+
+    def compare(self, mint, owners, truncated=False) -> HolderScan:
+        """Diffs a fresh owner set against the stored one"""
+        entry = self.load(mint)
+        fresh = entry is not None and time.time() - entry.get("updated_at", 0) <= self.max_age
+        if not fresh:
+            return HolderScan(mint, owners, new=set(owners), departed=set(), truncated=truncated)
+
+        previous = set(entry.get("owners", []))
+        return HolderScan(
+            mint,
+            owners,
+            new=owners - previous,
+            # A capped scan can't tell departed holders from unseen ones
+            departed=set() if truncated else previous - owners,
+            previous_wealthy=set(entry.get("wealthy", [])),
+            incremental=True,
+            truncated=truncated,
+        )
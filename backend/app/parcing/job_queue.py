@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+from utils.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mint TEXT NOT NULL,
+    partition INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,               -- queued, leased, done, failed, cancelled
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+-- Per-mint partitioning: at most one live job per mint
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_live_mint ON jobs(mint) WHERE status IN ('queued', 'leased');
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(status, available_at, priority);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL,
+    mint TEXT NOT NULL,
+    result TEXT NOT NULL,
+    holders INTEGER,
+    worker TEXT,
+    consumed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_pending ON results(consumed, id);
+"""
+
+
+@dataclass
+class LeasedJob:
+    id: int
+    mint: str
+    payload: dict
+    attempts: int
+    lease_owner: str
+    lease_expires: float
+
+
+def partition_of(mint, partitions):
+    return zlib.crc32(mint.encode()) % partitions
+
+
+class SqliteJobQueue:
+    """Durable whale analysis queue in a local SQLite file.
+
+    Any number of processes can open the same file: the orchestrator
+    enqueues mints and collects results, workers lease jobs. A lease
+    expires unless renewed by `heartbeat`, so the job of a crashed worker
+    is picked up again. Failed jobs are retried with exponential backoff up
+    to `max_attempts`. Mints are hashed into `partitions`; a worker leases
+    from its preferred partitions first, keeping holder and balance caches
+    warm, and steals from the others when those are empty.
+
+    Worker processes on other hosts need the file on a volume with working
+    POSIX locks (a shared local disk, not NFS).
+
+    Every call is blocking; call it through `asyncio.to_thread`.
+    """
+
+    def __init__(self, path=None, lease_seconds=None, max_attempts=None, retry_base=None, partitions=None):
+        self.path = path or settings.ANALYSIS_QUEUE_PATH
+        self.lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self.retry_base = retry_base if retry_base is not None else settings.JOB_RETRY_BASE
+        self.partitions = partitions or settings.JOB_PARTITIONS
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return db
+
+    class _Transaction:
+        def __init__(self, db):
+            self.db = db
+
+        def __enter__(self):
+            # Takes the write lock up front, so concurrent leases never race
+            self.db.execute("BEGIN IMMEDIATE")
+            return self.db
+
+        def __exit__(self, exc_type, exc, tb):
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+    def _transaction(self):
+        return self._Transaction(self._connection())
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    # Producer side
+
+    def enqueue(self, mint, payload=None, priority=0.0, now=None):
+        """Queues an analysis of `mint`; False if one is already queued or running"""
+        now = now or time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO jobs (mint, partition, payload, priority, status, available_at, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (mint, partition_of(mint, self.partitions), json.dumps(payload or {}), priority, now, now, now),
+            )
+            if cursor.rowcount:
+                return True
+            # Already live: keep the job, but let the newer snapshot set its priority
+            db.execute("UPDATE jobs SET priority = MIN(priority, ?), payload = ?, updated_at = ? "
+                       "WHERE mint = ? AND status = 'queued'", (priority, json.dumps(payload or {}), now, mint))
+            return False
+
+    def cancel(self, mints, now=None):
+        """Drops queued jobs of `mints` and flags leased ones, whose workers stop at the next heartbeat"""
+        now = now or time.time()
+        mints = list(mints)
+        if not mints:
+            return 0
+        with self._transaction() as db:
+            cancelled = 0
+            for offset in range(0, len(mints), 500):
+                chunk = mints[offset:offset + 500]
+                marks = ",".join("?" * len(chunk))
+                cancelled += db.execute(
+                    f"UPDATE jobs SET status = 'cancelled', updated_at = ? "
+                    f"WHERE mint IN ({marks}) AND status IN ('queued', 'leased')", (now, *chunk)).rowcount
+            return cancelled
+
+    def live_mints(self):
+        db = self._connection()
+        return {row["mint"] for row in db.execute("SELECT mint FROM jobs WHERE status IN ('queued', 'leased')")}
+
+    def claim_results(self, limit=100):
+        """Published results not handed out before, oldest first"""
+        with self._transaction() as db:
+            rows = db.execute("SELECT * FROM results WHERE consumed = 0 ORDER BY id LIMIT ?", (limit,)).fetchall()
+            if rows:
+                db.execute(f"UPDATE results SET consumed = 1 WHERE id IN ({','.join('?' * len(rows))})",
+                           [row["id"] for row in rows])
+        return [{"job_id": row["job_id"], "mint": row["mint"], "result": json.loads(row["result"]),
+                 "holders": row["holders"], "worker": row["worker"]} for row in rows]
+
+    def counts(self):
+        db = self._connection()
+        counts = {row["status"]: row["n"] for row in db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+        counts["results_pending"] = db.execute("SELECT COUNT(*) FROM results WHERE consumed = 0").fetchone()[0]
+        return counts
+
+    def prune(self, older_than=86400, now=None):
+        """Deletes finished jobs and consumed results older than `older_than` seconds"""
+        cutoff = (now or time.time()) - older_than
+        with self._transaction() as db:
+            jobs = db.execute("DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND updated_at < ?",
+                              (cutoff,)).rowcount
+            results = db.execute("DELETE FROM results WHERE consumed = 1 AND created_at < ?", (cutoff,)).rowcount
+        return jobs, results
+
+    # Worker side
+
+    def lease(self, worker_id, preferred=(), now=None) -> Optional[LeasedJob]:
+        """Leases the most urgent ready job, preferring `preferred` partitions.
+
+        Jobs whose lease ran out are ready again. A job leased for the
+        `max_attempts`-th time without finishing is marked failed.
+        """
+        now = now or time.time()
+        preferred = list(preferred)
+        prefer = f"partition IN ({','.join('?' * len(preferred))}) DESC, " if preferred else ""
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET status = 'failed', error = 'lease expired too often', updated_at = ? "
+                       "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                       (now, now, self.max_attempts))
+            row = db.execute(
+                f"SELECT id, mint, payload, attempts FROM jobs "
+                f"WHERE (status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires < ?) "
+                f"ORDER BY {prefer}priority, id LIMIT 1",
+                (now, now, *preferred),
+            ).fetchone()
+            if row is None:
+                return None
+            expires = now + self.lease_seconds
+            db.execute("UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                       "attempts = attempts + 1, updated_at = ? WHERE id = ?", (worker_id, expires, now, row["id"]))
+        return LeasedJob(row["id"], row["mint"], json.loads(row["payload"]), row["attempts"] + 1, worker_id, expires)
+
+    def heartbeat(self, job, now=None):
+        """Extends the lease; False if the job was cancelled or taken over"""
+        now = now or time.time()
+        expires = now + self.lease_seconds
+        with self._transaction() as db:
+            renewed = db.execute("UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                                 "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                 (expires, now, job.id, job.lease_owner)).rowcount
+        if renewed:
+            job.lease_expires = expires
+        return bool(renewed)
+
+    def complete(self, job, result, holders=None, now=None):
+        """Marks the job done and publishes its result; False if the lease was lost"""
+        now = now or time.time()
+        with self._transaction() as db:
+            done = db.execute("UPDATE jobs SET status = 'done', lease_expires = NULL, updated_at = ? "
+                              "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                              (now, job.id, job.lease_owner)).rowcount
+            if done:
+                db.execute("INSERT INTO results (job_id, mint, result, holders, worker, created_at) "
+                           "VALUES (?, ?, ?, ?, ?, ?)",
+                           (job.id, job.mint, json.dumps(result), holders, job.lease_owner, now))
+        return bool(done)
+
+    def fail(self, job, error, now=None):
+        """Re-queues the job with exponential backoff, or marks it failed after `max_attempts`"""
+        now = now or time.time()
+        if job.attempts >= self.max_attempts:
+            status, available_at = "failed", now
+        else:
+            delay = self.retry_base * 2 ** (job.attempts - 1)
+            status, available_at = "queued", now + delay * random.uniform(0.8, 1.2)
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                       "error = ?, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                       (status, available_at, str(error)[:500], now, job.id, job.lease_owner))
+        return status
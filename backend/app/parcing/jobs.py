@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+from utils.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AnalysisRecord:
+    """Outcome of the last completed whale analysis of one mint"""
+    mint: str
+    analyzed_at: float
+    wealthy_holders: List[str] = field(default_factory=list)
+    price: Optional[float] = None       # token price when the analysis was queued
+    holders: Optional[int] = None       # holder count found by the scan
+    concentration: Optional[dict] = None  # holder concentration metrics, see parcing.concentration
+
+
+def _as_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+class JobRegistry:
+    """Whale analyses keyed by mint, so each mint is scanned once per change.
+
+    `check` tells whether a mint needs a new analysis: not while one is in
+    flight, and not while the last result is younger than `ttl`, unless the
+    price moved by more than `price_change` (relative) since then. The holder
+    count is only known after a scan, so `holder_change` is applied by the
+    analysis itself, see `analysis_holder_change`. Completed results are kept
+    in a JSON index that survives restarts.
+    """
+
+    def __init__(self, path=None, ttl=None, price_change=None, holder_change=None):
+        self.path = path if path is not None else settings.ANALYSIS_INDEX_PATH
+        self.ttl = ttl if ttl is not None else settings.ANALYSIS_TTL
+        self.price_change = price_change if price_change is not None else settings.ANALYSIS_PRICE_CHANGE
+        self.holder_change = holder_change if holder_change is not None else settings.ANALYSIS_HOLDER_CHANGE
+        self.records = {}
+        self.in_flight = {}
+        self.stats = {"new": 0, "refreshed": 0, "in_flight": 0, "fresh": 0}
+        self._save_lock = threading.Lock()
+        self.load()
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, mint):
+        return self.records.get(mint)
+
+    @staticmethod
+    def _moved(before, now, threshold):
+        return before and now and threshold and abs(now - before) / before >= threshold
+
+    def analysis_holder_change(self, reason):
+        """`holder_change` for WhaleTracker.analyze_token: an expired result is only
+        re-valued when its holders moved, new and repriced mints always are"""
+        return self.holder_change if reason == "expired" else None
+
+    def check(self, mint, price=None, now=None):
+        """Reason to analyze `mint` now ("new", "expired", "price"), None to skip it"""
+        if mint in self.in_flight:
+            self.stats["in_flight"] += 1
+            return None
+        record = self.records.get(mint)
+        if record is None:
+            reason = "new"
+        elif (now or time.time()) - record.analyzed_at >= self.ttl:
+            reason = "expired"
+        elif self._moved(record.price, _as_float(price), self.price_change):
+            reason = "price"
+        else:
+            self.stats["fresh"] += 1
+            return None
+        self.stats["new" if record is None else "refreshed"] += 1
+        return reason
+
+    def begin(self, mint, job):
+        self.in_flight[mint] = job
+
+    def end(self, mint, job):
+        if self.in_flight.get(mint) is job:
+            del self.in_flight[mint]
+
+    def complete(self, mint, wealthy_holders, price=None, holders=None, concentration=None, now=None):
+        self.records[mint] = AnalysisRecord(mint, now or time.time(), list(wealthy_holders or []),
+                                            _as_float(price), holders, concentration)
+
+    # Persistence
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load analysis index from {self.path}: {e}")
+            return
+        for entry in entries:
+            self.records[entry["mint"]] = AnalysisRecord(**entry)
+        logger.info(f"Loaded {len(self.records)} analysis results from {self.path}")
+
+    def save(self):
+        """Writes the index; runs in a worker thread, so it works on a copy"""
+        if not self.path:
+            return
+        with self._save_lock:
+            entries = [asdict(record) for record in list(self.records.values())]
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
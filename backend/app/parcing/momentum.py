@@ -0,0 +1,197 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict
+import numpy as np
+from storage.history import WINDOWS
+from utils.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = {"m5": 300, "h1": 3600, "h6": 6 * 3600, "h24": 24 * 3600}
+
+# Features besides the per-window returns
+FEATURES = ("volume", "liquidity", "imbalance")
+
+
+def parse_weights(spec):
+    """"m5=1,h1=1,volume=0.25" -> {"m5": 1.0, "h1": 1.0, "volume": 0.25}"""
+    weights = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        name = name.strip()
+        if name not in WINDOWS and name not in FEATURES:
+            raise ValueError(f"Unknown momentum weight {name!r}, expected one of {WINDOWS + FEATURES}")
+        weights[name] = float(value)
+    return weights
+
+
+@dataclass
+class MomentumConfig:
+    """Scoring of the momentum detector.
+
+    The score is a weighted sum of the log returns per window, log2 of the
+    volume acceleration, the log liquidity change over the last hour and the
+    buy/sell imbalance. Tokens below `min_liquidity` or `min_volume_h1` are
+    never flagged.
+    """
+    weights: Dict[str, float] = field(default_factory=lambda: parse_weights(settings.MOMENTUM_WEIGHTS))
+    min_score: float = field(default_factory=lambda: settings.MOMENTUM_MIN_SCORE)
+    min_liquidity: float = field(default_factory=lambda: settings.MOMENTUM_MIN_LIQUIDITY)
+    min_volume_h1: float = field(default_factory=lambda: settings.MOMENTUM_MIN_VOLUME_H1)
+    top_n: int = field(default_factory=lambda: settings.MOMENTUM_TOP_N)
+    # A past row counts for a window if it is at most this fraction of the window older than the window start
+    tolerance: float = 0.25
+
+
+@dataclass
+class MomentumFrame:
+    """Features of every token of one snapshot, arrays aligned by position"""
+    timestamp: int
+    token_ids: np.ndarray
+    features: Dict[str, np.ndarray]
+    score: np.ndarray
+    eligible: np.ndarray
+
+
+class MomentumDetector:
+    """Ranks pumping tokens from the price history store.
+
+    Every feature is a column operation over all tokens of the latest
+    snapshot. Returns are measured against the store's own rows one window
+    ago and fall back to DexScreener's priceChange where the history does
+    not reach back that far (e.g. m5 with a 15 minute collect interval).
+    """
+
+    def __init__(self, store, config=None):
+        self.store = store
+        self.config = config or MomentumConfig()
+
+    def _past_rows(self, ts, tokens, end, at, window, n_ids):
+        """Row of each token at or just before `at`, -1 where there is none within the tolerance"""
+        lo = int(np.searchsorted(ts[:end], at - window * self.config.tolerance, side="left"))
+        hi = int(np.searchsorted(ts[:end], at, side="right"))
+        past = np.full(n_ids, -1, dtype=np.int64)
+        if hi > lo:
+            # Rows are in time order, the latest row per token wins
+            np.maximum.at(past, tokens[lo:hi], np.arange(lo, hi, dtype=np.int64))
+        return past
+
+    def compute(self, timestamp=None):
+        """MomentumFrame for the snapshot taken at `timestamp` (default: the latest one)"""
+        # The features are copies, the column views are only used under the store's lock
+        with self.store.lock:
+            return self._compute(timestamp)
+
+    def _compute(self, timestamp):
+        store = self.store
+        rows = store.rows
+        if not rows:
+            return None
+        ts = store.column("ts", 0, rows)
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.timestamp()
+        at = int(ts[-1]) if timestamp is None else int(timestamp)
+        start = int(np.searchsorted(ts, at, side="left"))
+        end = int(np.searchsorted(ts, at, side="right"))
+        if start == end:
+            return None
+
+        tokens = store.column("token", 0, end)
+        n_ids = len(store.addresses)
+        # One row per token, the last one if a snapshot lists a token twice
+        current = np.full(n_ids, -1, dtype=np.int64)
+        np.maximum.at(current, tokens[start:end], np.arange(start, end, dtype=np.int64))
+        token_ids = np.flatnonzero(current >= 0)
+        rows_now = current[token_ids]
+
+        def now(name):
+            return np.nan_to_num(np.asarray(store.column(name)[rows_now], dtype=np.float64))
+
+        def past(name, past_rows, valid):
+            values = np.zeros(len(token_ids), dtype=np.float64)
+            values[valid] = store.column(name)[past_rows[valid]]
+            return np.nan_to_num(values)
+
+        price = now("price")
+        features = {}
+        past_h1 = None
+        for w in WINDOWS:
+            window = WINDOW_SECONDS[w]
+            past_rows = self._past_rows(ts, tokens, start, at - window, window, n_ids)[token_ids]
+            if w == "h1":
+                past_h1 = past_rows
+            valid = past_rows >= 0
+            past_price = past("price", past_rows, valid)
+            from_history = valid & (past_price > 0)
+            reported = now(f"change_{w}") / 100
+            ratio = np.divide(price, past_price, out=np.ones_like(price), where=from_history)
+            features[f"return_{w}"] = np.where(from_history, ratio - 1, reported)
+
+        # Volume pace of the last hour against the 24h average pace
+        volume_h1 = now("volume_h1")
+        features["volume_accel"] = np.divide(volume_h1 * 24, now("volume_h24"),
+                                             out=np.ones_like(volume_h1), where=now("volume_h24") > 0)
+
+        liquidity = now("liquidity")
+        valid = past_h1 >= 0
+        liquidity_before = past("liquidity", past_h1, valid)
+        has_before = valid & (liquidity_before > 0)
+        features["liquidity_change"] = np.divide(liquidity, liquidity_before, out=np.ones_like(liquidity),
+                                                 where=has_before) - 1
+
+        buys, sells = now("buys_h1"), now("sells_h1")
+        trades = buys + sells
+        features["imbalance"] = np.divide(buys - sells, trades, out=np.zeros_like(trades), where=trades > 0)
+        features["liquidity"] = liquidity
+        features["volume_h1"] = volume_h1
+        features["price"] = price
+
+        weights = self.config.weights
+        score = np.zeros(len(token_ids), dtype=np.float64)
+        for w in WINDOWS:
+            if weights.get(w):
+                score += weights[w] * np.log1p(np.clip(features[f"return_{w}"], -0.99, 100))
+        if weights.get("volume"):
+            score += weights["volume"] * np.clip(np.log2(np.maximum(features["volume_accel"], 1e-3)), -4, 4)
+        if weights.get("liquidity"):
+            score += weights["liquidity"] * np.log1p(np.clip(features["liquidity_change"], -0.99, 100))
+        if weights.get("imbalance"):
+            score += weights["imbalance"] * features["imbalance"]
+
+        eligible = (liquidity >= self.config.min_liquidity) & (volume_h1 >= self.config.min_volume_h1)
+        return MomentumFrame(at, token_ids, features, score, eligible)
+
+    def detect(self, timestamp=None, top_n=None, addresses=None):
+        """Tokens scoring at least `min_score`, highest first, as plain dicts.
+
+        With `addresses` only those tokens can be flagged, e.g. the ones that
+        changed since the last snapshot.
+        """
+        frame = self.compute(timestamp)
+        if frame is None:
+            return []
+        candidates = frame.eligible & (frame.score >= self.config.min_score)
+        if addresses is not None:
+            ids = [self.store.token_ids[address] for address in addresses if address in self.store.token_ids]
+            candidates &= np.isin(frame.token_ids, np.asarray(ids, dtype=frame.token_ids.dtype))
+        flagged = np.flatnonzero(candidates)
+        ranked = flagged[np.argsort(-frame.score[flagged], kind="stable")][:top_n or self.config.top_n or None]
+
+        results = []
+        for i in ranked.tolist():
+            token_id = int(frame.token_ids[i])
+            result = {
+                "address": self.store.addresses[token_id],
+                "symbol": self.store.symbols[token_id],
+                "score": round(float(frame.score[i]), 4),
+            }
+            for w in WINDOWS:
+                result[f"change_{w}"] = round(float(frame.features[f"return_{w}"][i]) * 100, 2)
+            for name in ("volume_accel", "liquidity_change", "imbalance", "liquidity", "volume_h1", "price"):
+                result[name] = float(frame.features[name][i])
+            results.append(result)
+        return results
@@ -1,22 +1,78 @@
 import json
+import asyncio
 import logging
 import os
-import aiohttp
 import aiofiles
+import aiohttp
+from collections import deque
 from datetime import datetime
 from glob import glob
-from parcing.whales import WhaleTracker
+from parcing.cdc import ChangeSet, SnapshotIndex
+from parcing.momentum import MomentumDetector
+from parcing.valuation import PriceTable
+from storage.history import PriceHistoryStore
 from utils.config import settings
+from utils.http_client import HttpClient
+from utils.metrics import metrics
+from utils.ratelimit import parse_retry_after
+from utils.slogger import SmartLogger
+from utils.snapshots import SnapshotWriter, SNAPSHOT_EXTENSION, aiter_snapshot, write_snapshot
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Per-token lines are counted and summarized instead of logged one by one
+token_log = SmartLogger("TokenManager")
+
+# Enriched tokens are appended to the history store in chunks of this size
+HISTORY_CHUNK_SIZE = 1000
+
+ENRICH_SECONDS = metrics.histogram("enrichment_seconds", "DexScreener enrichment time per snapshot",
+                                   buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+
+
+class DexScreenerError(RuntimeError):
+    """Non-200 answer of the DexScreener API"""
+
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"DexScreener returned status {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        return self.status == 429 or self.status >= 500
+
+
+async def _aiter(tokens):
+    if hasattr(tokens, "__aiter__"):
+        async for token in tokens:
+            yield token
+    else:
+        for token in tokens:
+            yield token
+
+
 class TokenManager:
-    def __init__(self, data_file="data.json", base_url="https://api.dexscreener.com/latest/dex/tokens"):
+    # DexScreener accepts up to 30 comma-separated addresses per /tokens/ call
+    TOKENS_PER_REQUEST = 30
+    CHAIN_ID = "solana"
+    # 429 and 5xx answers are retried with backoff from RETRY_BASE seconds, or after Retry-After
+    MAX_RETRIES = 3
+    RETRY_BASE = 1.0
+
+    def __init__(self, data_file="data.json", base_url="https://api.dexscreener.com/latest/dex/tokens", http=None,
+                 enrich_concurrency=None, price_table=None, history=None, momentum=None, cdc=None):
         self.data_file = data_file
         self.base_url = base_url
-        self.raw_data_path = "/Users/masterpo/Desktop/TheThinker/backend/data/raw"
-        self.clean_data_path = "/Users/masterpo/Desktop/TheThinker/backend/data/clean"
-        self.pumped_data_path = "/Users/masterpo/Desktop/TheThinker/backend/data/pumped"
-        self.whale_tracker = WhaleTracker()  # Add WhaleTracker instance
+        self.http = http or HttpClient()
+        self.enrich_concurrency = enrich_concurrency or settings.ENRICH_CONCURRENCY
+        # Enriched pairs feed the valuation prices; shared with the whale tracker when given
+        self.price_table = price_table or PriceTable(self.http)
+        # Pump detection runs over the stored per-token history
+        self.history = history if history is not None else PriceHistoryStore()
+        self.momentum = momentum or MomentumDetector(self.history)
+        # Only tokens that are new or changed since earlier snapshots are processed
+        self.cdc = cdc or SnapshotIndex()
+        self.last_changes = ChangeSet()
         logging.info(f"TokenManager initialized with data_file={data_file}, base_url={base_url}")
 
     async def save_data(self, data):
@@ -38,47 +94,169 @@ class TokenManager:
             logging.warning(f"Failed to load data: {str(e)}")
             return []
 
+    @staticmethod
+    def _pair_liquidity(pair):
+        try:
+            return float((pair.get("liquidity") or {}).get("usd") or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    async def get_tokens_data(self, token_addresses):
+        """Gets the most liquid DexScreener pair for each address in one request.
+
+        Returns a dict of token address -> pair; addresses without pairs are omitted.
+        """
+        url = f"{self.base_url}/{','.join(token_addresses)}"
+        async with self.http.session.get(url) as response:
+            if response.status != 200:
+                raise DexScreenerError(response.status, parse_retry_after(response.headers.get("Retry-After")))
+            data = await response.json()
+
+        requested = set(token_addresses)
+        best_pairs = {}
+        for pair in data.get("pairs") or []:
+            if pair.get("chainId") != self.CHAIN_ID:
+                continue
+            address = (pair.get("baseToken") or {}).get("address")
+            if address not in requested:
+                continue
+            current = best_pairs.get(address)
+            if current is None or self._pair_liquidity(pair) > self._pair_liquidity(current):
+                best_pairs[address] = pair
+        return best_pairs
+
     async def get_token_data(self, token_address):
         """Gets token data from DexScreener API."""
-        url = f"{self.base_url}/{token_address}"
-        logging.info(f"Fetching token data for address {token_address}")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    data = await response.json()
-                    token_data = data.get("pairs", [])[0] if data.get("pairs") else {}
-                    if token_data:
-                        logging.info(f"Successfully retrieved data for token {token_address}")
-                    else:
-                        logging.warning(f"No data found for token {token_address}")
-                    return token_data if token_data else {"error": "No data found"}
+            token_data = (await self.get_tokens_data([token_address])).get(token_address)
+            if token_data:
+                token_log.event("Fetched token data", sample=token_address)
+            else:
+                token_log.event("No token data found", sample=token_address, level=logging.WARNING)
+            return token_data if token_data else {"error": "No data found"}
         except Exception as e:
             logging.error(f"Error fetching token data: {str(e)}")
             return {"error": str(e)}
 
-    def filter_pumped_tokens(self, enriched_data):
-        """Filter tokens with more than 50% price growth in 24h"""
-        pumped_tokens = []
-        for token in enriched_data:
+    async def _fetch_chunk_pairs(self, addresses):
+        for attempt in range(self.MAX_RETRIES + 1):
             try:
-                price_change_24h = float(token.get('priceChange', {}).get('h24', 0))
-                if price_change_24h > 50:
-                    pumped_token_info = {
-                        'name': token.get('baseToken', {}).get('name'),
-                        'contract': token.get('baseToken', {}).get('address'),
-                        'growth_24h': price_change_24h
-                    }
-                    pumped_tokens.append(pumped_token_info)
-                    logging.info(f"Token {token.get('baseToken', {}).get('symbol')} pumped {price_change_24h}% in 24h")
-            except (ValueError, TypeError, AttributeError) as e:
-                logging.warning(f"Could not process price change for token: {e}")
+                return await self.get_tokens_data(addresses)
+            except (DexScreenerError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                retryable = e.retryable if isinstance(e, DexScreenerError) else True
+                if not retryable or attempt == self.MAX_RETRIES:
+                    error = e
+                    break
+                retry_after = getattr(e, "retry_after", None)
+                delay = retry_after if retry_after is not None else self.RETRY_BASE * 2 ** attempt
+                token_log.event("DexScreener request retried", sample=f"{e or type(e).__name__}, {delay:.1f}s",
+                                level=logging.WARNING)
+                await asyncio.sleep(delay)
+            except Exception as e:
+                error = e
+                break
+        logging.error(f"Error fetching data for {len(addresses)} tokens after {attempt + 1} attempts: {str(error)}")
+        return {}
+
+    async def enrich_stream(self, raw_tokens):
+        """Merges the best DexScreener pair into every Solana token as tokens stream in.
+
+        `raw_tokens` may be a plain or an async iterable. Addresses are packed
+        into multi-token requests, at most `enrich_concurrency` of which are in
+        flight; enriched tokens are yielded in input order. Tokens whose chunk
+        failed or that have no pairs are yielded as they are.
+        """
+        pending = deque()
+        chunk, chunk_addresses = [], {}
+        stats = {"tokens": 0, "skipped": 0, "requests": 0, "enriched": 0}
+
+        def submit():
+            nonlocal chunk, chunk_addresses
+            task = asyncio.create_task(self._fetch_chunk_pairs(list(chunk_addresses)))
+            pending.append((chunk, task))
+            stats["requests"] += 1
+            chunk, chunk_addresses = [], {}
+
+        async def drain(limit):
+            while len(pending) > limit:
+                tokens, task = pending.popleft()
+                pairs = await task
+                for token in tokens:
+                    token_details = pairs.get(token["tokenAddress"])
+                    if token_details:
+                        stats["enriched"] += 1
+                        yield {**token, **token_details}
+                    else:
+                        yield token
+
+        try:
+            async for token in _aiter(raw_tokens):
+                stats["tokens"] += 1
+                if token.get("chainId", self.CHAIN_ID) != self.CHAIN_ID or not token.get("tokenAddress"):
+                    stats["skipped"] += 1
+                    continue
+                chunk.append(token)
+                chunk_addresses[token["tokenAddress"]] = None
+                if len(chunk_addresses) >= self.TOKENS_PER_REQUEST:
+                    submit()
+                    async for enriched in drain(self.enrich_concurrency - 1):
+                        yield enriched
+            if chunk:
+                submit()
+            async for enriched in drain(0):
+                yield enriched
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+        logging.info(f"Enriched {stats['enriched']}/{stats['tokens'] - stats['skipped']} Solana tokens "
+                     f"in {stats['requests']} requests (skipped {stats['skipped']} entries)")
+
+    async def enrich_tokens(self, raw_data):
+        """List version of `enrich_stream`"""
+        with ENRICH_SECONDS.time():
+            return [token async for token in self.enrich_stream(raw_data)]
+
+    def filter_pumped_tokens(self, enriched_data, collected_at=None):
+        """Ranked pumped tokens among `enriched_data`, as of the snapshot collected at `collected_at`.
+
+        The snapshot is appended to the history store first, unless the store
+        already holds it (the pipeline appends before detection). Scoring is
+        done by the momentum detector over the stored history; only the given
+        tokens, the changed ones in the pipeline, can be flagged.
+        """
+        if isinstance(collected_at, datetime):
+            collected_at = collected_at.timestamp()
+        collected_at = int(collected_at or datetime.now().timestamp())
+        last = self.history.last_timestamp
+        if enriched_data and (last is None or last < collected_at):
+            self.history.append_snapshot(collected_at, enriched_data)
+
+        names = {}
+        if enriched_data is not None:
+            names = {(token.get('baseToken') or {}).get('address'): (token.get('baseToken') or {}).get('name')
+                     for token in enriched_data}
+        addresses = {token.get('tokenAddress') for token in enriched_data} if enriched_data is not None else None
+        pumped_tokens = []
+        for result in self.momentum.detect(collected_at, addresses=addresses):
+            pumped_tokens.append({
+                'name': names.get(result['address']) or result['symbol'],
+                'contract': result['address'],
+                'growth_24h': result['change_h24'],
+                **result,
+            })
+        if pumped_tokens:
+            top = pumped_tokens[0]
+            token_log.event("Pumped tokens", len(pumped_tokens), sample=f"{top['symbol']} score {top['score']}")
         return pumped_tokens
 
     async def process_latest_raw_data(self):
         """Process raw data files and save enriched data with full token metrics"""
         logging.info("Starting to process latest raw data")
         
-        raw_files = glob(os.path.join(self.raw_data_path, 'data_*.json'))
+        # Snapshots still being written end in .tmp
+        raw_files = [filename for filename in glob(os.path.join(settings.RAW_DATA_FILEPATH, 'data_*.json*'))
+                     if filename.endswith(('.json', '.jsonl'))]
         if not raw_files:
             logging.error("No raw data files found")
             return None
@@ -87,61 +265,54 @@ class TokenManager:
         logging.info(f"Processing latest file: {latest_file}")
         
         try:
-            async with aiofiles.open(latest_file, 'r') as f:
-                raw_data = json.loads(await f.read())
-                logging.info(f"Loaded {len(raw_data)} tokens from raw data")
-
-            enriched_data = []
-            async with aiohttp.ClientSession() as session:
-                for i, token in enumerate(raw_data):
-                    token_address = token.get("tokenAddress")  # Changed this line
-                    if token_address:
-                        logging.info(f"Processing token {i+1}/{len(raw_data)}: {token_address}")
-                        token_details = await self.get_token_data(token_address)
-                        if not token_details.get("error"):
-                            enriched_data.append({**token, **token_details})
-                            logging.info(f"Successfully enriched data for token {token_address}")
-                        else:
-                            enriched_data.append(token)
-                            logging.warning(f"Using original data for token {token_address} due to error")
-
-            # Save enriched data
-            os.makedirs('backend/data/clean', exist_ok=True)
-            timestamp = latest_file.split('data_')[1].split('.json')[0]
-            clean_filename = f'backend/data/clean/data_{timestamp}.json'
-            
+            # Tokens are parsed, diffed against earlier snapshots, enriched, saved and
+            # filtered as they stream in, the snapshot is never held in memory as a whole.
+            # Only new, changed or refresh-due feed items are enriched and sampled
+            timestamp = os.path.basename(latest_file).split('data_')[1].split('.json')[0]
+            collected_at = datetime.strptime(timestamp, "%Y%m%d_%H%M%S").timestamp()
+            last = self.history.last_timestamp
+            append_history = last is None or last < collected_at
+            clean_filename = f'{settings.CLEAN_DATA_FILEPATH}/data_{timestamp}{SNAPSHOT_EXTENSION}'
             logging.info(f"Saving enriched data to {clean_filename}")
-            async with aiofiles.open(clean_filename, 'w') as f:
-                await f.write(json.dumps(enriched_data, indent=4))
 
-            # Filter and save pumped tokens
-            pumped_tokens = self.filter_pumped_tokens(enriched_data)
+            tracker = self.cdc.begin(collected_at)
+
+            async def raw_tokens():
+                async for raw_token in aiter_snapshot(latest_file):
+                    if tracker.select(raw_token):
+                        yield raw_token
+
+            enriched_count = 0
+            history_chunk = []
+            price_table = self.price_table
+            with ENRICH_SECONDS.time(), SnapshotWriter(clean_filename) as clean_writer:
+                # The diff of the enriched metrics gates what is saved as clean and scored
+                async for token in self.enrich_stream(raw_tokens()):
+                    if tracker.feed(token):
+                        clean_writer.write(token)
+                    # Enriched pairs carry priceUsd, feed them to the valuation price table
+                    price_table.update_from_pairs((token,))
+                    if append_history:
+                        history_chunk.append(token)
+                        if len(history_chunk) >= HISTORY_CHUNK_SIZE:
+                            await asyncio.to_thread(self.history.append_snapshot, collected_at, history_chunk)
+                            history_chunk = []
+                    enriched_count += 1
+            if history_chunk:
+                await asyncio.to_thread(self.history.append_snapshot, collected_at, history_chunk)
+            self.last_changes = tracker.finish()
+
+            # Scored once the snapshot is in the history store, only changed tokens can be flagged
+            pumped_tokens = self.filter_pumped_tokens(self.last_changes.changed, collected_at)
+
             if pumped_tokens:
-                os.makedirs('backend/data/pumped', exist_ok=True)
-                timestamp = latest_file.split('data_')[1].split('.json')[0]
-                pumped_filename = f'backend/data/pumped/data_{timestamp}.json'
+                pumped_filename = f'{settings.PUMPED_DATA_FILEPATH}/data_{timestamp}{SNAPSHOT_EXTENSION}'
                 logging.info(f"Saving {len(pumped_tokens)} pumped tokens to {pumped_filename}")
-                
-                # Save pumped tokens
-                async with aiofiles.open(pumped_filename, 'w') as f:
-                    await f.write(json.dumps(pumped_tokens, indent=4))
-
-                # Track whales for each pumped token
-                whale_results = []
-                for token in pumped_tokens:
-                    token_address = token.get('contract')
-                    if token_address:
-                        logging.info(f"Analyzing whales for token: {token_address}")
-                        wealthy_holders = await self.whale_tracker.analyze_token(token_address)
-                        if wealthy_holders:
-                            whale_results.append({
-                                'token': token_address,
-                                'wealthy_holders': wealthy_holders
-                            })
-
-                return pumped_tokens  # Return pumped tokens for further processing
-
-            logging.info(f"Successfully processed data for {len(enriched_data)} tokens")
+                await asyncio.to_thread(write_snapshot, pumped_filename, pumped_tokens)
+                # Whale analysis is left to the caller's AnalysisScheduler
+                return pumped_tokens
+
+            logging.info(f"Successfully processed data for {enriched_count} tokens")
             return None
 
         except Exception as e:
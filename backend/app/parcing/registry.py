@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+import threading
+import time
+from glob import glob
+from utils.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class WhaleRecord:
+    __slots__ = ("address", "tokens", "valuation", "first_seen", "last_seen")
+
+    def __init__(self, address, first_seen, last_seen=None, valuation=None, tokens=None):
+        self.address = address
+        self.tokens = tokens or ()      # mint ids, see WhaleRegistry.mints; a tuple is far smaller than a set
+        self.valuation = valuation      # last USD net worth, None if never valued
+        self.first_seen = first_seen
+        self.last_seen = last_seen or first_seen
+
+
+class WhaleRegistry:
+    """The live set of known whales with per-whale metadata.
+
+    Lookups and adds are dict operations; mints are stored once and referenced
+    by id. Changes are appended to a log of JSON lines that is replayed on
+    start and rewritten by `compact` once it grows well beyond the live set.
+    Whales not seen for `ttl` seconds are dropped by `expire`.
+
+    Listeners registered with `add_listener` are called with (added, removed)
+    address lists whenever the set changes.
+    """
+
+    def __init__(self, path=None, ttl=None, legacy_dir=None):
+        # An empty path keeps the registry in memory only
+        self.path = path if path is not None else settings.WHALE_REGISTRY_PATH
+        self.ttl = ttl if ttl is not None else settings.WHALE_TTL
+        self.legacy_dir = legacy_dir if legacy_dir is not None else settings.WHALE_DATA_PATH
+        self._records = {}
+        self.mints = []
+        self._mint_ids = {}
+        self._listeners = []
+        self._pending = []        # log lines not yet flushed
+        self._log_lines = 0
+        # Position and inode of the replayed log, for refresh
+        self._offset = 0
+        self._inode = None
+        self._flush_lock = threading.Lock()
+        self.load()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, address):
+        return address in self._records
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def get(self, address):
+        return self._records.get(address)
+
+    def tokens_of(self, address):
+        record = self._records.get(address)
+        return [self.mints[mint_id] for mint_id in record.tokens] if record else []
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, added, removed):
+        if not added and not removed:
+            return
+        for callback in self._listeners:
+            try:
+                callback(added, removed)
+            except Exception as e:
+                logger.error(f"Whale registry listener failed: {e}")
+
+    def _mint_id(self, mint):
+        mint_id = self._mint_ids.get(mint)
+        if mint_id is None:
+            mint_id = self._mint_ids[mint] = len(self.mints)
+            self.mints.append(mint)
+        return mint_id
+
+    def _apply_seen(self, address, seen_at, mint=None, valuation=None):
+        record = self._records.get(address)
+        added = record is None
+        if added:
+            record = self._records[address] = WhaleRecord(address, seen_at)
+        record.last_seen = max(record.last_seen, seen_at)
+        if mint is not None:
+            mint_id = self._mint_id(mint)
+            if mint_id not in record.tokens:
+                record.tokens += (mint_id,)
+        if valuation is not None:
+            record.valuation = valuation
+        return added
+
+    # Changes
+
+    def record(self, whales, mint=None, now=None):
+        """Marks whales as seen, optionally in `mint`.
+
+        `whales` is an iterable of addresses or a dict of address -> USD
+        valuation. Returns the addresses that were not known before.
+        """
+        now = now or time.time()
+        valuations = whales if isinstance(whales, dict) else None
+        added = []
+        for address in whales:
+            valuation = valuations.get(address) if valuations is not None else None
+            if self._apply_seen(address, now, mint, valuation):
+                added.append(address)
+            self._pending.append(["+", address, now, mint, valuation])
+        self._notify(added, [])
+        return added
+
+    def remove(self, addresses):
+        removed = [address for address in addresses if self._records.pop(address, None) is not None]
+        self._pending.extend(["-", address] for address in removed)
+        self._notify([], removed)
+        return removed
+
+    def expire(self, now=None):
+        """Drops whales not seen within the TTL, returns their addresses"""
+        if not self.ttl:
+            return []
+        cutoff = (now or time.time()) - self.ttl
+        stale = [address for address, record in self._records.items() if record.last_seen < cutoff]
+        if stale:
+            self.remove(stale)
+            logger.info(f"Expired {len(stale)} whales not seen for {self.ttl / 3600:.0f}h, {len(self)} remain")
+        return stale
+
+    # Persistence
+
+    def flush(self):
+        """Appends pending changes to the log; compacts it when mostly history"""
+        with self._flush_lock:
+            lines, self._pending = self._pending, []
+            if not lines or not self.path:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write("".join(json.dumps(line, separators=(",", ":")) + "\n" for line in lines))
+            self._log_lines += len(lines)
+            if self._log_lines > 4 * len(self._records) + 10000:
+                self.compact()
+
+    def compact(self):
+        """Rewrites the log as one line per live whale"""
+        tmp_path = f"{self.path}.tmp"
+        # flush may run in a worker thread, iterate over a copy
+        records = list(self._records.values())
+        with open(tmp_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(["=", record.address, record.first_seen, record.last_seen, record.valuation,
+                                    [self.mints[mint_id] for mint_id in record.tokens]],
+                                   separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.path)
+        self._log_lines = len(self._records)
+
+    def load(self):
+        if not self.path:
+            return
+        if not os.path.exists(self.path):
+            self._import_legacy()
+            return
+        started = time.perf_counter()
+        self._replay()
+        logger.info(f"Loaded {len(self)} whales from {self.path} in {time.perf_counter() - started:.2f}s")
+
+    def refresh(self):
+        """Applies the changes another process appended to the log since the last load or refresh.
+
+        For a registry that only follows a log written elsewhere, see
+        WhaleSubscription(follow=True). A log compacted in the meantime is
+        replayed from the start. Listeners are notified; returns (added, removed).
+        """
+        if not self.path or not os.path.exists(self.path):
+            return [], []
+        stat = os.stat(self.path)
+        if stat.st_ino == self._inode and stat.st_size == self._offset:
+            return [], []
+        before = set(self._records)
+        self._replay()
+        after = set(self._records)
+        added, removed = list(after - before), list(before - after)
+        self._notify(added, removed)
+        return added, removed
+
+    def _replay(self):
+        """Applies the complete log lines past the last replayed offset"""
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self._inode or stat.st_size < self._offset:
+                # First read, or the log was compacted: start from an empty set
+                if self._inode is not None:
+                    self._records = {}
+                self._inode, self._offset, self._log_lines = stat.st_ino, 0, 0
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Still being appended, or torn by a crash; picked up by the next refresh
+                    break
+                self._offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._log_lines += 1
+                op = entry[0]
+                if op == "+":
+                    self._apply_seen(entry[1], entry[2], entry[3], entry[4])
+                elif op == "-":
+                    self._records.pop(entry[1], None)
+                elif op == "=":
+                    _, address, first_seen, last_seen, valuation, mints = entry
+                    self._records[address] = WhaleRecord(address, first_seen, last_seen, valuation,
+                                                         tuple(self._mint_id(mint) for mint in mints))
+
+    def _import_legacy(self):
+        """Seeds a new registry from the whales_*.json analysis files"""
+        if not self.legacy_dir:
+            return
+        files = sorted(glob(os.path.join(self.legacy_dir, "whales_*.json")), key=os.path.getmtime)
+        for filename in files:
+            try:
+                with open(filename, "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping {filename}: {e}")
+                continue
+            self.record(data.get("wealthy_holders", []), data.get("token_mint"), now=os.path.getmtime(filename))
+        if files:
+            self.flush()
+            logger.info(f"Imported {len(self)} whales from {len(files)} legacy files")
+
+    def snapshot_stats(self):
+        return {"whales": len(self), "mints": len(self.mints), "log_lines": self._log_lines}
@@ -0,0 +1,291 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+from parcing.job_queue import SqliteJobQueue
+from parcing.jobs import JobRegistry
+from utils.config import settings
+from utils.metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = metrics.gauge("queue_depth", "Items waiting in an internal queue", ["queue"])
+
+
+@dataclass
+class AnalysisJob:
+    mint: str
+    token: dict
+    generation: int
+    reason: str = "new"     # why the analysis runs, see JobRegistry.check
+    submitted_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    status: str = "queued"  # queued, running, superseded, done, failed, cancelled
+    result: Optional[list] = None
+
+    @property
+    def queue_wait(self):
+        if self.started_at is None:
+            return None
+        return self.started_at - self.submitted_at
+
+    @property
+    def run_time(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+def job_priority(token):
+    """Highest momentum score (or 24h growth) first, ties broken by liquidity"""
+    def as_float(value):
+        try:
+            return float(value or 0)
+        except (TypeError, ValueError):
+            return 0.0
+    return (-as_float(token.get('score', token.get('growth_24h'))), -as_float(token.get('liquidity')))
+
+
+class AnalysisScheduler:
+    """Bounded worker pool running `WhaleTracker.analyze_token` for pumped tokens.
+
+    Each submitted snapshot becomes a new generation. Jobs for mints that
+    are no longer pumping are dropped from the queue or cancelled if still
+    running, because their data has been superseded. A mint that is still
+    pumping keeps its queued or running job, and is not queued again while
+    the job registry holds a fresh result for it.
+    """
+
+    def __init__(self, whale_tracker, concurrency=None, on_result=None, history_size=500, jobs=None):
+        self.whale_tracker = whale_tracker
+        self.jobs = jobs if jobs is not None else JobRegistry()
+        self.concurrency = concurrency or settings.ANALYSIS_CONCURRENCY
+        self.on_result = on_result
+        self.generation = 0
+        self.history = deque(maxlen=history_size)
+        self._queue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._running = {}
+        self._workers = []
+        QUEUE_DEPTH.labels("analysis").set_function(self.pending)
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+            logger.info(f"Analysis scheduler started with {self.concurrency} workers")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit_snapshot(self, pumped_tokens, superseded=None):
+        """Queues one analysis per pumped token and supersedes older snapshots.
+
+        For a snapshot holding only changed tokens, `superseded` names the
+        mints whose in-flight jobs are outdated; every other job carries over.
+        """
+        self.generation += 1
+        tokens = {token.get('contract'): token for token in pumped_tokens or [] if token.get('contract')}
+
+        # In-flight jobs of mints that are still pumping carry over to this generation
+        cancelled = carried = 0
+        for mint, job in list(self.jobs.in_flight.items()):
+            if mint in tokens or (superseded is not None and mint not in superseded):
+                job.generation = self.generation
+                carried += 1
+            elif mint in self._running:
+                job.status = "superseded"
+                self._running[mint][1].cancel()
+                cancelled += 1
+
+        queued = fresh = 0
+        for mint, token in tokens.items():
+            if mint in self.jobs.in_flight:
+                continue
+            reason = self.jobs.check(mint, price=token.get('price'))
+            if reason is None:
+                fresh += 1
+                continue
+            job = AnalysisJob(mint=mint, token=token, generation=self.generation, reason=reason)
+            self.jobs.begin(mint, job)
+            self._queue.put_nowait((job_priority(token), next(self._seq), job))
+            queued += 1
+
+        logger.info(f"Snapshot {self.generation}: queued {queued} analyses, {carried} already in flight, "
+                    f"{fresh} fresh, cancelled {cancelled} stale running jobs")
+        return self.generation
+
+    async def join(self):
+        """Waits until every queued job has been processed"""
+        await self._queue.join()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    async def _run_job(self, job):
+        job.status = "running"
+        job.started_at = time.monotonic()
+        task = asyncio.create_task(
+            self.whale_tracker.analyze_token(job.mint, self.jobs.analysis_holder_change(job.reason)))
+        self._running[job.mint] = (job, task)
+        try:
+            job.result = await task
+            job.status = "done"
+            self.jobs.complete(job.mint, job.result, price=job.token.get('price'),
+                               holders=self.whale_tracker.holder_counts.get(job.mint),
+                               concentration=self.whale_tracker.concentration.get(job.mint))
+            await asyncio.to_thread(self.jobs.save)
+        except asyncio.CancelledError:
+            if job.status != "superseded":
+                # The worker itself is being stopped
+                job.status = "cancelled"
+                raise
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            logger.error(f"Whale analysis failed for {job.mint}: {e}")
+        finally:
+            job.finished_at = time.monotonic()
+            if self._running.get(job.mint, (None,))[0] is job:
+                del self._running[job.mint]
+            self.jobs.end(job.mint, job)
+
+        logger.info(f"Job {job.mint} ({job.reason}) {job.status}: waited {job.queue_wait:.2f}s, ran {job.run_time:.2f}s")
+        if job.status == "done" and job.result and self.on_result:
+            await self.on_result(job)
+
+    async def _worker(self, index):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                if job.generation < self.generation:
+                    job.status = "cancelled"
+                    self.jobs.end(job.mint, job)
+                    logger.info(f"Dropped stale job for {job.mint} from snapshot {job.generation}")
+                    continue
+                await self._run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Analysis worker {index} error: {e}")
+            finally:
+                self.history.append(job)
+                self._queue.task_done()
+
+
+class QueueScheduler:
+    """AnalysisScheduler counterpart for out-of-process workers.
+
+    Pumped tokens are enqueued in the durable SQLite job queue and analyzed
+    by `parcing.worker` processes, possibly on other hosts. Results are
+    polled from the queue and handed to `on_result` as finished
+    AnalysisJobs whose result maps whale address -> USD valuation.
+    """
+
+    def __init__(self, queue=None, on_result=None, jobs=None, cooccurrence=None, poll_interval=1.0,
+                 history_size=500):
+        self.queue = queue if queue is not None else SqliteJobQueue()
+        self.jobs = jobs if jobs is not None else JobRegistry()
+        # Updated here from the holders the workers publish
+        self.cooccurrence = cooccurrence
+        self.on_result = on_result
+        self.poll_interval = poll_interval
+        self.generation = 0
+        self.history = deque(maxlen=history_size)
+        self._counts = {}
+        self._poller = None
+        QUEUE_DEPTH.labels("analysis").set_function(lambda: self._counts.get("queued", 0))
+
+    def start(self):
+        if self._poller is None:
+            # Jobs left live by an earlier run are still being worked on
+            for mint in self.queue.live_mints():
+                self.jobs.begin(mint, AnalysisJob(mint=mint, token={}, generation=0, reason="recovered"))
+            self._poller = asyncio.create_task(self._poll())
+            logger.info(f"Queue scheduler started on {self.queue.path}, {len(self.jobs.in_flight)} jobs live")
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+        self.queue.close()
+
+    def submit_snapshot(self, pumped_tokens, superseded=None):
+        """Enqueues one analysis per pumped token that needs one, see AnalysisScheduler.submit_snapshot"""
+        self.generation += 1
+        tokens = {token.get('contract'): token for token in pumped_tokens or [] if token.get('contract')}
+
+        stale = [mint for mint in self.jobs.in_flight
+                 if mint not in tokens and (superseded is None or mint in superseded)]
+        cancelled = self.queue.cancel(stale) if stale else 0
+        for mint in stale:
+            self.jobs.end(mint, self.jobs.in_flight[mint])
+
+        queued = fresh = 0
+        for mint, token in tokens.items():
+            if mint in self.jobs.in_flight:
+                self.jobs.in_flight[mint].generation = self.generation
+                continue
+            reason = self.jobs.check(mint, price=token.get('price'))
+            if reason is None:
+                fresh += 1
+                continue
+            job = AnalysisJob(mint=mint, token=token, generation=self.generation, reason=reason)
+            self.queue.enqueue(mint, {"reason": reason, "price": token.get('price'),
+                                      "holder_change": self.jobs.analysis_holder_change(reason)},
+                               priority=job_priority(token)[0])
+            self.jobs.begin(mint, job)
+            queued += 1
+
+        logger.info(f"Snapshot {self.generation}: enqueued {queued} analyses, {fresh} fresh, "
+                    f"cancelled {cancelled} stale jobs")
+        return self.generation
+
+    def pending(self):
+        return self._counts.get("queued", 0)
+
+    async def _poll(self):
+        while True:
+            try:
+                results = await asyncio.to_thread(self.queue.claim_results)
+                for published in results:
+                    await self._finish(published)
+                self._counts = await asyncio.to_thread(self.queue.counts)
+                if not results:
+                    # Failed and cancelled jobs produce no result, release their mints
+                    live = await asyncio.to_thread(self.queue.live_mints)
+                    for mint, job in list(self.jobs.in_flight.items()):
+                        if mint not in live:
+                            self.jobs.end(mint, job)
+                    await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Analysis queue poll error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _finish(self, published):
+        mint = published["mint"]
+        job = self.jobs.in_flight.get(mint) or AnalysisJob(mint=mint, token={}, generation=self.generation)
+        self.jobs.end(mint, job)
+        job.status = "done"
+        job.finished_at = time.monotonic()
+        job.result = published["result"]["wealthy"]
+        holders = published["result"].get("holders")
+        if holders is not None and self.cooccurrence is not None:
+            await asyncio.to_thread(self.cooccurrence.update, mint, holders, list(job.result))
+        self.jobs.complete(mint, job.result, price=job.token.get('price'), holders=published["holders"],
+                           concentration=published["result"].get("concentration"))
+        await asyncio.to_thread(self.jobs.save)
+        self.history.append(job)
+        logger.info(f"Job {mint} ({job.reason}) done by {published['worker']}: {len(job.result)} whales")
+        if job.result and self.on_result:
+            await self.on_result(job)
@@ -1,97 +1,190 @@
-import json
-import os
-import glob
 import asyncio
-import websockets
 import logging
-from datetime import datetime
+from parcing.events import EventHub, WhaleEvent
+from parcing.registry import WhaleRegistry
+from parcing.ws_manager import SubscriptionManager
+from utils.config import settings
+from utils.ratelimit import PRIORITY_LIVE
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class WhaleSubscription:
-    def __init__(self):
-        self.whales_dir = "/Users/masterpo/Desktop/TheThinker/backend/data/whales"
-        self.wealthy_holders = self._get_latest_whale_data()
-        self.ws_url = "wss://mainnet.helius-rpc.com/?api-key=29291e23-0902-4433-a6a7-2f3e32495ee7"
-
-    def _get_latest_whale_data(self):
-        # Get list of all json files in whales directory
-        json_files = glob.glob(os.path.join(self.whales_dir, "*.json"))
-        
-        if not json_files:
-            logger.error("No whale data files found")
-            asyncio.sleep(5)
-            return []
+    def __init__(self, registry=None, price_table=None, maintenance_interval=600, follow=False,
+                 balance_cache=None, balance_resolver=None):
+        # The registry is the source of truth, subscriptions follow its changes
+        self.registry = registry if registry is not None else WhaleRegistry()
+        self.price_table = price_table
+        # With follow the registry log is written by another process (main.py process) and only re-read here
+        self.follow = follow
+        self.maintenance_interval = settings.REGISTRY_REFRESH_INTERVAL if follow else maintenance_interval
+        # Account updates fan out to every reader of subscribe_to_transactions()
+        self.events = EventHub(settings.EVENT_DEDUP_SIZE)
+        self._lamports = {}
+        # Baseline balances, so the first notification of a whale carries its change:
+        # from the balance cache the analyses fill, else fetched through the resolver
+        self.balance_cache = balance_cache
+        self.balance_resolver = balance_resolver
+        self._unseeded = set()
+        self._run_task = None
+        self._running = False
+        # Required setting, the roles that subscribe check it at startup (main.ROLE_SETTINGS)
+        self.ws_url = settings.HELIUS_WS_URL
+        # One accountSubscribe per whale, spread over as many connections as needed
+        self.manager = SubscriptionManager(self.ws_url, on_notification=self._on_account_update)
+        self.manager.add(self.registry)
+        self._seed(self.registry)
+        self.registry.add_listener(self._on_registry_change)
 
-        # Find the latest file based on timestamp in filename
-        latest_file = max(json_files, key=lambda x: os.path.getctime(x))
-        
-        try:
-            with open(latest_file, 'r') as f:
-                data = json.load(f)
-                logger.info(f"Loaded whale data from {latest_file}")
-                return data.get('wealthy_holders', [])
-        except Exception as e:
-            logger.error(f"Error loading whale data: {e}")
-            return []
-        
-    
-    async def add_addresses(self, new_addresses):
+    @classmethod
+    def following(cls, http, price_table):
+        """A subscription of its own process, following the registry log the process role writes.
+
+        Baseline balances come from getMultipleAccounts calls of its own.
+        """
+        from parcing.balances import BalanceResolver
+        from parcing.cache import BalanceCache
+        from utils.ratelimit import RateLimiter
+        from utils.rpc import SolanaRPC, helius_rpc_url
+        rpc = SolanaRPC(helius_rpc_url(), http,
+                        RateLimiter(settings.HELIUS_RPS, max_rate=settings.HELIUS_MAX_RPS, name="helius"))
+        return cls(WhaleRegistry(), price_table, follow=True,
+                   balance_cache=BalanceCache(name="balances"), balance_resolver=BalanceResolver(rpc))
+
+    @property
+    def wealthy_holders(self):
+        return list(self.registry)
+
+    def _on_registry_change(self, added, removed):
+        self.manager.add(added)
+        self.manager.remove(removed)
+        self._seed(added)
+        for address in removed:
+            self._lamports.pop(address, None)
+            self._unseeded.discard(address)
+
+    def _seed(self, addresses):
+        for address in addresses:
+            lamports = self.balance_cache.get(address) if self.balance_cache is not None else None
+            if lamports is not None:
+                self._lamports.setdefault(address, lamports)
+            elif self.balance_resolver is not None and address not in self._lamports:
+                self._unseeded.add(address)
+
+    async def seed_balances(self, interval=1.0):
+        """Fetches the baseline balance of whales the cache had none for"""
+        while True:
+            if not self._unseeded:
+                await asyncio.sleep(interval)
+                continue
+            batch = list(self._unseeded)
+            self._unseeded.clear()
+            try:
+                balances = await self.balance_resolver.resolve(batch, PRIORITY_LIVE)
+            except Exception as e:
+                logger.error(f"Could not fetch baseline balances: {e}")
+                balances = {}
+            for address, lamports in balances.items():
+                if address in self.registry:
+                    self._lamports.setdefault(address, lamports)
+            failed = [address for address in batch if address not in balances and address in self.registry]
+            if failed:
+                self._unseeded.update(failed)
+                await asyncio.sleep(interval * 5)
+
+    async def add_addresses(self, new_addresses, mint=None):
         """Add new whale addresses to monitoring"""
         if not new_addresses:
             return
-            
-        # Add new addresses to the existing set
-        self.wealthy_holders.extend(new_addresses)
-        
-        # Remove duplicates
-        self.wealthy_holders = list(set(self.wealthy_holders))
+
+        # Known whales only get their last-seen time refreshed
+        added = self.registry.record(new_addresses, mint)
         
-        logger.info(f"Added {len(new_addresses)} new addresses to whale monitoring. "
-                   f"Total addresses monitored: {len(self.wealthy_holders)}")
+        logger.info(f"Added {len(added)} new addresses to whale monitoring. "
+                   f"Total addresses monitored: {len(self.registry)}")
+
+    async def remove_addresses(self, addresses):
+        """Stop monitoring whale addresses"""
+        removed = self.registry.remove(addresses)
+        logger.info(f"Removed {len(removed)} addresses from whale monitoring. "
+                   f"Total addresses monitored: {len(self.registry)}")
+
+    async def _on_account_update(self, address, result):
+        slot = result.get("context", {}).get("slot")
+        if self.events.is_duplicate(address, slot):
+            return
+        lamports = (result.get("value") or {}).get("lamports", 0)
+        previous = self._lamports.get(address)
+        self._lamports[address] = lamports
+        event = WhaleEvent(
+            address=address,
+            slot=slot,
+            lamports=lamports,
+            change=lamports - previous if previous is not None else 0,
+            sol_price=self.price_table.sol_price if self.price_table else settings.SOL_PRICE_FALLBACK,
+            tokens=self.registry.tokens_of(address),
+        )
+        logger.debug(f"Account update for whale {address} at slot {slot}: {event.change:+d} lamports")
+        await self.events.publish(event)
 
-    async def subscribe_to_transactions(self):
+    async def maintain_registry(self):
+        """Expires stale whales and persists registry changes periodically"""
         while True:
+            await asyncio.sleep(self.maintenance_interval)
             try:
-                async with websockets.connect(self.ws_url) as websocket:
-                    # Subscribe to all wealthy holder addresses
-                    subscribe_message = {
-                        "jsonrpc": "2.0",
-                        "id": 1,
-                        "method": "accountSubscribe",
-                        "params": [
-                            self.wealthy_holders,
-                            {"encoding": "jsonParsed", "commitment": "confirmed"}
-                        ]
-                    }
-                    
-                    await websocket.send(json.dumps(subscribe_message))
-                    logger.info(f"Subscribed to {len(self.wealthy_holders)} whale addresses")
-
-                    while True:
-                        try:
-                            response = await websocket.recv()
-                            data = json.loads(response)
-                            
-                            if "params" in data:
-                                transaction = data["params"]
-                                logger.info(f"New transaction detected: {transaction}")
-                                # Here you can add logic to process the transaction
-                                # For example, send alerts if transaction amount exceeds threshold
-                                
-                        except websockets.ConnectionClosed:
-                            logger.warning("WebSocket connection closed")
-                            break
-                            
+                if self.follow:
+                    added, removed = self.registry.refresh()
+                    if added or removed:
+                        logger.info(f"Registry log: {len(added)} whales added, {len(removed)} removed, "
+                                    f"{len(self.registry)} monitored")
+                    continue
+                self.registry.expire()
+                await asyncio.to_thread(self.registry.flush)
             except Exception as e:
-                logger.error(f"WebSocket error: {e}")
-                await asyncio.sleep(5)  # Wait before reconnecting
+                logger.error(f"Whale registry maintenance failed: {e}")
+
+    async def run(self):
+        """Keeps every whale subscribed until cancelled, reconnecting shards as needed"""
+        self._running = True
+        tasks = [asyncio.create_task(self.maintain_registry())]
+        if self.balance_resolver is not None:
+            tasks.append(asyncio.create_task(self.seed_balances()))
+        try:
+            await self.manager.run()
+        finally:
+            self._running = False
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not self.follow:
+                await asyncio.to_thread(self.registry.flush)
+
+    def start(self):
+        """Runs the subscriptions in a background task unless they already run"""
+        if not self._running and (self._run_task is None or self._run_task.done()):
+            self._run_task = asyncio.create_task(self.run())
+        return self._run_task
+
+    def subscribe_to_transactions(self, maxsize=None, overflow=None):
+        """A consumer of whale account events, starting the subscriptions if nobody runs them.
+
+        async with subscription.subscribe_to_transactions() as events:
+            async for event in events:
+                ...
+
+        Every consumer has its own bounded buffer, a slow one never holds up
+        the socket readers unless it asked for the `block` overflow policy.
+        """
+        self.start()
+        return self.events.subscribe(maxsize, overflow)
 
 async def main():
+    settings.validate(required=["HELIUS_WS_URL"])
     subscription = WhaleSubscription()
-    await subscription.subscribe_to_transactions()
+    async with subscription.subscribe_to_transactions() as events:
+        async for event in events:
+            logger.info(f"Whale {event.address} moved {event.change / 1e9:+.4f} SOL (${event.amount_usd:,.2f})")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,8 +1,9 @@
 import aiohttp
 import asyncio
+from utils.rpc import helius_rpc_url
 
 async def get_token_holders(token_mint_address):
-    url = "https://mainnet.helius-rpc.com/?api-key=29291e23-0902-4433-a6a7-2f3e32495ee7"
+    url = helius_rpc_url()
     headers = {
         "Content-Type": "application/json"
     }
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+import numpy as np
+from utils.config import settings
+from utils.http_client import HttpClient
+from utils.ratelimit import PRIORITY_BULK
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SOL_MINT = "So11111111111111111111111111111111111111112"
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+
+
+class PriceTable:
+    """USD prices for SOL and the most held SPL mints, refreshed from DexScreener.
+
+    Besides the configured mints, every enriched snapshot feeds its pair
+    prices in through `update_from_pairs`, so freshly pumped tokens are
+    priced without extra requests.
+    """
+
+    TOKENS_PER_REQUEST = 30
+
+    def __init__(self, http=None, mints=None, refresh_interval=None,
+                 base_url="https://api.dexscreener.com/latest/dex/tokens"):
+        self.http = http or HttpClient()
+        self.mints = list(dict.fromkeys([SOL_MINT] + list(mints or settings.PRICE_MINTS)))
+        self.refresh_interval = refresh_interval or settings.PRICE_REFRESH_INTERVAL
+        self.base_url = base_url
+        self.prices = {}
+        self.updated_at = 0.0
+        self._liquidity = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def sol_price(self):
+        return self.prices.get(SOL_MINT, settings.SOL_PRICE_FALLBACK)
+
+    def update_from_pairs(self, pairs):
+        """Takes priceUsd from DexScreener pairs, preferring the most liquid pair per mint"""
+        updated = 0
+        for pair in pairs:
+            mint = (pair.get("baseToken") or {}).get("address")
+            try:
+                price = float(pair.get("priceUsd") or 0)
+                liquidity = float((pair.get("liquidity") or {}).get("usd") or 0)
+            except (TypeError, ValueError):
+                continue
+            if not mint or price <= 0:
+                continue
+            if liquidity >= self._liquidity.get(mint, -1):
+                self.prices[mint] = price
+                self._liquidity[mint] = liquidity
+                updated += 1
+        return updated
+
+    async def refresh(self):
+        self._liquidity.clear()
+        chunks = [self.mints[i:i + self.TOKENS_PER_REQUEST]
+                  for i in range(0, len(self.mints), self.TOKENS_PER_REQUEST)]
+        for chunk in chunks:
+            url = f"{self.base_url}/{','.join(chunk)}"
+            try:
+                async with self.http.session.get(url) as response:
+                    if response.status != 200:
+                        logger.error(f"Price refresh failed with status {response.status}")
+                        continue
+                    data = await response.json()
+                self.update_from_pairs(data.get("pairs") or [])
+            except Exception as e:
+                logger.error(f"Error refreshing prices: {e}")
+        self.updated_at = time.monotonic()
+        logger.info(f"Price table refreshed: {len(self.prices)} mints, SOL ${self.sol_price:.2f}")
+
+    async def ensure_fresh(self):
+        async with self._lock:
+            if time.monotonic() - self.updated_at >= self.refresh_interval:
+                await self.refresh()
+
+    def price_vector(self, mints):
+        return np.fromiter((self.prices.get(mint, 0.0) for mint in mints), dtype=np.float64, count=len(mints))
+
+
+class PortfolioValuer:
+    """Values whole batches of wallets in USD: SOL plus priced SPL token holdings.
+
+    Token accounts are fetched with `getTokenAccountsByOwner` packed into
+    JSON-RPC batch arrays. The valuation itself is one NumPy pass over all
+    holdings of the batch.
+    """
+
+    def __init__(self, rpc, price_table, batch_size=100, max_concurrency=4):
+        self.rpc = rpc
+        self.price_table = price_table
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+
+    async def fetch_holdings(self, wallets, priority=PRIORITY_BULK):
+        """Returns (wallet index, mint index, ui amount) arrays and the mint list"""
+        wallet_idx, mint_idx, amounts = [], [], []
+        mint_ids = {}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch_batch(offset):
+            batch = wallets[offset:offset + self.batch_size]
+            params = [
+                [wallet, {"programId": TOKEN_PROGRAM_ID}, {"encoding": "jsonParsed"}]
+                for wallet in batch
+            ]
+            async with semaphore:
+                return offset, await self.rpc.call_batch("getTokenAccountsByOwner", params, priority)
+
+        batches = await asyncio.gather(*(fetch_batch(i) for i in range(0, len(wallets), self.batch_size)))
+        for offset, responses in batches:
+            for i, response in enumerate(responses):
+                accounts = ((response or {}).get("result") or {}).get("value") or []
+                for account in accounts:
+                    try:
+                        info = account["account"]["data"]["parsed"]["info"]
+                        amount = float(info["tokenAmount"]["uiAmount"] or 0)
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    if amount <= 0:
+                        continue
+                    wallet_idx.append(offset + i)
+                    mint_idx.append(mint_ids.setdefault(info["mint"], len(mint_ids)))
+                    amounts.append(amount)
+
+        return (
+            np.asarray(wallet_idx, dtype=np.int64),
+            np.asarray(mint_idx, dtype=np.int64),
+            np.asarray(amounts, dtype=np.float64),
+            list(mint_ids),
+        )
+
+    async def value_wallets(self, wallets, lamports, threshold=None, priority=PRIORITY_BULK):
+        """USD net worth per wallet, aligned with `wallets`.
+
+        With a threshold, wallets whose SOL alone already clears it skip the
+        token account lookup, their SOL value is enough to classify them.
+        """
+        wallets = list(wallets)
+        sol = np.fromiter((lamports.get(wallet, 0) for wallet in wallets), dtype=np.float64, count=len(wallets))
+        net_worth = sol / 1e9 * self.price_table.sol_price
+
+        need_tokens = np.ones(len(wallets), dtype=bool) if threshold is None else net_worth < threshold
+        lookup = np.flatnonzero(need_tokens)
+        if lookup.size:
+            wallet_idx, mint_idx, amounts, mints = await self.fetch_holdings(
+                [wallets[i] for i in lookup], priority
+            )
+            if amounts.size:
+                values = amounts * self.price_table.price_vector(mints)[mint_idx]
+                net_worth[lookup] += np.bincount(wallet_idx, weights=values, minlength=lookup.size)
+        return net_worth
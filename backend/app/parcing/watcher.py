@@ -0,0 +1,54 @@
+import asyncio
+import logging
+import os
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+from utils.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class DataFileHandler(FileSystemEventHandler):
+    def __init__(self, processor, scheduler, loop):
+        self.processor = processor
+        self.scheduler = scheduler
+        self.loop = loop
+        
+    async def process_new_file(self, file_path):
+        # Process raw data to clean data and find pumped tokens
+        pumped_tokens = await self.processor.process_latest_raw_data()
+        
+        # Queue whale analysis for the pumped tokens, superseding older snapshots
+        if pumped_tokens:
+            self.scheduler.submit_snapshot(pumped_tokens,
+                                           superseded=self.processor.last_changes.superseded(pumped_tokens))
+
+
+    def _handle(self, path):
+        if path.endswith(('.json', '.jsonl')) and '/raw/' in path:
+            logger.info(f"New raw data detected: {path}")
+            asyncio.run_coroutine_threadsafe(
+                self.process_new_file(path),
+                self.loop
+            )
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._handle(event.src_path)
+
+    def on_moved(self, event):
+        # SnapshotWriter writes a .tmp file and renames it into place
+        if not event.is_directory:
+            self._handle(event.dest_path)
+
+
+def watch_raw_files(processor, scheduler, loop, path=None):
+    """Starts a watchdog Observer handing new raw snapshots in `path` to the processor"""
+    path = path or settings.RAW_DATA_FILEPATH
+    # The collector may not have written its first snapshot yet
+    os.makedirs(path, exist_ok=True)
+    observer = Observer()
+    observer.schedule(DataFileHandler(processor, scheduler, loop), path, recursive=False)
+    observer.start()
+    return observer
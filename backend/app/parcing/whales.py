@@ -1,122 +1,167 @@
 import json
+import os
+import time
 import asyncio
-import aiohttp
 import logging
 import aiofiles
 from utils.config import settings
+from parcing.balances import BalanceResolver
+from parcing.cache import BalanceCache
+from parcing.concentration import HolderBook, concentration, eligible_owners
+from parcing.holders import HolderIndex
+from parcing.registry import WhaleRegistry
+from parcing.valuation import PriceTable, PortfolioValuer
+from storage.cooccurrence import CoOccurrenceIndex
+from utils.http_client import HttpClient
+from utils.ratelimit import RateLimiter, PRIORITY_BULK, PRIORITY_LIVE
+from utils.rpc import SolanaRPC, helius_rpc_url
+from utils.metrics import metrics
 # Set up logging
 from utils.slogger import SmartLogger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+HOLDERS_PROCESSED = metrics.counter("holders_processed", "Token holders valued by the whale tracker")
+HOLDERS_RATE = metrics.gauge("holders_per_second", "Holders valued per second in the last analysis")
+
 
 
 class WhaleTracker():
-    def __init__(self):
+    def __init__(self, http=None, limiter=None, balance_cache=None, holder_index=None, price_table=None,
+                 registry=None, cooccurrence=None):
+        self.http = http or HttpClient()
+        self.limiter = limiter or RateLimiter(settings.HELIUS_RPS, max_rate=settings.HELIUS_MAX_RPS)
         self.helius_api_key = settings.HELIUS_API_KEY
         self.helius_url = settings.HELIUS_URL
         self.min_balance_usd = settings.MIN_WHALE_BALANCE_USD  # e.g., 5000
         self.logger = SmartLogger("WhaleTracker", batch_size=10, flush_interval=30)
+        # All Helius traffic goes through this client and the shared limiter
+        self.rpc = SolanaRPC(helius_rpc_url(), self.http, self.limiter)
+        self.balance_resolver = BalanceResolver(self.rpc)
+        # Shared across token analyses, big wallets hold many pumped tokens
+        self.balance_cache = balance_cache if balance_cache is not None else BalanceCache()
+        self.holder_index = holder_index or HolderIndex()
+        self.max_holders = settings.MAX_HOLDERS  # 0 means no cap
+        self.price_table = price_table or PriceTable(self.http)
+        self.valuer = PortfolioValuer(self.rpc, self.price_table)
+        self.registry = registry if registry is not None else WhaleRegistry()
+        # Holders of every analyzed mint, to find wallets that keep showing up early
+        self.cooccurrence = cooccurrence if cooccurrence is not None else CoOccurrenceIndex()
+        # Holder count and concentration metrics per mint from the latest scan
+        self.holder_counts = {}
+        self.concentration = {}
+        self.min_position_share = settings.HOLDER_MIN_POSITION_SHARE
 
-    async def get_token_holders(self, token_mint_address):
-        url = f"{self.helius_url}{self.helius_api_key}"
+    def lamports_to_usd(self, lamports):
+        return lamports / 1e9 * self.price_table.sol_price
 
-        headers = {
-            "Content-Type": "application/json"
-        }
+    async def iter_holder_pages(self, token_mint_address, page_size=1000, book=None):
+        """Yields the owners of each getTokenAccounts page, following the cursor.
 
-        all_owners = set()
+        Only owners (and their amounts, into `book` if given) are kept from
+        every page, so memory stays bounded by the holder cap rather than by
+        the raw responses.
+        """
+        cursor = None
+        seen = 0
         page = 1
-        batch_size = 1000
 
-            
-        while len(all_owners) < 10000:
+        while not self.max_holders or seen < self.max_holders:
             params = {
-                "jsonrpc": "2.0",
-                "method": "getTokenAccounts",
-                "id": "helius-test",
-                "params": {
-                    "mint": token_mint_address,
-                    "limit": batch_size,
-                    "page": page,
-                }
+                "mint": token_mint_address,
+                "limit": page_size,
             }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("result") and data["result"]["token_accounts"]:
-                            new_owners = {account["owner"] for account in data["result"]["token_accounts"]}
-                            all_owners.update(new_owners)
-                            logger.info(f"Page {page}: Found {len(new_owners)} token holders. Total: {len(all_owners)}")
-                            page += 1
-                            if len(new_owners) < batch_size:  # No more holders to fetch
-                                break
-                        else:
-                            logger.warning(f"No token accounts found on page {page}")
-                            break
-                    else:
-                        logger.error(f"Error: Failed to fetch data with status code {response.status}")
-                        break
-                    
-                    await asyncio.sleep(0.1)  # Rate limiting
-        
+            if cursor:
+                params["cursor"] = cursor
+
+            data = await self.rpc.call("getTokenAccounts", params, PRIORITY_BULK)
+            if data is None:
+                logger.error(f"Error: Failed to fetch token accounts for {token_mint_address} on page {page}")
+                return
+            result = data.get("result") or {}
+            accounts = result.get("token_accounts") or []
+            if not accounts:
+                if page == 1:
+                    logger.warning(f"No token accounts found for {token_mint_address}")
+                return
+
+            owners = book.add_page(accounts) if book is not None else [account["owner"] for account in accounts]
+            seen += len(owners)
+            logger.debug(f"Page {page}: Found {len(owners)} token accounts. Total: {seen}")
+            yield owners
+
+            cursor = result.get("cursor")
+            if not cursor or len(accounts) < page_size:  # No more holders to fetch
+                return
+            page += 1
+
+    async def get_token_holders(self, token_mint_address):
+        all_owners = set()
+        async for owners in self.iter_holder_pages(token_mint_address):
+            all_owners.update(owners)
         return all_owners if all_owners else None
-    
-    async def get_wallet_balance(self, wallet_address):
-        url = f"{self.helius_url}{self.helius_api_key}"
-        headers = {
-            "Content-Type": "application/json"
-        }
 
-        params = {
-            "jsonrpc": "2.0",
-            "id": "helius-test",
-            "method": "getBalance",
-            "params": [wallet_address]
-        }
+    async def get_token_supply(self, token_mint_address):
+        """Raw token supply of a mint, None if the call failed"""
+        data = await self.rpc.call("getTokenSupply", [token_mint_address], PRIORITY_BULK)
+        try:
+            return float(data["result"]["value"]["amount"])
+        except (TypeError, KeyError, ValueError):
+            logger.warning(f"Could not fetch the supply of {token_mint_address}")
+            return None
 
-        # Implement exponential backoff
-        max_retries = 3
-        base_delay = 1.0
-
-        for attempt in range(max_retries):
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url, headers=headers, json=params) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            if "result" in data:
-                                balance_in_sol = data["result"]["value"] / 1e9
-                                sol_price_usd = 171.5  # Example fixed price
-                                balance_usd = balance_in_sol * sol_price_usd
-                                # Increased sleep time to avoid rate limiting
-                                await asyncio.sleep(0.5)  
-                                return balance_usd
-                        elif response.status == 429:
-                            delay = base_delay * (2 ** attempt)  # Exponential backoff
-                            await asyncio.sleep(delay)
-                            continue
-                        else:
-                            await asyncio.sleep(0.5)
-                            return 0
-            except Exception as e:
-                self.logger.error(f"Error getting balance for {wallet_address}: {e}")
-                await asyncio.sleep(0.5)
-        return 0
+    async def scan_holders(self, token_mint_address):
+        """Streams the holders of a mint and diffs the sizeable ones against the holder index.
 
+        Concentration metrics come from the amounts in the same responses.
+        Only holders with at least `min_position_share` of the supply go on
+        to wallet valuation, and only they are kept in the holder index, so
+        a holder whose position grows past the threshold counts as new.
+        """
+        book = HolderBook()
+        pages = 0
+        async for _ in self.iter_holder_pages(token_mint_address, book=book):
+            pages += 1
+        truncated = bool(self.max_holders) and len(book) >= self.max_holders
 
-        
-    async def process_holders_in_batches(self, holders, api_key, batch_size=25):  # Reduced batch size
+        amounts = book.amounts
+        # A complete scan sums to the supply, a capped one needs the mint's figure
+        supply = await self.get_token_supply(token_mint_address) if truncated else None
+        metrics = concentration(amounts, supply, min_position_share=self.min_position_share, truncated=truncated)
+        eligible = eligible_owners(book.owners, amounts, supply, self.min_position_share)
+
+        scan = self.holder_index.compare(token_mint_address, eligible, truncated)
+        self.holder_counts[token_mint_address] = len(book)
+        self.concentration[token_mint_address] = metrics.as_dict()
+        logger.info(
+            f"Holder scan for {token_mint_address}: {len(book)} holders in {pages} pages, "
+            f"{len(eligible)} above the position threshold, {len(scan.new)} new, {len(scan.departed)} departed"
+            + (" (incremental)" if scan.incremental else " (full)")
+            + f"; top10 {metrics.top_shares.get(10, 0):.1%}, gini {metrics.gini:.2f}, "
+            f"{metrics.wallets_above} wallets above {metrics.wallet_share:.0%}"
+        )
+        return scan
+
+    async def resolve_balances(self, addresses, priority=PRIORITY_BULK):
+        """Lamports per address, served from the balance cache where possible"""
+        return await self.balance_cache.get_many(
+            addresses, lambda missing: self.balance_resolver.resolve(missing, priority)
+        )
+
+    async def get_wallet_balance(self, wallet_address, priority=PRIORITY_LIVE):
+        """USD net worth (SOL and priced SPL tokens) of a single wallet"""
+        await self.price_table.ensure_fresh()
+        balances = await self.resolve_balances([wallet_address], priority)
+        net_worth = await self.valuer.value_wallets([wallet_address], balances, priority=priority)
+        return float(net_worth[0])
+
+    async def process_holders_in_batches(self, holders, api_key, batch_size=25, valuations=None):
         wealthy_holders = []
         holders_list = list(holders)
+        started = time.perf_counter()
         total_batches = (len(holders_list) + batch_size - 1) // batch_size
         
-        try:
-            await self.logger.info(f"Starting to process {len(holders_list)} holders in {total_batches} batches")
-        except Exception as e:
-            logger.error(f"Error logging batch start: {e}")
+        self.logger.info(f"Starting to process {len(holders_list)} holders in {total_batches} batches")
         
         batch_stats = {
             "processed": 0,
@@ -125,73 +170,118 @@ class WhaleTracker():
             "warnings": 0
         }
 
-        async with aiohttp.ClientSession() as session:
-            for i in range(0, len(holders_list), batch_size):
-                batch = holders_list[i:i + batch_size]
-                current_batch = i//batch_size + 1
-                
-                # Process batch with delay between each request
-                balances = []
-                for holder in batch:
-                    balance = await self.get_wallet_balance(holder)
-                    balances.append(balance)
-                    await asyncio.sleep(0.5)  # Add delay between individual requests
-                
-                batch_wealthy = []
-                for holder, balance in zip(batch, balances):
-                    batch_stats["total_balance"] += balance
-                    batch_stats["processed"] += 1
-                    
-                    if balance >= self.min_balance_usd:
-                        wealthy_holders.append(holder)
-                        batch_wealthy.append(f"{holder[:8]}... (${balance:.2f})")
-                        batch_stats["wealthy"] += 1
-                    elif balance == 0:
-                        batch_stats["warnings"] += 1
-                
-                try:
-                    if current_batch % 5 == 0 or current_batch == total_batches:
-                        await self.logger.info(
-                            f"Batch Progress Summary:\n"
-                            f"- Processed: {batch_stats['processed']}/{len(holders_list)}\n"
-                            f"- Wealthy found: {batch_stats['wealthy']}\n"
-                            f"- Average balance: ${batch_stats['total_balance']/batch_stats['processed']:.2f}\n"
-                            f"- Warnings: {batch_stats['warnings']}"
-                        )
-                    
-                    if batch_wealthy:
-                        await self.logger.info(f"New wealthy holders in batch {current_batch}: {batch_wealthy}")
-                except Exception as e:
-                    logger.error(f"Error logging batch progress: {e}")
+        # Resolve every holder up front (cache first, then packed getMultipleAccounts
+        # calls), batches below are only used for classification and progress reporting
+        rpc_calls_before = self.balance_resolver.rpc_calls
+        lamports = await self.resolve_balances(holders_list, PRIORITY_BULK)
+        rpc_calls = self.balance_resolver.rpc_calls - rpc_calls_before
+        if len(lamports) < len(holders_list):
+            # Valued with their token accounts only, their SOL is looked up again next time
+            self.logger.warning(f"No balance for {len(holders_list) - len(lamports)} holders after failed RPC calls")
+        uncached_calls = -(-len(holders_list) // self.balance_resolver.chunk_size)
+        self.logger.info(
+            f"Resolved {len(lamports)} balances in {rpc_calls} RPC calls, "
+            f"cache saved {max(0, uncached_calls - rpc_calls)} calls "
+            f"(cache size {len(self.balance_cache)})"
+        )
+
+        # USD net worth for all holders in one vectorized pass. Holders whose SOL
+        # already clears the threshold are not asked for their token accounts.
+        await self.price_table.ensure_fresh()
+        net_worth = await self.valuer.value_wallets(holders_list, lamports, threshold=self.min_balance_usd)
+
+        for i in range(0, len(holders_list), batch_size):
+            batch = holders_list[i:i + batch_size]
+            current_batch = i//batch_size + 1
+            
+            batch_wealthy = []
+            for holder, balance in zip(batch, net_worth[i:i + batch_size].tolist()):
+                batch_stats["total_balance"] += balance
+                batch_stats["processed"] += 1
                 
-                # Add delay between batches
-                await asyncio.sleep(2)  # Increased delay between batches
-        
+                if balance >= self.min_balance_usd:
+                    wealthy_holders.append(holder)
+                    if valuations is not None:
+                        valuations[holder] = balance
+                    batch_wealthy.append((holder, balance))
+                    batch_stats["wealthy"] += 1
+                elif balance == 0:
+                    batch_stats["warnings"] += 1
+            
+            # Per-batch findings are only counted, the summary below is logged once
+            if batch_wealthy:
+                holder, balance = batch_wealthy[0]
+                self.logger.event("New wealthy holders", len(batch_wealthy), sample=f"{holder[:8]}... (${balance:.2f})")
+
+        if holders_list:
+            self.logger.info(
+                f"Batch Progress Summary:\n"
+                f"- Processed: {batch_stats['processed']}/{len(holders_list)} in {total_batches} batches\n"
+                f"- Wealthy found: {batch_stats['wealthy']}\n"
+                f"- Average balance: ${batch_stats['total_balance']/batch_stats['processed']:.2f}\n"
+                f"- Warnings: {batch_stats['warnings']}"
+            )
+
+        HOLDERS_PROCESSED.inc(len(holders_list))
+        if holders_list:
+            HOLDERS_RATE.set(len(holders_list) / max(time.perf_counter() - started, 1e-9))
         return wealthy_holders
 
-    async def analyze_token(self, token_mint_address):
-        """Main method to analyze a single token"""
+    async def analyze_token(self, token_mint_address, holder_change=None):
+        """Main method to analyze a single token.
+
+        With `holder_change`, a re-analysis whose scan finds fewer than that
+        share of the holders new since the last valuation keeps the earlier
+        whales still holding, without valuing anyone.
+        """
         logger.info(f"Starting whale analysis for token {token_mint_address}")
-        holders = await self.get_token_holders(token_mint_address)
-        #holders = None J8A3ySxv6a8Fy1usD3kjznc2ySQMze3nsRngr7Xvpump
-        
+        scan = await self.scan_holders(token_mint_address)
+        holders = scan.owners
+
+        if holders and holder_change and scan.incremental and len(scan.new) < holder_change * len(holders):
+            # The index is left as it was, so the new holders add up until they are valued
+            wealthy_holders = sorted(scan.previous_wealthy & holders)
+            logger.info(f"Holders of {token_mint_address} moved by {len(scan.new)}/{len(holders)}, "
+                        f"below {holder_change:.0%}: kept {len(wealthy_holders)} whales")
+            await asyncio.to_thread(self.cooccurrence.update, token_mint_address, holders, wealthy_holders)
+            self.registry.record(wealthy_holders, token_mint_address)
+            await asyncio.to_thread(self.registry.flush)
+            return wealthy_holders
+
         if holders:
-            wealthy_holders = await self.process_holders_in_batches(holders, self.helius_api_key)
+            # Only holders that changed since the last scan need valuing, whales
+            # found before are kept as long as they still hold the token
+            valuations = {}
+            new_wealthy = await self.process_holders_in_batches(scan.new, self.helius_api_key, valuations=valuations)
+            wealthy_holders = sorted((scan.previous_wealthy & holders) | set(new_wealthy))
+            await asyncio.to_thread(self.holder_index.save, token_mint_address, holders, wealthy_holders)
+            await asyncio.to_thread(self.cooccurrence.update, token_mint_address, holders, wealthy_holders)
+
+            # Whales kept from the previous scan keep their last valuation
+            self.registry.record({holder: valuations.get(holder) for holder in wealthy_holders}, token_mint_address)
+            await asyncio.to_thread(self.registry.flush)
+            if self.balance_cache.path:
+                await asyncio.to_thread(self.balance_cache.save)
             
             # Prepare data to save
             from datetime import datetime
             data = {
                 "timestamp": datetime.now().isoformat(),
                 "token_mint": token_mint_address,
-                "total_holders": len(holders),
+                "total_holders": self.holder_counts.get(token_mint_address, len(holders)),
+                "valued_holders": len(holders),
+                "new_holders": len(scan.new),
+                "departed_holders": len(scan.departed),
                 "wealthy_holders": wealthy_holders,
-                "wealthy_holders_count": len(wealthy_holders)
+                "wealthy_holders_count": len(wealthy_holders),
+                "concentration": self.concentration.get(token_mint_address)
             }
             
-            # Generate filename with current datetime
-            filename = f"whales_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            # Generate filename with current datetime; workers analyze several mints per second
+            filename = f"whales_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{token_mint_address}.json"
             filepath = f"{settings.WHALE_DATA_PATH}/{filename}"
             
+            os.makedirs(settings.WHALE_DATA_PATH, exist_ok=True)
             async with aiofiles.open(filepath, 'w') as f:
                 await f.write(json.dumps(data, indent=4))
             logger.info(f"Whale data saved to {filepath}")
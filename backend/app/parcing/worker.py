@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+from parcing.cache import BalanceCache
+from parcing.job_queue import SqliteJobQueue
+from parcing.registry import WhaleRegistry
+from parcing.valuation import PriceTable
+from parcing.whales import WhaleTracker
+from utils.config import settings
+from utils.http_client import HttpClient
+from utils.metrics import metrics
+from utils.ratelimit import RateLimiter
+from utils.slogger import flush_loggers, setup_queue_logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WORKER_JOBS = metrics.counter("analysis_worker_jobs", "Queued whale analyses by outcome (done, failed, lost)", ["result"])
+
+
+class ScanRecorder:
+    """Stands in for the co-occurrence index in worker processes.
+
+    The holders of each scan travel with the published result and the
+    orchestrator updates the one shared index from them.
+    """
+
+    def __init__(self):
+        self.scans = {}
+
+    def update(self, mint, holders, wealthy=(), now=None):
+        self.scans[mint] = sorted(holders)
+        return len(holders)
+
+
+class AnalysisWorker:
+    """Leases analyze_token jobs from the SQLite queue and publishes the whales found.
+
+    The lease is renewed every third of its length while the analysis runs;
+    if renewal fails the job was cancelled or handed to another worker and
+    the analysis is abandoned.
+    """
+
+    def __init__(self, queue, whale_tracker, worker_id=None, partitions=(), idle_sleep=1.0):
+        self.queue = queue
+        self.whale_tracker = whale_tracker
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.partitions = tuple(partitions)
+        self.idle_sleep = idle_sleep
+        self.stats = {"done": 0, "failed": 0, "lost": 0}
+
+    async def _heartbeat(self, job, task):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not await asyncio.to_thread(self.queue.heartbeat, job):
+                logger.info(f"Lease on {job.mint} lost, abandoning the analysis")
+                task.cancel()
+                return
+
+    async def run_job(self, job):
+        task = asyncio.create_task(self.whale_tracker.analyze_token(job.mint, job.payload.get("holder_change")))
+        heartbeat = asyncio.create_task(self._heartbeat(job, task))
+        try:
+            wealthy = await task
+        except asyncio.CancelledError:
+            if heartbeat.done():
+                result = "lost"
+            else:
+                raise
+        except Exception as e:
+            logger.error(f"Whale analysis failed for {job.mint} (attempt {job.attempts}): {e}")
+            status = await asyncio.to_thread(self.queue.fail, job, e)
+            result = "failed"
+            logger.info(f"Job {job.mint} {status}")
+        else:
+            registry = self.whale_tracker.registry
+            # Published with their valuations, so the orchestrator's registry gets the same data
+            published = {
+                "wealthy": {address: getattr(registry.get(address), "valuation", None) for address in wealthy or []},
+                "concentration": self.whale_tracker.concentration.get(job.mint),
+                "holders": self.whale_tracker.cooccurrence.scans.pop(job.mint, None),
+            }
+            holders = self.whale_tracker.holder_counts.get(job.mint)
+            done = await asyncio.to_thread(self.queue.complete, job, published, holders)
+            result = "done" if done else "lost"
+        finally:
+            heartbeat.cancel()
+        self.stats[result] += 1
+        WORKER_JOBS.labels(result).inc()
+        return result
+
+    async def run(self):
+        logger.info(f"Analysis worker {self.worker_id} started (partitions {list(self.partitions)})")
+        while True:
+            job = await asyncio.to_thread(self.queue.lease, self.worker_id, self.partitions)
+            if job is None:
+                await asyncio.sleep(self.idle_sleep)
+                continue
+            await self.run_job(job)
+
+
+async def _worker_main(index, count, queue_path):
+    http = HttpClient()
+    # Each process values with its own caches; the per-mint partitioning
+    # keeps a mint on the same worker while it is not idle
+    whale_tracker = WhaleTracker(http=http, limiter=RateLimiter(settings.HELIUS_RPS / count,
+                                                               max_rate=settings.HELIUS_MAX_RPS / count,
+                                                               name=f"worker{index}"),
+                                 balance_cache=BalanceCache(path="", name=f"worker{index}"), price_table=PriceTable(http),
+                                 registry=WhaleRegistry(path="", legacy_dir=""), cooccurrence=ScanRecorder())
+    queue = SqliteJobQueue(queue_path)
+    partitions = [p for p in range(queue.partitions) if p % count == index]
+    worker = AnalysisWorker(queue, whale_tracker, partitions=partitions)
+    try:
+        await worker.run()
+    finally:
+        queue.close()
+        await http.close()
+
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+
+def worker_process(index, count, queue_path=None):
+    """Entry point of one worker process"""
+    # The parent stops its pool with SIGTERM, Ctrl-C in the terminal is left to it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _terminate)
+    if settings.LOG_QUEUE:
+        setup_queue_logging(settings.LOG_FLUSH_INTERVAL)
+    try:
+        asyncio.run(_worker_main(index, count, queue_path))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        flush_loggers()
+
+
+class WorkerPool:
+    """Worker processes, started with spawn so none inherits the parent's event loop"""
+
+    def __init__(self, count, queue_path=None):
+        self.count = count
+        self.queue_path = queue_path
+        self.processes = []
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        for index in range(self.count):
+            process = context.Process(target=worker_process, args=(index, self.count, self.queue_path),
+                                      name=f"analysis-worker-{index}", daemon=True)
+            process.start()
+            self.processes.append(process)
+        logger.info(f"Started {self.count} analysis worker processes")
+
+    def stop(self, timeout=10):
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join(timeout)
+        self.processes = []
+
+    def join(self):
+        for process in self.processes:
+            process.join()
@@ -0,0 +1,257 @@
+import asyncio
+import inspect
+import itertools
+import json
+import logging
+import random
+import time
+import websockets
+from utils.config import settings
+from utils.metrics import metrics
+from utils.ratelimit import TokenBucket
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACCOUNT_CONFIG = {"encoding": "jsonParsed", "commitment": "confirmed"}
+
+WS_MESSAGES = metrics.counter("ws_messages", "Messages received on whale WebSocket connections")
+WS_CONNECTED = metrics.gauge("ws_connections", "Open whale WebSocket connections")
+
+
+class _Shard:
+    """One WebSocket connection carrying the subscriptions of up to
+    `per_connection` addresses.
+
+    `addresses` is the desired state; `subscribed`/`subscriptions` are what the
+    current connection actually has. Subscribe and unsubscribe requests go
+    through an outbox drained by a writer task, so changes never block callers.
+    """
+
+    def __init__(self, manager, index):
+        self.manager = manager
+        self.index = index
+        self.addresses = set()
+        self.subscribed = {}      # address -> subscription id
+        self.subscriptions = {}   # subscription id -> address
+        self.inflight = set()     # addresses with an accountSubscribe awaiting its answer
+        self.pending = {}         # request id -> (method, address or subscription id)
+        self.outbox = asyncio.Queue()
+        self.websocket = None
+        self.task = None
+        self.connects = 0
+
+    @property
+    def connected(self):
+        return self.websocket is not None
+
+    def want(self, address):
+        self.addresses.add(address)
+        if self.connected:
+            self.outbox.put_nowait(("accountSubscribe", address))
+
+    def drop(self, address):
+        self.addresses.discard(address)
+        subscription = self.subscribed.pop(address, None)
+        if subscription is not None:
+            del self.subscriptions[subscription]
+            if self.connected:
+                self.outbox.put_nowait(("accountUnsubscribe", subscription))
+        # An in-flight subscribe is cancelled when its answer arrives
+
+    def _reset(self):
+        self.websocket = None
+        self.subscribed.clear()
+        self.subscriptions.clear()
+        self.inflight.clear()
+        self.pending.clear()
+        self.outbox = asyncio.Queue()
+
+    async def _writer(self, websocket):
+        while True:
+            method, target = await self.outbox.get()
+            if method == "accountSubscribe":
+                if target not in self.addresses or target in self.subscribed or target in self.inflight:
+                    continue
+                self.inflight.add(target)
+                params = [target, self.manager.account_config]
+            else:
+                params = [target]
+            await self.manager.pace()
+            request_id = next(self.manager.request_ids)
+            self.pending[request_id] = (method, target)
+            self.manager.stats[method] += 1
+            await websocket.send(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}))
+
+    def _on_response(self, message):
+        method, target = self.pending.pop(message["id"], (None, None))
+        if method != "accountSubscribe":
+            return
+        self.inflight.discard(target)
+        if "error" in message:
+            self.manager.stats["errors"] += 1
+            logger.warning(f"Shard {self.index}: accountSubscribe failed for {target}: {message['error']}")
+            return
+        subscription = message["result"]
+        if target in self.addresses and target not in self.subscribed:
+            self.subscribed[target] = subscription
+            self.subscriptions[subscription] = target
+        else:
+            # Removed while the request was in flight
+            self.outbox.put_nowait(("accountUnsubscribe", subscription))
+
+    async def _on_message(self, raw):
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            logger.warning(f"Shard {self.index}: undecodable message {raw[:200]!r}")
+            return
+        if "id" in message:
+            self._on_response(message)
+        elif message.get("method") == "accountNotification":
+            params = message["params"]
+            address = self.subscriptions.get(params["subscription"])
+            if address is not None:
+                self.manager.stats["notifications"] += 1
+                result = self.manager.on_notification(address, params["result"])
+                if inspect.isawaitable(result):
+                    # An async handler applies backpressure to this connection
+                    await result
+
+    async def run(self):
+        attempt = 0
+        while True:
+            writer = None
+            try:
+                async with websockets.connect(self.manager.ws_url, max_size=None) as websocket:
+                    self.websocket = websocket
+                    self.connects += 1
+                    attempt = 0
+                    # Only this shard's addresses are restored after a reconnect
+                    for address in self.addresses:
+                        self.outbox.put_nowait(("accountSubscribe", address))
+                    logger.info(f"Shard {self.index} connected, subscribing {len(self.addresses)} addresses")
+                    writer = asyncio.create_task(self._writer(websocket))
+                    async for raw in websocket:
+                        WS_MESSAGES.inc()
+                        await self._on_message(raw)
+                    logger.warning(f"Shard {self.index}: WebSocket connection closed")
+            except (OSError, websockets.WebSocketException) as e:
+                logger.error(f"Shard {self.index}: WebSocket error: {e}")
+            finally:
+                if writer is not None:
+                    writer.cancel()
+                    await asyncio.gather(writer, return_exceptions=True)
+                self._reset()
+
+            # Jittered exponential backoff keeps shards from reconnecting in lockstep
+            delay = min(self.manager.max_backoff, self.manager.backoff * 2 ** attempt)
+            attempt += 1
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+
+class SubscriptionManager:
+    """`accountSubscribe` per address, multiplexed over a pool of WebSocket connections.
+
+    Addresses are packed into shards of at most `per_connection`
+    subscriptions, each shard owns one connection. `add`/`remove` apply
+    subscribe/unsubscribe diffs live; a dropped connection re-subscribes only
+    its own shard. Subscribe traffic from all shards shares one token bucket
+    of `subscribe_rate` messages/second.
+    """
+
+    def __init__(self, ws_url, per_connection=None, subscribe_rate=None, on_notification=None,
+                 account_config=None, backoff=1.0, max_backoff=60.0):
+        self.ws_url = ws_url
+        self.per_connection = per_connection or settings.WS_SUBSCRIPTIONS_PER_CONNECTION
+        rate = subscribe_rate or settings.WS_SUBSCRIBE_RPS
+        self._bucket = TokenBucket(rate, capacity=rate)
+        self.on_notification = on_notification or self._log_notification
+        self.account_config = account_config or ACCOUNT_CONFIG
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.request_ids = itertools.count(1)
+        self.shards = []
+        self.shard_of = {}        # address -> shard
+        self.stats = {"accountSubscribe": 0, "accountUnsubscribe": 0, "notifications": 0, "errors": 0}
+        self._running = False
+        WS_CONNECTED.set_function(lambda: sum(1 for shard in self.shards if shard.connected))
+
+    @staticmethod
+    def _log_notification(address, result):
+        logger.info(f"Account update for {address} at slot {result.get('context', {}).get('slot')}")
+
+    def __len__(self):
+        return len(self.shard_of)
+
+    def __contains__(self, address):
+        return address in self.shard_of
+
+    async def pace(self):
+        while True:
+            delay = self._bucket.delay(time.monotonic())
+            if delay <= 0:
+                self._bucket.consume()
+                return
+            await asyncio.sleep(delay)
+
+    def _shard_with_room(self):
+        for shard in self.shards:
+            if len(shard.addresses) < self.per_connection:
+                return shard
+        shard = _Shard(self, len(self.shards))
+        self.shards.append(shard)
+        if self._running:
+            shard.task = asyncio.create_task(shard.run())
+        return shard
+
+    def add(self, addresses):
+        """Starts watching `addresses`, returns how many were new"""
+        added = 0
+        for address in addresses:
+            if address in self.shard_of:
+                continue
+            shard = self._shard_with_room()
+            shard.want(address)
+            self.shard_of[address] = shard
+            added += 1
+        return added
+
+    def remove(self, addresses):
+        """Stops watching `addresses`, returns how many were watched"""
+        removed = 0
+        for address in addresses:
+            shard = self.shard_of.pop(address, None)
+            if shard is not None:
+                shard.drop(address)
+                removed += 1
+        return removed
+
+    def subscribed_count(self):
+        return sum(len(shard.subscribed) for shard in self.shards)
+
+    def snapshot_stats(self):
+        return {
+            **self.stats,
+            "watched": len(self.shard_of),
+            "subscribed": self.subscribed_count(),
+            "shards": len(self.shards),
+            "connected": sum(1 for shard in self.shards if shard.connected),
+        }
+
+    async def run(self):
+        """Runs every shard until cancelled"""
+        self._running = True
+        for shard in self.shards:
+            if shard.task is None:
+                shard.task = asyncio.create_task(shard.run())
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._running = False
+            tasks = [shard.task for shard in self.shards if shard.task is not None]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for shard in self.shards:
+                shard.task = None
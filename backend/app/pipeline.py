@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Set
+from parcing.cdc import ChangeSet
+from utils.config import settings
+from utils.metrics import metrics
+from utils.snapshots import SNAPSHOT_EXTENSION, write_snapshot
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = metrics.gauge("queue_depth", "Items waiting in an internal queue", ["queue"])
+
+
+@dataclass
+class RawSnapshot:
+    timestamp: str
+    tokens: List[dict]
+
+
+@dataclass
+class EnrichedSnapshot:
+    timestamp: str
+    tokens: List[dict]                  # only the tokens that are new or changed
+    changes: Optional[ChangeSet] = None
+
+
+@dataclass
+class PumpedBatch:
+    timestamp: str
+    tokens: List[dict]
+    superseded: Optional[Set[str]] = None   # mints whose running analyses are outdated
+
+
+@dataclass
+class WhaleResult:
+    mint: str
+    wealthy_holders: List[str] = field(default_factory=list)
+
+
+class SnapshotFileSink:
+    """Optional async persistence of pipeline snapshots.
+
+    Writes happen on their own task behind a bounded queue, so a slow disk
+    never stalls the pipeline; when the queue is full the snapshot is skipped.
+    """
+
+    def __init__(self, queue_size=16):
+        self.dirs = {
+            "raw": settings.RAW_DATA_FILEPATH,
+            "clean": settings.CLEAN_DATA_FILEPATH,
+            "pumped": settings.PUMPED_DATA_FILEPATH,
+        }
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def submit(self, kind, timestamp, data):
+        try:
+            self.queue.put_nowait((kind, timestamp, data))
+        except asyncio.QueueFull:
+            logger.warning(f"Snapshot sink is full, not persisting {kind} snapshot {timestamp}")
+
+    async def run(self):
+        while True:
+            kind, timestamp, data = await self.queue.get()
+            try:
+                filename = os.path.join(self.dirs[kind], f"data_{timestamp}{SNAPSHOT_EXTENSION}")
+                await asyncio.to_thread(write_snapshot, filename, data)
+                logger.info(f"Saved {kind} snapshot to {filename}")
+            except Exception as e:
+                logger.error(f"Error persisting {kind} snapshot {timestamp}: {e}")
+            finally:
+                self.queue.task_done()
+
+
+class Pipeline:
+    """In-process pipeline: collector -> enrichment -> pump detection -> whale analysis -> subscription.
+
+    Stages are tasks connected by bounded queues and pass snapshots as
+    objects. A full queue applies backpressure to the stage before it.
+    """
+
+    def __init__(self, collector, processor, scheduler, whale_subscription,
+                 sink=None, history=None, queue_size=None):
+        self.collector = collector
+        self.processor = processor
+        self.scheduler = scheduler
+        self.whale_subscription = whale_subscription
+        self.sink = sink
+        self.history = history
+        queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+        self.raw_queue = asyncio.Queue(maxsize=queue_size)
+        self.enriched_queue = asyncio.Queue(maxsize=queue_size)
+        self.pumped_queue = asyncio.Queue(maxsize=queue_size)
+        self.whale_queue = asyncio.Queue(maxsize=queue_size * 16)
+        self._tasks = []
+        for name in ("raw", "enriched", "pumped", "whale"):
+            QUEUE_DEPTH.labels(f"pipeline_{name}").set_function(getattr(self, f"{name}_queue").qsize)
+
+    def _persist(self, kind, timestamp, data):
+        if self.sink is not None:
+            self.sink.submit(kind, timestamp, data)
+
+    async def on_analysis_done(self, job):
+        """AnalysisScheduler result callback, feeds the subscription stage"""
+        await self.whale_queue.put(WhaleResult(job.mint, job.result))
+
+    async def collect_stage(self):
+        # The collector polls each feed on its own schedule and only yields new data
+        async for tokens in self.collector.snapshots():
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self._persist("raw", timestamp, tokens)
+            await self.raw_queue.put(RawSnapshot(timestamp, tokens))
+
+    async def enrich_stage(self):
+        while True:
+            snapshot = await self.raw_queue.get()
+            try:
+                # Only new, changed or refresh-due feed items are enriched and sampled
+                tracker = self.processor.cdc.begin()
+                enriched = await self.processor.enrich_tokens([token for token in snapshot.tokens
+                                                               if tracker.select(token)])
+                self.processor.price_table.update_from_pairs(enriched)
+                if self.history is not None and enriched:
+                    collected_at = datetime.strptime(snapshot.timestamp, "%Y%m%d_%H%M%S")
+                    await asyncio.to_thread(self.history.append_snapshot, collected_at, enriched)
+                # Only new and materially changed tokens go further down the pipeline
+                for token in enriched:
+                    tracker.feed(token)
+                changes = tracker.finish()
+                if not changes.changed and not changes.removed:
+                    continue
+                self._persist("clean", snapshot.timestamp, changes.changed)
+                await self.enriched_queue.put(EnrichedSnapshot(snapshot.timestamp, changes.changed, changes))
+            except Exception as e:
+                logger.error(f"Enrichment failed for snapshot {snapshot.timestamp}: {e}")
+
+    async def pump_stage(self):
+        while True:
+            snapshot = await self.enriched_queue.get()
+            try:
+                collected_at = datetime.strptime(snapshot.timestamp, "%Y%m%d_%H%M%S")
+                pumped = self.processor.filter_pumped_tokens(snapshot.tokens, collected_at)
+                superseded = snapshot.changes.superseded(pumped) if snapshot.changes is not None else None
+                logger.info(f"Snapshot {snapshot.timestamp}: {len(pumped)} pumped tokens "
+                            f"out of {len(snapshot.tokens)} changed")
+                if pumped:
+                    self._persist("pumped", snapshot.timestamp, pumped)
+                if pumped or superseded:
+                    await self.pumped_queue.put(PumpedBatch(snapshot.timestamp, pumped, superseded))
+            except Exception as e:
+                logger.error(f"Pump detection failed for snapshot {snapshot.timestamp}: {e}")
+
+    async def analysis_stage(self):
+        while True:
+            batch = await self.pumped_queue.get()
+            try:
+                self.scheduler.submit_snapshot(batch.tokens, superseded=batch.superseded)
+            except Exception as e:
+                logger.error(f"Scheduling analyses failed for snapshot {batch.timestamp}: {e}")
+
+    async def subscription_stage(self):
+        while True:
+            result = await self.whale_queue.get()
+            try:
+                logger.info(f"Found {len(result.wealthy_holders)} whale addresses for token {result.mint}")
+                await self.whale_subscription.add_addresses(result.wealthy_holders, result.mint)
+            except Exception as e:
+                logger.error(f"Subscribing the whales of {result.mint} failed: {e}")
+
+    async def run(self):
+        stages = [
+            self.collect_stage(),
+            self.enrich_stage(),
+            self.pump_stage(),
+            self.analysis_stage(),
+            self.subscription_stage(),
+        ]
+        if self.sink is not None:
+            stages.append(self.sink.run())
+        self._tasks = [asyncio.create_task(stage) for stage in stages]
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,375 @@
+"""Cross-token holder index: which wallets keep showing up in pumped tokens.
+
+Wallet addresses are decoded from base58 to their 32-byte public keys and
+mapped to integer ids by an append-only dictionary. Each analyzed mint keeps
+sorted id arrays of its early holders (the first scan after it pumped), of
+every holder seen since and of its whales, so a 10k-holder token costs 40 KB
+instead of a set of 10k Python strings. Per-wallet token counts are kept up
+to date on every update, which makes "wallets seen in N pumped tokens"
+a single array scan.
+
+Queries from backend/app:
+    python -m storage.cooccurrence info
+    python -m storage.cooccurrence import ../data/holders ../data/whales
+    python -m storage.cooccurrence top --min-tokens 3 --early
+    python -m storage.cooccurrence common MINT MINT [MINT ...]
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import reduce
+from glob import glob
+import numpy as np
+from utils.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_DIGITS = {char: value for value, char in enumerate(ALPHABET)}
+KEY_SIZE = 32
+# Fixed-width byte strings: every key is exactly KEY_SIZE bytes, so they compare and sort as raw bytes
+KEY_DTYPE = np.dtype(f"S{KEY_SIZE}")
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def decode_pubkey(address):
+    """Base58 address -> 32-byte public key, ValueError if it is not one"""
+    number = 0
+    try:
+        for char in address:
+            number = number * 58 + _DIGITS[char]
+    except KeyError:
+        raise ValueError(f"Not a base58 address: {address!r}") from None
+    zeros = len(address) - len(address.lstrip("1"))
+    key = b"\0" * zeros + number.to_bytes((number.bit_length() + 7) // 8, "big")
+    if len(key) != KEY_SIZE:
+        raise ValueError(f"Not a 32-byte public key: {address!r}")
+    return key
+
+
+_DIGIT_TABLE = np.full(256, 255, dtype=np.uint8)
+_DIGIT_TABLE[np.frombuffer(ALPHABET.encode(), dtype=np.uint8)] = np.arange(58, dtype=np.uint8)
+_MAX_CHARS = 44
+
+
+def decode_pubkeys(addresses):
+    """Vectorized decode_pubkey: (n, 32) uint8 keys and a mask of the addresses that decoded.
+
+    Every address is left-padded with "1" (digit 0) to 44 characters and
+    converted by Horner's rule on eight 32-bit limbs, all rows at once.
+    """
+    count = len(addresses)
+    valid = np.fromiter((32 <= len(address) <= _MAX_CHARS for address in addresses), dtype=bool, count=count)
+    padded = "".join(address.rjust(_MAX_CHARS, "1") if ok else "1" * _MAX_CHARS
+                     for address, ok in zip(addresses, valid))
+    raw = np.frombuffer(padded.encode("ascii", errors="replace"), dtype=np.uint8)
+    if len(raw) != count * _MAX_CHARS:
+        # Non-ASCII characters: fall back to one address at a time
+        return _decode_each(addresses)
+    digits = _DIGIT_TABLE[raw.reshape(count, _MAX_CHARS)]
+    valid &= (digits != 255).all(axis=1)
+    digits[~valid] = 0
+
+    # Two digits per step: 58**2 * 2**32 still fits in 64 bits
+    pairs = digits[:, 0::2].astype(np.uint64) * 58 + digits[:, 1::2]
+    limbs = np.zeros((8, count), dtype=np.uint64)     # least significant limb first
+    overflow = np.zeros(count, dtype=bool)
+    for column in pairs.T:
+        carry = column
+        for limb in limbs:
+            value = limb * 3364 + carry
+            limb[:] = value & 0xFFFFFFFF
+            carry = value >> 32
+        overflow |= carry != 0
+    valid &= ~overflow
+    keys = np.ascontiguousarray(limbs[::-1].T).astype(">u4").view(np.uint8).reshape(count, KEY_SIZE)
+    return keys, valid
+
+
+def _decode_each(addresses):
+    keys = np.zeros((len(addresses), KEY_SIZE), dtype=np.uint8)
+    valid = np.zeros(len(addresses), dtype=bool)
+    for row, address in enumerate(addresses):
+        try:
+            keys[row] = np.frombuffer(decode_pubkey(address), dtype=np.uint8)
+            valid[row] = True
+        except ValueError:
+            pass
+    return keys, valid
+
+
+def encode_pubkey(key):
+    number = int.from_bytes(key, "big")
+    chars = []
+    while number:
+        number, digit = divmod(number, 58)
+        chars.append(ALPHABET[digit])
+    zeros = len(key) - len(key.lstrip(b"\0"))
+    return "1" * zeros + "".join(reversed(chars))
+
+
+@dataclass
+class MintPostings:
+    """Wallet ids of one mint, each array sorted and unique"""
+    mint: str
+    first_seen: float
+    updated_at: float
+    early: np.ndarray       # holders of the first scan
+    seen: np.ndarray        # every holder of any scan
+    wealthy: np.ndarray     # whales found in any scan
+
+
+class CoOccurrenceIndex:
+    def __init__(self, path=None):
+        # An empty path keeps the index in memory only
+        self.path = path if path is not None else settings.COOCCURRENCE_PATH
+        self.keys_path = os.path.join(self.path, "wallets.bin")
+        self.mints_path = os.path.join(self.path, "mints")
+        # Wallet dictionary: keys by id, plus the keys in sorted order with their ids for lookups
+        self._keys = np.zeros(0, dtype=KEY_DTYPE)
+        self._sorted_keys = np.zeros(0, dtype=KEY_DTYPE)
+        self._sorted_ids = _EMPTY.copy()
+        self.wallets = 0
+        self._keys_saved = 0
+        self.mints = {}
+        # Tokens per wallet id: all holders, early holders, as a whale
+        self.counts = {"seen": _EMPTY.copy(), "early": _EMPTY.copy(), "wealthy": _EMPTY.copy()}
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def __len__(self):
+        return len(self.mints)
+
+    # Wallet dictionary
+
+    def _wallet_ids(self, addresses, create=True):
+        """Sorted unique ids of `addresses`; unknown wallets are added unless `create` is False.
+
+        Lookups are one searchsorted over the sorted keys, so there is no
+        per-wallet Python object: the dictionary costs 68 bytes per wallet.
+        """
+        addresses = list(addresses)
+        keys, valid = decode_pubkeys(addresses)
+        self.skipped += int(len(addresses) - valid.sum())
+        keys = np.unique(keys[valid].view(KEY_DTYPE).ravel())
+        positions = np.searchsorted(self._sorted_keys, keys)
+        found = positions < len(self._sorted_keys)
+        found[found] = self._sorted_keys[positions[found]] == keys[found]
+        ids = np.empty(len(keys), dtype=np.int32)
+        ids[found] = self._sorted_ids[positions[found]]
+        if not create:
+            return np.sort(ids[found])
+
+        new = ~found
+        added = int(new.sum())
+        if added:
+            new_ids = np.arange(self.wallets, self.wallets + added, dtype=np.int32)
+            ids[new] = new_ids
+            if self.wallets + added > len(self._keys):
+                grown = np.zeros(max(self.wallets + added, 2 * len(self._keys)), dtype=KEY_DTYPE)
+                grown[:self.wallets] = self._keys[:self.wallets]
+                self._keys = grown
+            self._keys[self.wallets:self.wallets + added] = keys[new]
+            self.wallets += added
+            self._sorted_keys = np.insert(self._sorted_keys, positions[new], keys[new])
+            self._sorted_ids = np.insert(self._sorted_ids, positions[new], new_ids)
+        return np.sort(ids)
+
+    def address(self, wallet_id):
+        return encode_pubkey(self._keys[int(wallet_id):int(wallet_id) + 1].tobytes())
+
+    def _grow_counts(self):
+        for name, counts in self.counts.items():
+            if len(counts) < self.wallets:
+                grown = np.zeros(max(self.wallets, 2 * len(counts)), dtype=np.int32)
+                grown[:len(counts)] = counts
+                self.counts[name] = grown
+
+    # Updates
+
+    def update(self, mint, holders, wealthy=(), now=None):
+        """Adds the holders and whales of one scan of `mint`, returns the number of wallets new to it"""
+        now = now or time.time()
+        with self._lock:
+            ids = self._wallet_ids(holders)
+            wealthy_ids = self._wallet_ids(wealthy)
+            self._grow_counts()
+            entry = self.mints.get(mint)
+            if entry is None:
+                entry = self.mints[mint] = MintPostings(mint, now, now, early=ids, seen=ids, wealthy=wealthy_ids)
+                added, added_wealthy = ids, wealthy_ids
+                self.counts["early"][ids] += 1
+            else:
+                added = np.setdiff1d(ids, entry.seen, assume_unique=True)
+                added_wealthy = np.setdiff1d(wealthy_ids, entry.wealthy, assume_unique=True)
+                entry.seen = np.union1d(entry.seen, added).astype(np.int32)
+                entry.wealthy = np.union1d(entry.wealthy, added_wealthy).astype(np.int32)
+                entry.updated_at = now
+            self.counts["seen"][added] += 1
+            self.counts["wealthy"][added_wealthy] += 1
+            self._save(entry)
+        return len(added)
+
+    # Queries
+
+    def postings(self, mint, kind="seen"):
+        entry = self.mints.get(mint)
+        return getattr(entry, kind) if entry is not None else _EMPTY
+
+    def intersect(self, mints, kind="seen"):
+        """Sorted ids of the wallets found in every one of `mints`"""
+        arrays = sorted((self.postings(mint, kind) for mint in mints), key=len)
+        if not arrays:
+            return _EMPTY
+        return reduce(lambda left, right: np.intersect1d(left, right, assume_unique=True), arrays)
+
+    def common_wallets(self, mints, kind="seen"):
+        return [self.address(wallet_id) for wallet_id in self.intersect(mints, kind)]
+
+    def top_wallets(self, k=20, min_tokens=2, kind="seen"):
+        """Up to `k` (address, tokens) pairs of the wallets found in at least `min_tokens` mints, most first.
+
+        `kind` counts every holder ("seen"), early holders only ("early") or whales ("wealthy").
+        """
+        counts = self.counts[kind][:self.wallets]
+        candidates = np.flatnonzero(counts >= min_tokens)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-counts[candidates], k - 1)[:k]]
+        order = candidates[np.lexsort((candidates, -counts[candidates]))]
+        return [(self.address(wallet_id), int(counts[wallet_id])) for wallet_id in order]
+
+    def tokens_of(self, address, kind="seen"):
+        """Mints in which `address` was found"""
+        ids = self._wallet_ids([address], create=False)
+        if not len(ids):
+            return []
+        wallet_id = ids[0]
+        found = []
+        for mint, entry in self.mints.items():
+            postings = getattr(entry, kind)
+            position = np.searchsorted(postings, wallet_id)
+            if position < len(postings) and postings[position] == wallet_id:
+                found.append(mint)
+        return found
+
+    def nbytes(self):
+        """Bytes held by the id arrays and the packed keys, the dictionary's hash table excluded"""
+        postings = sum(entry.early.nbytes + entry.seen.nbytes + entry.wealthy.nbytes for entry in self.mints.values())
+        dictionary = self._keys.nbytes + self._sorted_keys.nbytes + self._sorted_ids.nbytes
+        return postings + dictionary + sum(counts.nbytes for counts in self.counts.values())
+
+    # Persistence
+
+    def _mint_file(self, mint):
+        return os.path.join(self.mints_path, f"{mint}.npz")
+
+    def _save(self, entry):
+        if not self.path:
+            return
+        os.makedirs(self.mints_path, exist_ok=True)
+        # Keys first, so a saved mint never references an unsaved wallet id
+        if self.wallets > self._keys_saved:
+            with open(self.keys_path, "ab") as f:
+                f.write(self._keys[self._keys_saved:self.wallets].tobytes())
+            self._keys_saved = self.wallets
+        tmp_path = f"{self._mint_file(entry.mint)}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, early=entry.early, seen=entry.seen, wealthy=entry.wealthy,
+                     times=np.array([entry.first_seen, entry.updated_at]))
+        os.replace(tmp_path, self._mint_file(entry.mint))
+
+    def load(self):
+        if not self.path or not os.path.exists(self.keys_path):
+            return
+        started = time.perf_counter()
+        # A torn last key from an interrupted append is dropped
+        self.wallets = os.path.getsize(self.keys_path) // KEY_SIZE
+        self._keys = np.fromfile(self.keys_path, dtype=KEY_DTYPE, count=self.wallets)
+        self._keys_saved = self.wallets
+        self._sorted_ids = np.argsort(self._keys, kind="stable").astype(np.int32)
+        self._sorted_keys = self._keys[self._sorted_ids]
+
+        for filename in glob(os.path.join(self.mints_path, "*.npz")):
+            mint = os.path.basename(filename)[:-len(".npz")]
+            try:
+                with np.load(filename) as data:
+                    first_seen, updated_at = data["times"].tolist()
+                    entry = MintPostings(mint, first_seen, updated_at, data["early"], data["seen"], data["wealthy"])
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping co-occurrence postings {filename}: {e}")
+                continue
+            if len(entry.seen) and entry.seen[-1] >= self.wallets:
+                logger.warning(f"Skipping co-occurrence postings {filename}: unknown wallet ids")
+                continue
+            self.mints[mint] = entry
+
+        size = self.wallets
+        for kind in self.counts:
+            arrays = [getattr(entry, kind) for entry in self.mints.values()]
+            self.counts[kind] = np.bincount(np.concatenate(arrays), minlength=size).astype(np.int32) \
+                if arrays else np.zeros(size, dtype=np.int32)
+        logger.info(f"Loaded co-occurrence index: {len(self.mints)} mints, {size} wallets "
+                    f"in {time.perf_counter() - started:.2f}s")
+
+    def import_files(self, directories):
+        """Imports holder index files (owners per mint) and legacy whales_*.json results"""
+        scans = []
+        for directory in directories:
+            for filename in glob(os.path.join(directory, "*.json")):
+                try:
+                    with open(filename, "r") as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping {filename}: {e}")
+                    continue
+                mint = data.get("mint") or data.get("token_mint")
+                if not mint:
+                    continue
+                wealthy = data.get("wealthy", data.get("wealthy_holders")) or []
+                holders = data.get("owners") or wealthy
+                scans.append((data.get("updated_at") or os.path.getmtime(filename), mint, holders, wealthy))
+        scans.sort(key=lambda scan: scan[0])
+        for timestamp, mint, holders, wealthy in scans:
+            self.update(mint, holders, wealthy, now=timestamp)
+        logger.info(f"Imported {len(scans)} scans")
+        return len(scans)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-token holder co-occurrence index")
+    parser.add_argument("--path", default=None, help="index directory (default: COOCCURRENCE_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("info")
+    import_parser = commands.add_parser("import")
+    import_parser.add_argument("directories", nargs="+")
+    top_parser = commands.add_parser("top")
+    top_parser.add_argument("-k", type=int, default=20)
+    top_parser.add_argument("--min-tokens", type=int, default=2)
+    top_parser.add_argument("--early", action="store_true", help="count first-scan holders only")
+    top_parser.add_argument("--wealthy", action="store_true", help="count tokens where the wallet was a whale")
+    common_parser = commands.add_parser("common")
+    common_parser.add_argument("mints", nargs="+")
+    common_parser.add_argument("--early", action="store_true")
+    args = parser.parse_args()
+
+    index = CoOccurrenceIndex(args.path)
+    if args.command == "import":
+        index.import_files(args.directories)
+    elif args.command == "top":
+        kind = "wealthy" if args.wealthy else "early" if args.early else "seen"
+        for address, tokens in index.top_wallets(args.k, args.min_tokens, kind):
+            print(f"{tokens:>5}  {address}")
+    elif args.command == "common":
+        for address in index.common_wallets(args.mints, "early" if args.early else "seen"):
+            print(address)
+    print(f"{index.path}: {len(index)} mints, {index.wallets} wallets, {index.nbytes() / 1e6:.1f} MB of ids and keys")
+
+
+if __name__ == "__main__":
+    main()
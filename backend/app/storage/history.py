@@ -0,0 +1,287 @@
+"""Append-only columnar store of per-token market history.
+
+Every column is a fixed-width binary file that is memory-mapped with NumPy,
+token addresses are mapped to integer ids by a symbol dictionary. Appending
+a snapshot writes one row per token; reads return zero-copy array views.
+
+Maintenance from backend/app:
+    python -m storage.history info
+    python -m storage.history import ../data/clean
+    python -m storage.history compact --retention-days 30
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from glob import glob
+import numpy as np
+from utils.config import settings
+from utils.snapshots import SNAPSHOT_EXTENSION, iter_snapshot
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WINDOWS = ("m5", "h1", "h6", "h24")
+
+COLUMNS = (
+    [("ts", "<i8"), ("token", "<i4"), ("price", "<f8")]
+    + [(f"change_{w}", "<f4") for w in WINDOWS]
+    + [(f"volume_{w}", "<f8") for w in WINDOWS]
+    + [("liquidity", "<f8"), ("fdv", "<f8")]
+    + [(f"{side}_{w}", "<i4") for w in WINDOWS for side in ("buys", "sells")]
+)
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def extract_row(token):
+    """Column values of one enriched DexScreener token, token id excluded"""
+    change = token.get("priceChange") or {}
+    volume = token.get("volume") or {}
+    txns = token.get("txns") or {}
+    row = {"price": _float(token.get("priceUsd"))}
+    for w in WINDOWS:
+        row[f"change_{w}"] = _float(change.get(w))
+        row[f"volume_{w}"] = _float(volume.get(w))
+        row[f"buys_{w}"] = _int((txns.get(w) or {}).get("buys"))
+        row[f"sells_{w}"] = _int((txns.get(w) or {}).get("sells"))
+    row["liquidity"] = _float((token.get("liquidity") or {}).get("usd"))
+    row["fdv"] = _float(token.get("fdv"))
+    return row
+
+
+class PriceHistoryStore:
+    def __init__(self, path=None, initial_capacity=4096):
+        self.path = path or settings.HISTORY_PATH
+        self.columns_path = os.path.join(self.path, "columns")
+        self.meta_path = os.path.join(self.path, "meta.json")
+        self.symbols_path = os.path.join(self.path, "symbols.tsv")
+        os.makedirs(self.columns_path, exist_ok=True)
+
+        self.rows = 0
+        self.capacity = initial_capacity
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r") as f:
+                meta = json.load(f)
+            self.rows, self.capacity = meta["rows"], meta["capacity"]
+
+        self.token_ids = {}
+        self.addresses = []
+        self.symbols = []
+        self._load_symbols()
+        self._columns = {}
+        self._open_columns()
+        # Appends run in worker threads while readers are on the event loop: growing and
+        # compacting remap the columns, readers hold the lock while they use the views
+        self.lock = threading.RLock()
+
+    # Symbol dictionary
+
+    def _load_symbols(self):
+        if not os.path.exists(self.symbols_path):
+            return
+        with open(self.symbols_path, "r") as f:
+            for line in f:
+                token_id, address, symbol = line.rstrip("\n").split("\t")
+                self.token_ids[address] = int(token_id)
+                self.addresses.append(address)
+                self.symbols.append(symbol)
+
+    def token_id(self, address, symbol=""):
+        token_id = self.token_ids.get(address)
+        if token_id is None:
+            token_id = len(self.addresses)
+            self.token_ids[address] = token_id
+            self.addresses.append(address)
+            self.symbols.append(symbol or "")
+            with open(self.symbols_path, "a") as f:
+                f.write(f"{token_id}\t{address}\t{(symbol or '').replace(chr(9), ' ')}\n")
+        return token_id
+
+    # Column files
+
+    def _column_file(self, name):
+        return os.path.join(self.columns_path, f"{name}.bin")
+
+    def _open_columns(self):
+        for name, dtype in COLUMNS:
+            filename = self._column_file(name)
+            size = self.capacity * np.dtype(dtype).itemsize
+            if not os.path.exists(filename) or os.path.getsize(filename) < size:
+                with open(filename, "ab") as f:
+                    f.truncate(size)
+            self._columns[name] = np.memmap(filename, dtype=dtype, mode="r+", shape=(self.capacity,))
+
+    def _grow(self, needed):
+        self.flush()
+        self.capacity = max(self.capacity * 2, needed)
+        self._columns.clear()
+        self._open_columns()
+
+    def _write_meta(self):
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"rows": self.rows, "capacity": self.capacity,
+                       "columns": [name for name, _ in COLUMNS]}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def flush(self):
+        for column in self._columns.values():
+            column.flush()
+
+    # Writes
+
+    def append_snapshot(self, timestamp, tokens):
+        """Appends one row per priced token. `timestamp` is epoch seconds or a datetime."""
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.timestamp()
+        with self.lock:
+            return self._append(timestamp, tokens)
+
+    def _append(self, timestamp, tokens):
+        rows = []
+        for token in tokens:
+            address = token.get("tokenAddress") or (token.get("baseToken") or {}).get("address")
+            if not address or token.get("priceUsd") is None:
+                continue
+            row = extract_row(token)
+            row["token"] = self.token_id(address, (token.get("baseToken") or {}).get("symbol"))
+            rows.append(row)
+        if not rows:
+            return 0
+
+        start, end = self.rows, self.rows + len(rows)
+        if end > self.capacity:
+            self._grow(end)
+        self._columns["ts"][start:end] = int(timestamp)
+        for name, dtype in COLUMNS[1:]:
+            self._columns[name][start:end] = np.fromiter((row[name] for row in rows), dtype=dtype, count=len(rows))
+        self.flush()
+        self.rows = end
+        self._write_meta()
+        return len(rows)
+
+    # Reads
+
+    @property
+    def last_timestamp(self):
+        return int(self._columns["ts"][self.rows - 1]) if self.rows else None
+
+    def column(self, name, start=0, end=None):
+        """Zero-copy view of rows [start, end) of one column"""
+        end = self.rows if end is None else min(end, self.rows)
+        return self._columns[name][start:end]
+
+    def time_range(self, since=None, until=None):
+        """Row bounds covering [since, until), rows are ordered by timestamp"""
+        ts = self.column("ts")
+        start = 0 if since is None else int(np.searchsorted(ts, since, side="left"))
+        end = self.rows if until is None else int(np.searchsorted(ts, until, side="left"))
+        return start, end
+
+    def series(self, address, columns=None, since=None):
+        """Arrays of one token's history, oldest first"""
+        token_id = self.token_ids.get(address)
+        names = columns or [name for name, _ in COLUMNS]
+        if token_id is None:
+            return {name: np.empty(0, dtype=dict(COLUMNS)[name]) for name in names}
+        start, end = self.time_range(since)
+        mask = self.column("token", start, end) == token_id
+        return {name: self.column(name, start, end)[mask] for name in names}
+
+    # Maintenance
+
+    def compact(self, retention=None):
+        """Drops rows older than `retention` seconds, restores time order and
+        trims the column files to their used size"""
+        with self.lock:
+            return self._compact(retention)
+
+    def _compact(self, retention):
+        ts = np.array(self.column("ts"))
+        keep = np.ones(self.rows, dtype=bool) if retention is None else ts >= time.time() - retention
+        order = np.flatnonzero(keep)
+        order = order[np.argsort(ts[order], kind="stable")]
+
+        data = {name: np.array(self.column(name))[order] for name, _ in COLUMNS}
+        self._columns.clear()
+        for name, dtype in COLUMNS:
+            tmp_path = f"{self._column_file(name)}.tmp"
+            data[name].astype(dtype).tofile(tmp_path)
+            os.replace(tmp_path, self._column_file(name))
+
+        dropped = self.rows - len(order)
+        self.rows = self.capacity = len(order)
+        if self.capacity == 0:
+            self.capacity = 1
+        self._open_columns()
+        self._write_meta()
+        logger.info(f"Compacted history: {self.rows} rows kept, {dropped} dropped")
+        return dropped
+
+    def import_snapshots(self, directories):
+        """Imports existing data_YYYYmmdd_HHMMSS.json snapshot files"""
+        files = []
+        for directory in directories:
+            files.extend(glob(os.path.join(directory, "data_*.json")))
+            files.extend(glob(os.path.join(directory, f"data_*{SNAPSHOT_EXTENSION}")))
+        files.sort(key=os.path.basename)
+
+        last_ts = int(self.column("ts")[-1]) if self.rows else None
+        out_of_order = False
+        imported = 0
+        for filename in files:
+            stamp = os.path.basename(filename)[len("data_"):].split(".json")[0]
+            try:
+                timestamp = datetime.strptime(stamp, "%Y%m%d_%H%M%S").timestamp()
+                imported += self.append_snapshot(timestamp, iter_snapshot(filename))
+            except (ValueError, OSError) as e:
+                logger.warning(f"Skipping {filename}: {e}")
+                continue
+            if last_ts is not None and timestamp < last_ts:
+                out_of_order = True
+            last_ts = max(last_ts or timestamp, timestamp)
+
+        if out_of_order:
+            self.compact()
+        logger.info(f"Imported {imported} rows from {len(files)} snapshot files")
+        return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Price history store maintenance")
+    parser.add_argument("--path", default=None, help="store directory (default: HISTORY_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("info")
+    import_parser = commands.add_parser("import")
+    import_parser.add_argument("directories", nargs="+")
+    compact_parser = commands.add_parser("compact")
+    compact_parser.add_argument("--retention-days", type=float, default=None)
+    args = parser.parse_args()
+
+    store = PriceHistoryStore(args.path)
+    if args.command == "import":
+        store.import_snapshots(args.directories)
+    elif args.command == "compact":
+        store.compact(args.retention_days * 86400 if args.retention_days else None)
+    print(f"{store.path}: {store.rows} rows, {len(store.addresses)} tokens, capacity {store.capacity}")
+
+
+if __name__ == "__main__":
+    main()
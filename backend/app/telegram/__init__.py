@@ -1 +1,6 @@
-from .bot import WhaleAlertBot
\ No newline at end of file
+# aiogram is imported on first use of the bot, not with the package
+def __getattr__(name):
+    if name != "WhaleAlertBot":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from .bot import WhaleAlertBot
+    return WhaleAlertBot
@@ -0,0 +1,227 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter
+from utils.config import settings
+from utils.metrics import metrics
+from utils.ratelimit import TokenBucket
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DIGEST_LINES = 10
+
+ALERT_LATENCY = metrics.histogram("alert_send_seconds", "Time from queueing an alert to Telegram accepting it",
+                                  buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300))
+QUEUE_DEPTH = metrics.gauge("queue_depth", "Items waiting in an internal queue", ["queue"])
+
+
+@dataclass
+class _Outgoing:
+    priority: float             # lower is sent first, -USD amount for whale alerts
+    chat_id: str
+    text: str
+    seq: int
+    not_before: float = 0.0
+    attempts: int = 0
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _Digest:
+    key: str
+    events: list = field(default_factory=list)
+
+
+def _short(address):
+    return f"{address[:4]}…{address[-4:]}" if len(address) > 12 else address
+
+
+class AlertDispatcher:
+    """Outbound queue for Telegram alerts.
+
+    Whale moves on the same token within `window` seconds are coalesced into
+    one digest. Messages are sent largest first within Telegram's flood
+    limits: a global bucket of `global_rate` messages/second plus one bucket
+    per chat. A `retry_after` from Telegram pauses that chat's bucket and the
+    message is re-queued; other failures are retried `max_attempts` times.
+    """
+
+    def __init__(self, bot, chat_ids=None, window=None, global_rate=None, chat_rate=None,
+                 chats_path=None, max_attempts=3, concurrency=4):
+        self.bot = bot
+        self.window = window if window is not None else settings.ALERT_COALESCE_WINDOW
+        global_rate = global_rate or settings.TELEGRAM_GLOBAL_RPS
+        self.global_bucket = TokenBucket(global_rate, min_rate=global_rate)
+        self.chat_rate = chat_rate or settings.TELEGRAM_CHAT_RPS
+        self.chats_path = chats_path if chats_path is not None else settings.ALERT_CHATS_PATH
+        self.max_attempts = max_attempts
+        self.chat_ids = set(str(chat_id) for chat_id in (chat_ids or settings.ALERT_CHAT_IDS))
+        self._load_chats()
+        self._chat_buckets = {}
+        self._digests = {}
+        self._outbox = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._sending = set()
+        self.stats = {"events": 0, "digests": 0, "sent": 0, "retried": 0, "throttled": 0, "failed": 0}
+        QUEUE_DEPTH.labels("alerts").set_function(self.pending)
+
+    # Chats
+
+    def _load_chats(self):
+        if not self.chats_path or not os.path.exists(self.chats_path):
+            return
+        try:
+            with open(self.chats_path, "r") as f:
+                self.chat_ids.update(str(chat_id) for chat_id in json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load alert chats from {self.chats_path}: {e}")
+
+    def _save_chats(self):
+        if not self.chats_path:
+            return
+        os.makedirs(os.path.dirname(self.chats_path) or ".", exist_ok=True)
+        with open(self.chats_path, "w") as f:
+            json.dump(sorted(self.chat_ids), f)
+
+    def subscribe_chat(self, chat_id):
+        self.chat_ids.add(str(chat_id))
+        self._save_chats()
+
+    def unsubscribe_chat(self, chat_id):
+        self.chat_ids.discard(str(chat_id))
+        self._save_chats()
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=1, min_rate=self.chat_rate)
+        return bucket
+
+    # Producers
+
+    def submit(self, event):
+        """Queues a whale event for alerting, never waits on the network"""
+        self.stats["events"] += 1
+        key = event.tokens[-1] if event.tokens else event.address
+        digest = self._digests.get(key)
+        if digest is None:
+            digest = self._digests[key] = _Digest(key)
+            asyncio.get_running_loop().call_later(self.window, self._close_digest, key)
+        digest.events.append(event)
+
+    def send_text(self, text, chat_ids=None, priority=float("-inf")):
+        """Queues a plain message, by default ahead of every whale alert"""
+        for chat_id in chat_ids or self.chat_ids:
+            self._enqueue(_Outgoing(priority, str(chat_id), text, next(self._seq)))
+
+    def _enqueue(self, item):
+        self._outbox.append(item)
+        self._wakeup.set()
+
+    def _close_digest(self, key):
+        digest = self._digests.pop(key, None)
+        if digest is None or not digest.events:
+            return
+        self.stats["digests"] += 1
+        text = self.format_digest(digest)
+        largest = max(event.amount_usd for event in digest.events)
+        for chat_id in self.chat_ids:
+            self._enqueue(_Outgoing(-largest, chat_id, text, next(self._seq)))
+
+    def format_digest(self, digest):
+        events = sorted(digest.events, key=lambda event: event.amount_usd, reverse=True)
+        if len(events) == 1:
+            event = events[0]
+            return (
+                f"🐋 Whale Transaction Detected!\n\n"
+                f"Wallet: `{event.address}`\n"
+                f"Amount: ${event.amount_usd:,.2f} ({event.change / 1e9:+,.2f} SOL)\n"
+                f"Token: `{digest.key}`\n"
+                f"Time: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.received_at))}"
+            )
+        total = sum(event.amount_usd for event in events)
+        wallets = len({event.address for event in events})
+        lines = [f"🐋 {len(events)} whale moves by {wallets} wallets on `{digest.key}` "
+                 f"in {self.window:g}s, ${total:,.2f} in total\n"]
+        for event in events[:DIGEST_LINES]:
+            lines.append(f"`{_short(event.address)}` {event.change / 1e9:+,.2f} SOL (${event.amount_usd:,.2f})")
+        if len(events) > DIGEST_LINES:
+            lines.append(f"…and {len(events) - DIGEST_LINES} more")
+        return "\n".join(lines)
+
+    # Sender
+
+    def _next_ready(self, now):
+        """Highest-priority message whose chat may send now, else the shortest wait"""
+        best, wait = None, None
+        for item in self._outbox:
+            delay = max(item.not_before - now, self._chat_bucket(item.chat_id).delay(now))
+            if delay <= 0:
+                if best is None or (item.priority, item.seq) < (best.priority, best.seq):
+                    best = item
+            elif wait is None or delay < wait:
+                wait = delay
+        return best, wait
+
+    async def _send(self, item):
+        try:
+            await self.bot.send_message(chat_id=item.chat_id, text=item.text, parse_mode=ParseMode.MARKDOWN)
+            self.stats["sent"] += 1
+            ALERT_LATENCY.observe(time.monotonic() - item.queued_at)
+        except TelegramRetryAfter as e:
+            self.stats["throttled"] += 1
+            self._chat_bucket(item.chat_id).on_throttle(e.retry_after)
+            logger.warning(f"Telegram flood limit for chat {item.chat_id}, retrying in {e.retry_after}s")
+            self._enqueue(item)
+        except TelegramForbiddenError as e:
+            self.stats["failed"] += 1
+            logger.warning(f"Chat {item.chat_id} blocked the bot, unsubscribing: {e}")
+            self.unsubscribe_chat(item.chat_id)
+        except (TelegramAPIError, TelegramNetworkError, asyncio.TimeoutError) as e:
+            item.attempts += 1
+            if item.attempts >= self.max_attempts:
+                self.stats["failed"] += 1
+                logger.error(f"Dropping alert for chat {item.chat_id} after {item.attempts} attempts: {e}")
+                return
+            self.stats["retried"] += 1
+            item.not_before = time.monotonic() + 2 ** item.attempts
+            self._enqueue(item)
+        finally:
+            self._semaphore.release()
+
+    async def run(self):
+        try:
+            while True:
+                now = time.monotonic()
+                item, wait = self._next_ready(now)
+                global_delay = self.global_bucket.delay(now)
+                if item is None or global_delay > 0:
+                    self._wakeup.clear()
+                    timeout = global_delay if item is not None else wait
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self._semaphore.acquire()
+                self._outbox.remove(item)
+                self.global_bucket.consume()
+                self._chat_bucket(item.chat_id).consume()
+                task = asyncio.create_task(self._send(item))
+                self._sending.add(task)
+                task.add_done_callback(self._sending.discard)
+        finally:
+            for task in list(self._sending):
+                task.cancel()
+
+    def pending(self):
+        return len(self._outbox) + sum(len(digest.events) for digest in self._digests.values())
@@ -1,19 +1,23 @@
 import os
 import logging
 import asyncio
+from datetime import datetime
 from aiogram import Bot, Dispatcher, types, Router
-from aiogram.enums import ParseMode
 from aiogram.filters import Command
 from utils.config import settings
+from utils.slogger import setup_queue_logging
+from parcing.registry import WhaleRegistry
 from parcing.subscription import WhaleSubscription
+from parcing.valuation import PriceTable
+from telegram.alerts import AlertDispatcher
+from utils.http_client import HttpClient
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-# Initialize bot and dispatcher
-bot = Bot(token=settings.BOT_TOKEN)
+# Initialize dispatcher; the Bot is created in main() so importing this module needs no token
 dp = Dispatcher()
 router = Router()
 
@@ -21,8 +25,15 @@ router = Router()
 ADMIN_USER_ID = "1234567890"  # Replace this with your actual Telegram ID
 
 class WhaleAlertBot:
-    def __init__(self):
-        self.whale_subscription = WhaleSubscription()
+    def __init__(self, bot, whale_subscription, alerts=None):
+        self.bot = bot
+        # Follows the registry log of the process role, or shares the orchestrator's registry
+        self.whale_subscription = whale_subscription
+        self.registry = whale_subscription.registry
+        self.price_table = whale_subscription.price_table
+        # Alerts are queued, coalesced and sent within Telegram's flood limits,
+        # to the admin and the ALERT_CHAT_IDS chats
+        self.alerts = alerts or AlertDispatcher(bot, chat_ids=[ADMIN_USER_ID, *settings.ALERT_CHAT_IDS])
         
     async def start_monitoring(self):
         """Start monitoring whale transactions and send alerts"""
@@ -30,39 +41,25 @@ class WhaleAlertBot:
             while True:
                 async with self.whale_subscription.subscribe_to_transactions() as subscription:
                     async for transaction in subscription:
+                        if self.price_table is not None:
+                            await self.price_table.ensure_fresh()
                         await self.process_transaction(transaction)
         except Exception as e:
             logger.error(f"Error in whale monitoring: {e}")
             await self.send_admin_alert(f"🚨 Monitoring error: {str(e)}")
 
     async def process_transaction(self, transaction):
-        """Process incoming whale transactions and send alerts"""
+        """Queue an alert for an incoming WhaleEvent if it is big enough"""
         try:
-            amount = transaction.get('amount', 0)
-            wallet = transaction.get('wallet', 'Unknown')
-            
-            if amount >= settings.ALERT_AMOUNT:
-                message = (
-                    f"🐋 Whale Transaction Detected!\n\n"
-                    f"Wallet: `{wallet}`\n"
-                    f"Amount: ${amount:,.2f}\n"
-                    f"Time: {transaction.get('timestamp', 'Unknown')}"
-                )
-                await self.send_admin_alert(message)
-                
+            # No change: the first notification of a whale without a baseline balance
+            if transaction.change and transaction.amount_usd >= settings.ALERT_AMOUNT:
+                self.alerts.submit(transaction)
         except Exception as e:
             logger.error(f"Error processing transaction: {e}")
 
     async def send_admin_alert(self, message):
         """Send alert to admin user"""
-        try:
-            await bot.send_message(
-                chat_id=ADMIN_USER_ID,
-                text=message,
-                parse_mode=ParseMode.MARKDOWN
-            )
-        except Exception as e:
-            logger.error(f"Failed to send admin alert: {e}")
+        self.alerts.send_text(message, chat_ids=[ADMIN_USER_ID])
 
 @router.message(Command("start"))
 async def start_command(message: types.Message):
@@ -76,34 +73,91 @@ async def start_command(message: types.Message):
         await message.reply("⚠️ This bot is for admin use only.")
 
 @router.message(Command("status")) 
-async def status_command(message: types.Message):
+async def status_command(message: types.Message, whale_registry: WhaleRegistry, alerts: AlertDispatcher):
     """Handle /status command"""
     if str(message.from_user.id) == ADMIN_USER_ID:
-        subscription = WhaleSubscription()
-        whale_count = len(subscription.wealthy_holders)
+        whale_count = len(whale_registry)
         await message.reply(
             f"📊 Current Status:\n"
             f"Monitoring {whale_count} whale addresses\n"
-            f"Alert threshold: ${settings.ALERT_AMOUNT:,.2f}"
+            f"Alert threshold: ${settings.ALERT_AMOUNT:,.2f}\n"
+            f"Alert chats: {len(alerts.chat_ids)}, queued alerts: {alerts.pending()}"
         )
     else:
         await message.reply("⚠️ This command is for admin use only.")
 
-async def main():
-    """Main function to start the bot"""
-    whale_bot = WhaleAlertBot()
+@router.message(Command("stats"))
+async def stats_command(message: types.Message, http: HttpClient):
+    """Handle /stats command: a summary of the pipeline metrics"""
+    if str(message.from_user.id) == ADMIN_USER_ID:
+        # The pipeline runs in another process, its metrics come from the /metrics server there
+        url = f"http://{settings.METRICS_HOST}:{settings.METRICS_PORT}/metrics/summary"
+        try:
+            async with http.session.get(url) as response:
+                response.raise_for_status()
+                lines = (await response.text()).splitlines() or ["No metrics recorded yet"]
+        except Exception as e:
+            logger.error(f"Could not fetch pipeline metrics from {url}: {e}")
+            lines = [f"Pipeline metrics unavailable at {url}"]
+        await message.reply("📈 Pipeline stats:\n" + "\n".join(lines))
+    else:
+        await message.reply("⚠️ This command is for admin use only.")
+
+@router.message(Command("subscribe"))
+async def subscribe_command(message: types.Message, alerts: AlertDispatcher):
+    """Handle /subscribe command: send whale alerts to this chat"""
+    if str(message.from_user.id) == ADMIN_USER_ID:
+        alerts.subscribe_chat(message.chat.id)
+        await message.reply("🔔 Whale alerts will be sent to this chat.")
+    else:
+        await message.reply("⚠️ This command is for admin use only.")
+
+@router.message(Command("unsubscribe"))
+async def unsubscribe_command(message: types.Message, alerts: AlertDispatcher):
+    """Handle /unsubscribe command: stop whale alerts in this chat"""
+    if str(message.from_user.id) == ADMIN_USER_ID:
+        alerts.unsubscribe_chat(message.chat.id)
+        await message.reply("🔕 Whale alerts stopped for this chat.")
+    else:
+        await message.reply("⚠️ This command is for admin use only.")
+
+async def run_bot(whale_subscription, http, handle_signals=True):
+    """Runs the bot on `whale_subscription` until cancelled.
+
+    The orchestrator passes its own subscription, so the bot alerts on the
+    whales the pipeline finds; the bot role passes one following the registry log.
+    Inside another service `handle_signals` is off, its owner handles shutdown.
+    """
+    bot = Bot(token=settings.BOT_TOKEN)
+    whale_bot = WhaleAlertBot(bot, whale_subscription)
     
-    # Include router
+    # Include router; handlers receive the live registry and the alert dispatcher
     dp.include_router(router)
+    dp["whale_registry"] = whale_bot.registry
+    dp["alerts"] = whale_bot.alerts
+    dp["http"] = http
     
-    # Start monitoring in background
-    asyncio.create_task(whale_bot.start_monitoring())
+    # Start monitoring and alert delivery in background
+    tasks = [asyncio.create_task(whale_bot.start_monitoring()), asyncio.create_task(whale_bot.alerts.run())]
     
     # Start the bot
     try:
-        await dp.start_polling(bot)
+        await dp.start_polling(bot, handle_signals=handle_signals)
     finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         await bot.session.close()
 
+async def main():
+    """Standalone bot role: follows the registry log the process role writes"""
+    if settings.LOG_QUEUE:
+        setup_queue_logging(settings.LOG_FLUSH_INTERVAL)
+    async with HttpClient() as http:
+        # Whale events are valued in USD with live SOL prices
+        price_table = PriceTable(http)
+        await price_table.ensure_fresh()
+        await run_bot(WhaleSubscription.following(http, price_table), http)
+
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
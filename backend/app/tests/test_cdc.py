@@ -0,0 +1,112 @@
+from parcing.cdc import SnapshotIndex, parse_thresholds
+import pytest
+
+
+def token(address, price=1.0, liquidity=1000.0, boost=100):
+    return {"tokenAddress": address, "priceUsd": str(price), "liquidity": {"usd": liquidity},
+            "volume": {"h1": 10.0}, "totalAmount": boost}
+
+
+def index(**kwargs):
+    options = {"thresholds": {"price": 0.02, "liquidity": 0.05, "boost": 0.1},
+               "refresh_age": 600, "remove_age": 300, "enrich_age": 300}
+    options.update(kwargs)
+    return SnapshotIndex(**options)
+
+
+def test_first_snapshot_inserts_every_token():
+    changes = index().diff([token("a"), token("b")], now=1000)
+    assert [t["tokenAddress"] for t in changes.inserted] == ["a", "b"]
+    assert changes.updated == [] and changes.removed == [] and changes.unchanged == 0
+
+
+def test_duplicates_within_a_snapshot_count_once():
+    changes = index().diff([token("a"), token("a", price=2.0)], now=1000)
+    assert len(changes.inserted) == 1 and changes.seen == 1
+
+
+def test_only_material_moves_are_updates():
+    cdc = index()
+    cdc.diff([token("a"), token("b"), token("c")], now=1000)
+    changes = cdc.diff([token("a", price=1.01), token("b", price=1.05), token("c")], now=1010)
+    assert [t["tokenAddress"] for t in changes.updated] == ["b"]
+    assert changes.unchanged == 2
+    assert changes.churn == pytest.approx(1 / 3)
+
+
+def test_small_moves_accumulate_against_the_last_emitted_version():
+    cdc = index()
+    cdc.diff([token("a", price=1.0)], now=1000)
+    assert not cdc.diff([token("a", price=1.015)], now=1010).updated
+    # 1.03 is 1.5% above the previous snapshot, but 3% above the version handed on
+    assert cdc.diff([token("a", price=1.03)], now=1020).updated
+
+
+def test_unchanged_tokens_are_refreshed():
+    cdc = index(refresh_age=60)
+    cdc.diff([token("a")], now=1000)
+    assert cdc.diff([token("a")], now=1030).unchanged == 1
+    assert cdc.diff([token("a")], now=1060).updated
+
+
+def test_tokens_missing_for_remove_age_are_removed():
+    cdc = index(remove_age=300)
+    cdc.diff([token("a"), token("b")], now=1000)
+    assert cdc.diff([token("a")], now=1200).removed == []
+    changes = cdc.diff([token("a")], now=1301)
+    assert changes.removed == ["b"]
+    assert len(cdc) == 1 and "b" not in cdc.raw
+    # A removed token that comes back is new again
+    assert cdc.diff([token("a"), token("b")], now=1310).inserted[0]["tokenAddress"] == "b"
+
+
+def test_superseded_excludes_tokens_still_pumped():
+    cdc = index(remove_age=10)
+    cdc.diff([token("a"), token("b"), token("c")], now=1000)
+    changes = cdc.diff([token("a", price=2.0), token("b", price=2.0)], now=1020)
+    assert changes.removed == ["c"]
+    assert changes.superseded([{"contract": "a"}]) == {"b", "c"}
+    assert changes.superseded(None) == {"a", "b", "c"}
+
+
+def test_select_skips_unchanged_feed_items_until_enrich_age():
+    cdc = index(enrich_age=300)
+    raw = {"tokenAddress": "a", "amount": 100}
+
+    tracker = cdc.begin(now=1000)
+    assert tracker.select(raw) and not tracker.select(raw)
+    tracker.feed(token("a"))
+    tracker.finish()
+
+    tracker = cdc.begin(now=1100)
+    assert not tracker.select(raw)
+    assert tracker.select({"tokenAddress": "b"})
+    assert tracker.finish().unchanged == 1
+
+    tracker = cdc.begin(now=1150)
+    assert tracker.select({"tokenAddress": "a", "amount": 200})
+    tracker.feed(token("a"))
+    tracker.finish()
+
+    tracker = cdc.begin(now=1500)
+    assert tracker.select({"tokenAddress": "a", "amount": 200})
+
+
+def test_skipped_items_count_as_seen():
+    cdc = index(enrich_age=300, remove_age=100)
+    raw = {"tokenAddress": "a", "amount": 100}
+    tracker = cdc.begin(now=1000)
+    tracker.select(raw)
+    tracker.feed(token("a"))
+    tracker.finish()
+    for now in (1080, 1160, 1240):
+        tracker = cdc.begin(now=now)
+        assert not tracker.select(raw)
+        changes = tracker.finish()
+        assert changes.unchanged == 1 and changes.removed == []
+
+
+def test_parse_thresholds_rejects_unknown_metrics():
+    assert parse_thresholds("price=0.02, boost=0.1") == {"price": 0.02, "boost": 0.1}
+    with pytest.raises(ValueError):
+        parse_thresholds("mcap=0.1")
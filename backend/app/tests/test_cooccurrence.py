@@ -0,0 +1,52 @@
+import os
+import numpy as np
+import pytest
+from storage.cooccurrence import KEY_SIZE, decode_pubkey, decode_pubkeys, encode_pubkey
+
+
+def random_keys(count, seed=7):
+    rng = np.random.default_rng(seed)
+    keys = [rng.bytes(KEY_SIZE) for _ in range(count)]
+    # Leading zero bytes encode as leading "1"s and give short addresses
+    keys += [b"\0" + os.urandom(KEY_SIZE - 1), b"\0\0\0" + os.urandom(KEY_SIZE - 3),
+             b"\0" * KEY_SIZE, b"\xff" * KEY_SIZE]
+    return keys
+
+
+def test_encode_decode_round_trip():
+    for key in random_keys(200):
+        address = encode_pubkey(key)
+        assert decode_pubkey(address) == key
+
+
+def test_vectorized_decode_matches_decode_pubkey():
+    keys = random_keys(500)
+    addresses = [encode_pubkey(key) for key in keys]
+    decoded, valid = decode_pubkeys(addresses)
+    assert decoded.shape == (len(keys), KEY_SIZE) and decoded.dtype == np.uint8
+    assert valid.all()
+    assert [row.tobytes() for row in decoded] == keys
+    assert [encode_pubkey(row.tobytes()) for row in decoded] == addresses
+
+
+def test_vectorized_decode_flags_invalid_addresses():
+    good = encode_pubkey(b"\x01" * KEY_SIZE)
+    addresses = [good, "", "0OIl" + good[4:], good[:20], "z" * 44, encode_pubkey(b"\xff" * KEY_SIZE) + "1", good]
+    decoded, valid = decode_pubkeys(addresses)
+    assert valid.tolist() == [True, False, False, False, False, False, True]
+    assert decoded[0].tobytes() == decoded[-1].tobytes() == b"\x01" * KEY_SIZE
+    for address in addresses[1:-1]:
+        with pytest.raises(ValueError):
+            decode_pubkey(address)
+
+
+def test_vectorized_decode_falls_back_on_non_ascii():
+    good = encode_pubkey(b"\x02" * KEY_SIZE)
+    decoded, valid = decode_pubkeys([good, "é" * 40])
+    assert valid.tolist() == [True, False]
+    assert decoded[0].tobytes() == b"\x02" * KEY_SIZE
+
+
+def test_decode_of_nothing():
+    decoded, valid = decode_pubkeys([])
+    assert decoded.shape == (0, KEY_SIZE) and valid.shape == (0,)
@@ -0,0 +1,86 @@
+from parcing.job_queue import SqliteJobQueue
+import pytest
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SqliteJobQueue(str(tmp_path / "queue.sqlite"), lease_seconds=60, max_attempts=3, retry_base=10,
+                           partitions=4)
+    yield queue
+    queue.close()
+
+
+def test_enqueue_keeps_one_live_job_per_mint(queue):
+    assert queue.enqueue("mint-a", {"rank": 5}, priority=5, now=1000)
+    assert not queue.enqueue("mint-a", {"rank": 2}, priority=2, now=1001)
+    assert not queue.enqueue("mint-a", {"rank": 9}, priority=9, now=1002)
+    assert queue.counts()["queued"] == 1
+    job = queue.lease("w1", now=1003)
+    # The duplicate kept the most urgent priority and the newest payload
+    assert job.mint == "mint-a" and job.payload == {"rank": 9}
+    assert not queue.enqueue("mint-a", now=1004)
+
+
+def test_enqueue_again_once_the_job_finished(queue):
+    queue.enqueue("mint-a", now=1000)
+    job = queue.lease("w1", now=1001)
+    assert queue.complete(job, {"whales": []}, holders=10, now=1002)
+    assert queue.enqueue("mint-a", now=1003)
+    assert queue.claim_results() == [{"job_id": job.id, "mint": "mint-a", "result": {"whales": []},
+                                      "holders": 10, "worker": "w1"}]
+    assert queue.claim_results() == []
+
+
+def test_lease_order_follows_priority(queue):
+    queue.enqueue("low", priority=3, now=1000)
+    queue.enqueue("high", priority=1, now=1000)
+    assert queue.lease("w1", now=1001).mint == "high"
+    assert queue.lease("w1", now=1001).mint == "low"
+    assert queue.lease("w1", now=1001) is None
+
+
+def test_expired_lease_is_taken_over(queue):
+    queue.enqueue("mint-a", now=1000)
+    job = queue.lease("w1", now=1000)
+    assert queue.lease("w2", now=1059) is None
+    assert queue.heartbeat(job, now=1030)
+    assert queue.lease("w2", now=1080) is None
+
+    taken = queue.lease("w2", now=1091)
+    assert taken.id == job.id and taken.attempts == 2 and taken.lease_owner == "w2"
+    # The first worker lost its lease and cannot publish
+    assert not queue.heartbeat(job, now=1092)
+    assert not queue.complete(job, {}, now=1092)
+    assert queue.complete(taken, {}, now=1093)
+
+
+def test_lease_expiring_max_attempts_times_fails_the_job(queue):
+    queue.enqueue("mint-a", now=1000)
+    now = 1000
+    for attempt in range(1, 4):
+        job = queue.lease(f"w{attempt}", now=now)
+        assert job.attempts == attempt
+        now += 61
+    assert queue.lease("w4", now=now) is None
+    assert queue.counts()["failed"] == 1
+
+
+def test_fail_backs_off_then_gives_up(queue):
+    queue.enqueue("mint-a", now=1000)
+    job = queue.lease("w1", now=1000)
+    assert queue.fail(job, "rpc error", now=1000) == "queued"
+    assert queue.lease("w1", now=1005) is None
+    job = queue.lease("w1", now=1013)
+    assert job.attempts == 2
+    queue.fail(job, "rpc error", now=1013)
+    job = queue.lease("w1", now=1040)
+    assert queue.fail(job, "rpc error", now=1040) == "failed"
+
+
+def test_cancel_stops_leased_jobs_at_the_next_heartbeat(queue):
+    queue.enqueue("mint-a", now=1000)
+    queue.enqueue("mint-b", now=1000)
+    job = queue.lease("w1", preferred=(), now=1000)
+    assert queue.cancel([job.mint, "mint-b"], now=1001) == 2
+    assert not queue.heartbeat(job, now=1002)
+    assert queue.live_mints() == set()
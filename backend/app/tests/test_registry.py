@@ -0,0 +1,87 @@
+import json
+from parcing.registry import WhaleRegistry
+
+
+def registry(path, ttl=3600):
+    return WhaleRegistry(path=str(path), ttl=ttl, legacy_dir="")
+
+
+def test_replay_restores_whales_and_metadata(tmp_path):
+    path = tmp_path / "whales.jsonl"
+    whales = registry(path)
+    whales.record({"w1": 50000.0, "w2": 8000.0}, mint="mint-a", now=1000)
+    whales.record(["w1"], mint="mint-b", now=1100)
+    whales.record(["w3"], now=1200)
+    whales.remove(["w2"])
+    whales.flush()
+
+    replayed = registry(path)
+    assert set(replayed) == {"w1", "w3"}
+    record = replayed.get("w1")
+    assert (record.first_seen, record.last_seen, record.valuation) == (1000, 1100, 50000.0)
+    assert replayed.tokens_of("w1") == ["mint-a", "mint-b"]
+    assert replayed.tokens_of("w3") == []
+
+
+def test_replay_skips_a_torn_last_line(tmp_path):
+    path = tmp_path / "whales.jsonl"
+    whales = registry(path)
+    whales.record(["w1"], now=1000)
+    whales.flush()
+    with open(path, "a") as f:
+        f.write('["+","w2",10')
+    assert set(registry(path)) == {"w1"}
+
+
+def test_compaction_keeps_one_line_per_live_whale(tmp_path):
+    path = tmp_path / "whales.jsonl"
+    whales = registry(path)
+    for now in range(1000, 1010):
+        whales.record({"w1": float(now)}, mint="mint-a", now=now)
+    whales.record(["w2", "w3"], mint="mint-b", now=1010)
+    whales.remove(["w3"])
+    whales.flush()
+    assert whales.snapshot_stats()["log_lines"] == 13
+
+    whales.compact()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert sorted(line[1] for line in lines) == ["w1", "w2"]
+    assert all(line[0] == "=" for line in lines)
+    assert whales.snapshot_stats()["log_lines"] == 2
+
+    replayed = registry(path)
+    assert set(replayed) == {"w1", "w2"}
+    assert replayed.get("w1").valuation == 1009.0
+    assert (replayed.get("w1").first_seen, replayed.get("w1").last_seen) == (1000, 1009)
+    assert replayed.tokens_of("w2") == ["mint-b"]
+
+
+def test_refresh_follows_appends_and_compaction(tmp_path):
+    path = tmp_path / "whales.jsonl"
+    writer = registry(path)
+    writer.record(["w1", "w2"], now=1000)
+    writer.flush()
+    follower = registry(path)
+    events = []
+    follower.add_listener(lambda added, removed: events.append((sorted(added), sorted(removed))))
+
+    writer.record(["w3"], now=1100)
+    writer.flush()
+    assert follower.refresh() == (["w3"], [])
+
+    writer.remove(["w1"])
+    writer.flush()
+    writer.compact()
+    added, removed = follower.refresh()
+    assert (added, removed) == ([], ["w1"])
+    assert set(follower) == {"w2", "w3"}
+    assert events == [(["w3"], []), ([], ["w1"])]
+    assert follower.refresh() == ([], [])
+
+
+def test_expire_drops_whales_past_the_ttl(tmp_path):
+    whales = registry(tmp_path / "whales.jsonl", ttl=100)
+    whales.record(["w1"], now=1000)
+    whales.record(["w2"], now=1050)
+    assert whales.expire(now=1120) == ["w1"]
+    assert set(whales) == {"w2"}
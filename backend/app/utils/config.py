@@ -1,30 +1,230 @@
-import os 
-from dotenv import load_dotenv
+import os
+
+# backend/, holding .env and data/; relative paths in settings resolve against it,
+# whatever the working directory
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+
+class ConfigError(ValueError):
+    """A setting is missing or cannot be parsed"""
+
+
+def flag(value):
+    return value.lower() in ("1", "true", "yes")
+
+
+def csv(value):
+    return [item for item in value.split(',') if item]
+
+
+def path(value):
+    # An empty path stays empty, it keeps a store in memory only
+    return os.path.join(BACKEND_DIR, value) if value else value
+
+
+class Setting:
+    """One environment variable, read, converted and cached on first access.
+
+    `default` may be a callable taking the settings, for defaults derived
+    from other settings.
+    """
+
+    def __init__(self, cast=str, default=None):
+        self.cast = cast
+        self.default = default
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance._read(self)
+        # Cached on the instance, which also lets callers override a setting by assignment
+        instance.__dict__[self.name] = value
+        return value
+
+
+env = Setting
 
-# Загружаем переменные из .env
-load_dotenv("/Users/masterpo/Desktop/TheThinker/backend/.env")
 
 class Settings():
+    """Application settings from the environment and the .env file.
+
+    Nothing is read at import: the .env file is loaded and every setting is
+    parsed on first access, so a process only pays for (and only fails on)
+    the settings it uses. `validate` checks a set of settings up front.
+    """
+
+    def __init__(self, env_file=None):
+        # ENV_FILE overrides the default backend/.env
+        self.env_file = env_file or os.getenv("ENV_FILE") or os.path.join(BACKEND_DIR, ".env")
+        self._env_loaded = False
+
+    def _load_env(self):
+        if not self._env_loaded:
+            self._env_loaded = True
+            if os.path.exists(self.env_file):
+                from dotenv import load_dotenv
+                load_dotenv(self.env_file)
+
+    def _read(self, setting):
+        self._load_env()
+        raw = os.getenv(setting.name)
+        if raw is None:
+            default = setting.default(self) if callable(setting.default) else setting.default
+            if default is None:
+                return None
+            raw = default
+        try:
+            return setting.cast(raw)
+        except (TypeError, ValueError) as e:
+            raise ConfigError(f"{setting.name}={raw!r} is not a valid {setting.cast.__name__}: {e}") from None
+
+    @classmethod
+    def names(cls):
+        return [name for name, value in vars(cls).items() if isinstance(value, Setting)]
+
+    def validate(self, required=()):
+        """Parses every setting and checks that the `required` ones are set.
+
+        Raises one ConfigError listing every problem, so a process fails at
+        startup instead of on first use.
+        """
+        errors = []
+        for name in self.names():
+            try:
+                value = getattr(self, name)
+            except ConfigError as e:
+                errors.append(str(e))
+                continue
+            if name in required and value in (None, "", []):
+                errors.append(f"{name} is not set (environment or {self.env_file})")
+        if errors:
+            raise ConfigError("Invalid configuration:\n  " + "\n  ".join(dict.fromkeys(errors)))
+        return self
+
     # DexScreener
-    DEX_URL: str = os.getenv("DEX_URL")
-    ENDPOINTS: list = os.getenv("ENDPOINTS", "").split(',')
+    DEX_URL: str = env(str)
+    ENDPOINTS: list = env(csv, "")
+    ENRICH_CONCURRENCY: int = env(int, 4)
+    COLLECT_INTERVAL: float = env(float, 900)
+    # Per-feed poll intervals, "token-boosts/latest/v1=30,token-profiles/latest/v1=60"; other feeds use COLLECT_INTERVAL.
+    # Busy feeds are polled down to COLLECT_MIN_INTERVAL, every poll is jittered by +-COLLECT_JITTER
+    ENDPOINT_INTERVALS: str = env(str, "")
+    COLLECT_MIN_INTERVAL: float = env(float, 15)
+    COLLECT_JITTER: float = env(float, 0.1)
+    # Change data capture: feed items are only enriched when new or changed, unchanged ones every CDC_ENRICH_AGE
+    # seconds. Of the enriched tokens only those whose key metrics moved by these fractions go on to pump
+    # detection, unchanged ones every CDC_REFRESH_AGE seconds; tokens unseen for CDC_REMOVE_AGE seconds are removed
+    CDC_THRESHOLDS: str = env(str, "price=0.02,liquidity=0.05,volume=0.25,boost=0.1")
+    CDC_REFRESH_AGE: float = env(float, 3600)
+    CDC_ENRICH_AGE: float = env(float, 300)
+    CDC_REMOVE_AGE: float = env(float, lambda settings: 3 * settings.COLLECT_INTERVAL)
+
+    # Pipeline: "pipeline" passes snapshots in memory, "watchdog" hands them over as files
+    PIPELINE_MODE: str = env(str, "pipeline")
+    PIPELINE_QUEUE_SIZE: int = env(int, 4)
+    PERSIST_SNAPSHOTS: bool = env(flag, "true")
+
+    # Filepaths; relative ones, here and below, are relative to backend/
+    RAW_DATA_FILEPATH: str = env(path, "data/raw")
+    CLEAN_DATA_FILEPATH: str = env(path, "data/clean")
+    PUMPED_DATA_FILEPATH: str = env(path, "data/pumped")
+    HISTORY_PATH: str = env(path, "data/history")
 
-    # Filepaths
-    RAW_DATA_FILEPATH: str = os.getenv("RAW_DATA_FILEPATH")
-    CLEAN_DATA_FILEPATH: str = os.getenv("CLEAN_DATA_FILEPATH")
+    # Pump detection over the history store, see parcing/momentum.py.
+    # Weights per window return (m5, h1, h6, h24) and for volume, liquidity and imbalance
+    MOMENTUM_WEIGHTS: str = env(str, "m5=1,h1=1,h6=0.5,h24=0.25,volume=0.25,liquidity=0.25,imbalance=0.5")
+    MOMENTUM_MIN_SCORE: float = env(float, 0.5)
+    MOMENTUM_MIN_LIQUIDITY: float = env(float, 5000)
+    MOMENTUM_MIN_VOLUME_H1: float = env(float, 1000)
+    MOMENTUM_TOP_N: int = env(int, 50)
 
     # WhaleTracker
-    MIN_INVESTMENT: int = os.getenv("MIN_INVESTMENT")
-    ALERT_AMOUNT: int = os.getenv("ALERT_AMOUNT")
-    SOLANA_RPC: str = os.getenv("SOLANA_RPC")
-    WHALE_DATA_PATH = "/Users/masterpo/Desktop/TheThinker/backend/data/whales"
+    MIN_INVESTMENT: int = env(str)
+    # Whale balance moves worth at least this many USD are alerted
+    ALERT_AMOUNT: float = env(float, 10000)
+    SOLANA_RPC: str = env(str)
+    # Per-analysis whale reports, also read once to seed a new registry
+    WHALE_DATA_PATH: str = env(path, "data/whales")
+    WHALE_REGISTRY_PATH: str = env(path, "data/whales/registry.jsonl")
+    WHALE_TTL: float = env(float, 7 * 86400)
+    # How often a subscribe-only process (main.py subscribe) re-reads the registry log
+    REGISTRY_REFRESH_INTERVAL: float = env(float, 5)
+
+    HELIUS_API_KEY: str = env(str)
+    HELIUS_URL: str = env(str)
+    HELIUS_RPS: float = env(float, 10)
+    HELIUS_MAX_RPS: float = env(float, 50)
+    HELIUS_WS_URL: str = env(str)
+    WS_SUBSCRIPTIONS_PER_CONNECTION: int = env(int, 1000)
+    WS_SUBSCRIBE_RPS: float = env(float, 200)
+    # Whale event stream: per-consumer buffer size and overflow policy (block, drop_oldest, coalesce)
+    EVENT_QUEUE_SIZE: int = env(int, 1000)
+    EVENT_OVERFLOW: str = env(str, "drop_oldest")
+    EVENT_DEDUP_SIZE: int = env(int, 4096)
+    MIN_WHALE_BALANCE_USD: float = env(float)
+
+    # Valuation: SOL plus these SPL mints are priced every cycle (USDC, USDT, JUP, BONK, WIF, mSOL, jitoSOL)
+    PRICE_MINTS: list = env(
+        csv,
+        "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v,Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB,"
+        "JUPyiwrYJFskUPiHa7hkeR8VUtAeFoSYbKedZNsDvCN,DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263,"
+        "EKpQGSJtjMFqKZ9KQanSqYXRcF8fBopzLHYxdM65zcjm,mSoLzYCxHdYgdzU16g5QSh3i5K3z3KZK7ytfqcJm7So,"
+        "J1toso1uCk3RLmjorhTtrVwY9HJ7X8V9yYac6Y7kGCPn"
+    )
+    PRICE_REFRESH_INTERVAL: float = env(float, 600)
+    SOL_PRICE_FALLBACK: float = env(float, 171.5)
+    ANALYSIS_CONCURRENCY: int = env(int, 3)
+    BALANCE_CACHE_TTL: float = env(float, 1800)
+    BALANCE_CACHE_SIZE: int = env(int, 200000)
+    BALANCE_CACHE_PATH: str = env(path)
+    # Whale analysis results stay fresh for ANALYSIS_TTL seconds unless the price moves by
+    # ANALYSIS_PRICE_CHANGE; an expired one is only re-valued if its holder scan finds
+    # ANALYSIS_HOLDER_CHANGE of the holders new. Results are indexed in ANALYSIS_INDEX_PATH
+    ANALYSIS_TTL: float = env(float, 3600)
+    ANALYSIS_PRICE_CHANGE: float = env(float, 0.5)
+    ANALYSIS_HOLDER_CHANGE: float = env(float, 0.25)
+    ANALYSIS_INDEX_PATH: str = env(path, "data/analysis_index.json")
+    # With ANALYSIS_WORKERS > 0 (or main.py --workers N) analyses run in worker processes fed by
+    # a SQLite job queue; leases expire after JOB_LEASE_SECONDS without a heartbeat, failed jobs
+    # are retried JOB_MAX_ATTEMPTS times with backoff from JOB_RETRY_BASE seconds
+    ANALYSIS_WORKERS: int = env(int, 0)
+    ANALYSIS_QUEUE_PATH: str = env(path, "data/analysis_queue.sqlite3")
+    JOB_LEASE_SECONDS: float = env(float, 120)
+    JOB_MAX_ATTEMPTS: int = env(int, 4)
+    JOB_RETRY_BASE: float = env(float, 30)
+    JOB_PARTITIONS: int = env(int, 16)
+    MAX_HOLDERS: int = env(int, 10000)
+    HOLDER_INDEX_PATH: str = env(path, "data/holders")
+    HOLDER_INDEX_MAX_AGE: float = env(float, 6 * 3600)
+    # Early holders, holders and whales of every analyzed mint, for cross-token queries
+    COOCCURRENCE_PATH: str = env(path, "data/cooccurrence")
+    # Only holders with at least this fraction of the supply get their wallet valued (0 values everyone)
+    HOLDER_MIN_POSITION_SHARE: float = env(float, 0.0001)
+    # Concentration metrics: supply share of the top N holders and wallets above this share
+    CONCENTRATION_TOP_N: str = env(str, "10,50")
+    CONCENTRATION_WALLET_SHARE: float = env(float, 0.01)
+
+    # Log records are written by a background thread, summaries flushed every LOG_FLUSH_INTERVAL seconds
+    LOG_QUEUE: bool = env(flag, "true")
+    LOG_FLUSH_INTERVAL: float = env(float, 5)
 
-    HELIUS_API_KEY: str = os.getenv("HELIUS_API_KEY")
-    HELIUS_URL: str = os.getenv("HELIUS_URL")
-    MIN_WHALE_BALANCE_USD: float = float(os.getenv("MIN_WHALE_BALANCE_USD"))
+    # Prometheus /metrics endpoint, port 0 turns it off
+    METRICS_HOST: str = env(str, "127.0.0.1")
+    METRICS_PORT: int = env(int, 9108)
 
     # Telegram bot API
-    BOT_TOKEN: str = os.getenv("BOT_TOKEN")
+    BOT_TOKEN: str = env(str)
+    # Alerts go to these chats plus the ones that sent /subscribe (stored in ALERT_CHATS_PATH)
+    ALERT_CHAT_IDS: list = env(csv, "")
+    ALERT_CHATS_PATH: str = env(path, "data/alert_chats.json")
+    ALERT_COALESCE_WINDOW: float = env(float, 10)
+    # Telegram allows about 30 messages/second overall and 1/second per chat
+    TELEGRAM_GLOBAL_RPS: float = env(float, 25)
+    TELEGRAM_CHAT_RPS: float = env(float, 1)
 
 
 settings = Settings()
@@ -0,0 +1,51 @@
+import aiohttp
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    """One pooled aiohttp session shared by every DexScreener and Helius caller.
+
+    Connections are kept alive and reused per host, DNS lookups are cached and
+    every request gets the same timeouts. Create one per process (the
+    Orchestrator owns it) and call `close()` on shutdown.
+    """
+
+    def __init__(self, limit=100, limit_per_host=20, keepalive_timeout=60,
+                 dns_cache_ttl=300, total_timeout=30, connect_timeout=10):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Created lazily so the client can be constructed outside a running loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.debug("HTTP client closed")
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -0,0 +1,286 @@
+import bisect
+import logging
+import math
+import time
+from aiohttp import web
+from utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from a fast local call to a slow paginated RPC
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set_function(self, function):
+        """Reads the value from `function()` at scrape time, e.g. a queue size"""
+        self.function = function
+
+    def get(self):
+        if self.function is None:
+            return self.value
+        try:
+            return self.function()
+        except Exception:
+            return math.nan
+
+
+class _Timer:
+    __slots__ = ("child", "started")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Child for one combination of label values, cached after the first call"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.value += amount
+
+    def total(self):
+        return sum(child.value for child in self._children.values())
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield "_total", values, (), child.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default.value = value
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+    def get(self):
+        return self._default.get()
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield "", values, (), child.get()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), child.counts):
+                cumulative += count
+                yield "_bucket", values, (("le", _format_value(bound)),), cumulative
+            yield "_sum", values, (), child.sum
+            yield "_count", values, (), child.count
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and histograms.
+
+    Recording is an attribute update on a cached child object, so metrics
+    stay on under load; formatting only happens when /metrics is scraped or
+    a summary is asked for.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self.started = time.time()
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in list(self._metrics.values())) + "\n"
+
+    def summary(self):
+        """One human-readable line per metric and label set"""
+        uptime = max(time.time() - self.started, 1e-9)
+        lines = []
+        for metric in list(self._metrics.values()):
+            for values, child in list(metric._children.items()):
+                label = metric.name + (f"[{','.join(map(str, values))}]" if values else "")
+                if isinstance(metric, Counter):
+                    if child.value:
+                        lines.append(f"{label}: {child.value:,.0f} ({child.value / uptime:.2f}/s)")
+                elif isinstance(metric, Gauge):
+                    lines.append(f"{label}: {child.get():,.2f}")
+                elif child.count:
+                    lines.append(f"{label}: n={child.count:,} avg={child.sum / child.count * 1000:.1f}ms")
+        return lines
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsServer:
+    """Serves `GET /metrics` for Prometheus on a local port, and the summary at `/metrics/summary`"""
+
+    def __init__(self, registry=None, host=None, port=None):
+        self.registry = registry or metrics
+        self.host = host or settings.METRICS_HOST
+        self.port = port if port is not None else settings.METRICS_PORT
+        self._runner = None
+
+    async def handle(self, request):
+        return web.Response(body=self.registry.render().encode(),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    async def handle_summary(self, request):
+        return web.Response(text="\n".join(self.registry.summary()))
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        app.router.add_get("/metrics/summary", self.handle_summary)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"Metrics served on http://{self.host}:{self.port}/metrics")
+        return self
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import defaultdict
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+LIMITER_REQUESTS = metrics.gauge("rpc_limiter_requests", "RPC calls granted, delayed or throttled by a rate limiter",
+                                 ["limiter", "outcome"])
+LIMITER_RATE = metrics.gauge("rpc_limiter_rate", "Current AIMD rate of an RPC method in requests/second",
+                             ["limiter", "endpoint", "method"])
+_limiter_ids = itertools.count(1)
+
+# Priority lanes, lower value is served first
+PRIORITY_LIVE = 0   # live-alert lookups
+PRIORITY_BULK = 1   # holder scans and other background work
+
+
+class TokenBucket:
+    """Token bucket whose refill rate is tuned with AIMD.
+
+    Every success adds `increase` requests/second up to `max_rate`, every 429
+    multiplies the rate by `decrease` down to `min_rate`. A `Retry-After`
+    pauses the bucket completely until it expires.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=1.0, max_rate=None, increase=0.5, decrease=0.5):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or self.rate * 4
+        self.increase = increase
+        self.decrease = decrease
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now, cost=1):
+        """Seconds until `cost` tokens are available.
+
+        A cost above the capacity waits for a full bucket and leaves it in
+        debt, which later requests pay off.
+        """
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        needed = min(cost, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def consume(self, cost=1):
+        self.tokens -= cost
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.tokens = min(self.tokens, 0.0)
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+class _Lane:
+    """Waiters for one endpoint, ordered by (priority, arrival)"""
+
+    def __init__(self):
+        self.condition = asyncio.Condition()
+        self.waiters = []
+
+
+class RateLimiter:
+    """Shared limiter for all RPC traffic.
+
+    Each request needs a token from its endpoint bucket and from its
+    (endpoint, method) bucket, a JSON-RPC batch one per call it carries.
+    Waiting requests are served by priority, so PRIORITY_LIVE lookups
+    overtake queued PRIORITY_BULK scans.
+    """
+
+    def __init__(self, rate=10, burst=None, min_rate=1.0, max_rate=None, method_rates=None, name=None):
+        # Metrics label; limiters without a name are numbered
+        self.name = name or f"limiter{next(_limiter_ids)}"
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.method_rates = method_rates or {}
+        self._endpoint_buckets = {}
+        self._method_buckets = {}
+        self._lanes = {}
+        self._seq = itertools.count()
+        self.stats = defaultdict(int)
+        for outcome in ("granted", "delayed", "throttled"):
+            LIMITER_REQUESTS.labels(self.name, outcome).set_function(lambda outcome=outcome: self.stats[outcome])
+
+    def _buckets(self, endpoint, method):
+        if endpoint not in self._endpoint_buckets:
+            self._endpoint_buckets[endpoint] = TokenBucket(
+                self.rate, self.burst, self.min_rate, self.max_rate
+            )
+        key = (endpoint, method)
+        if key not in self._method_buckets:
+            rate = self.method_rates.get(method, self.rate)
+            bucket = self._method_buckets[key] = TokenBucket(rate, None, self.min_rate, self.max_rate)
+            LIMITER_RATE.labels(self.name, endpoint, method).set_function(lambda: bucket.rate)
+        return self._endpoint_buckets[endpoint], self._method_buckets[key]
+
+    def _lane(self, endpoint):
+        if endpoint not in self._lanes:
+            self._lanes[endpoint] = _Lane()
+        return self._lanes[endpoint]
+
+    async def acquire(self, endpoint, method, priority=PRIORITY_BULK, cost=1):
+        lane = self._lane(endpoint)
+        buckets = self._buckets(endpoint, method)
+        ticket = [priority, next(self._seq)]
+        waited = False
+
+        async with lane.condition:
+            heapq.heappush(lane.waiters, ticket)
+            # A newcomer may outrank the current head, let it re-check
+            lane.condition.notify_all()
+            try:
+                while True:
+                    if lane.waiters[0] is ticket:
+                        now = time.monotonic()
+                        delay = max(bucket.delay(now, cost) for bucket in buckets)
+                        if delay <= 0:
+                            for bucket in buckets:
+                                bucket.consume(cost)
+                            self.stats["granted"] += cost
+                            self.stats[f"granted:{method}"] += cost
+                            if waited:
+                                self.stats["delayed"] += 1
+                            return
+                        waited = True
+                        try:
+                            await asyncio.wait_for(lane.condition.wait(), delay)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        waited = True
+                        await lane.condition.wait()
+            finally:
+                if ticket in lane.waiters:
+                    lane.waiters.remove(ticket)
+                    heapq.heapify(lane.waiters)
+                lane.condition.notify_all()
+
+    def on_response(self, endpoint, method, status, retry_after=None):
+        """Feeds the response status back into the AIMD controller"""
+        buckets = self._buckets(endpoint, method)
+        if status == 429:
+            self.stats["throttled"] += 1
+            self.stats[f"throttled:{method}"] += 1
+            for bucket in buckets:
+                bucket.on_throttle(retry_after)
+            logger.warning(
+                f"RPC throttled on {method}, rate lowered to {buckets[1].rate:.1f}/s"
+                + (f", paused for {retry_after}s" if retry_after else "")
+            )
+        elif status < 400:
+            for bucket in buckets:
+                bucket.on_success()
+
+    def current_rate(self, endpoint, method):
+        return self._buckets(endpoint, method)[1].rate
+
+
+def parse_retry_after(value):
+    """Retry-After in seconds; HTTP-date values are ignored"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import time
+from urllib.parse import urlsplit
+from utils.config import settings
+from utils.http_client import HttpClient
+from utils.metrics import metrics
+from utils.ratelimit import RateLimiter, PRIORITY_BULK, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+RPC_LATENCY = metrics.histogram("rpc_request_seconds", "Helius JSON-RPC request latency", ["method"])
+RPC_THROTTLED = metrics.counter("rpc_throttled", "Helius responses with HTTP 429", ["method"])
+
+
+def helius_rpc_url():
+    """HELIUS_URL with the API key appended, e.g. https://mainnet.helius-rpc.com/?api-key=<key>"""
+    return f"{settings.HELIUS_URL}{settings.HELIUS_API_KEY or ''}"
+
+
+class SolanaRPC:
+    """JSON-RPC client for Helius. Every call goes through the shared RateLimiter."""
+
+    def __init__(self, url, http=None, limiter=None, max_retries=3):
+        self.url = url
+        self.http = http or HttpClient()
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        # Bucket per host, the API key in the query string is not part of it
+        self.endpoint = urlsplit(url).netloc or url
+
+    async def _post(self, method, payload, priority, cost=1):
+        latency = RPC_LATENCY.labels(method)
+        for attempt in range(self.max_retries):
+            await self.limiter.acquire(self.endpoint, method, priority, cost)
+            try:
+                started = time.perf_counter()
+                async with self.http.session.post(self.url, json=payload) as response:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    self.limiter.on_response(self.endpoint, method, response.status, retry_after)
+                    if response.status == 200:
+                        data = await response.json()
+                        latency.observe(time.perf_counter() - started)
+                        return data
+                    elif response.status == 429:
+                        RPC_THROTTLED.labels(method).inc()
+                        continue
+                    else:
+                        logger.error(f"{method} failed with status code {response.status}")
+                        return None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error calling {method} (attempt {attempt + 1}/{self.max_retries}): {e}")
+        return None
+
+    async def call(self, method, params, priority=PRIORITY_BULK, request_id="helius"):
+        """Returns the decoded JSON-RPC response, or None if every attempt failed"""
+        payload = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": method,
+            "params": params
+        }
+        return await self._post(method, payload, priority)
+
+    async def call_batch(self, method, params_list, priority=PRIORITY_BULK):
+        """Sends one JSON-RPC batch array, returns the responses in request order.
+
+        The batch takes one limiter token per call, Helius counts each of
+        them. Calls that failed or are missing from the reply come back as None.
+        """
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, params in enumerate(params_list)
+        ]
+        data = await self._post(method, payload, priority, cost=len(payload))
+        responses = [None] * len(params_list)
+        if isinstance(data, list):
+            for item in data:
+                request_id = item.get("id")
+                if isinstance(request_id, int) and 0 <= request_id < len(responses):
+                    responses[request_id] = item
+        return responses
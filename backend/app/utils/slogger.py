@@ -1,68 +1,202 @@
 from collections import defaultdict
+import atexit
 import logging
-import asyncio
+import queue
+import threading
+import time
+import weakref
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from typing import Dict, List
 
+_loggers = weakref.WeakSet()
+_listener = None
+_flusher = None
+
+
 class SmartLogger:
-    def __init__(self, name: str, batch_size: int = 10, flush_interval: int = 30):
+    """Batches log lines into periodic summaries.
+
+    `info`/`warning`/`debug` collect messages and emit them as one batch
+    summary every `batch_size` messages or `flush_interval` seconds.
+    `event` is for hot loops: it only counts occurrences per key and keeps a
+    first and last sample, which are emitted as one summary line per key.
+
+    Nothing here needs an event loop. Buffers are flushed on the next call
+    once the interval has passed, and by the background flusher started by
+    `setup_queue_logging`.
+    """
+
+    def __init__(self, name: str, batch_size: int = 10, flush_interval: int = 30, aggregate: bool = True):
         self.logger = logging.getLogger(name)
         self.batch_size = batch_size
         self.flush_interval = flush_interval
-        
+        # With aggregate=False every event is logged on its own, as before
+        self.aggregate = aggregate
+
         # Separate buffers for different log levels
         self.buffers: Dict[str, List[str]] = defaultdict(list)
         self.counts: Dict[str, int] = defaultdict(int)
-        
-        # Start background flush task
-        asyncio.create_task(self._periodic_flush())
-    
-    async def _periodic_flush(self):
-        while True:
-            await asyncio.sleep(self.flush_interval)
-            await self.flush_all()
-    
+        # event key -> [level, calls, total, first sample, last sample, since]
+        self.events: Dict[str, list] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        _loggers.add(self)
+
     def _format_batch(self, level: str) -> str:
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         messages = self.buffers[level]
         count = self.counts[level]
-        
+
         if not messages:
             return ""
-            
+
         header = f"\n{'='*20} {level} Batch Summary ({count} events) {'='*20}"
         footer = f"{'='*70}\n"
-        
+
         return f"{header}\n{timestamp}\n" + "\n".join(messages) + f"\n{footer}"
-    
-    async def flush_all(self):
-        for level in self.buffers.keys():
-            if self.buffers[level]:
-                batch_message = self._format_batch(level)
-                if batch_message:
-                    getattr(self.logger, level.lower())(batch_message)
-                self.buffers[level].clear()
-                self.counts[level] = 0
-    
-    async def _log(self, level: str, message: str):
-        self.buffers[level].append(message)
-        self.counts[level] += 1
-        
-        if len(self.buffers[level]) >= self.batch_size:
-            batch_message = self._format_batch(level)
-            getattr(self.logger, level.lower())(batch_message)
-            self.buffers[level].clear()
-            self.counts[level] = 0
-    
-    async def info(self, message: str):
-        await self._log("INFO", message)
-    
-    async def warning(self, message: str):
-        await self._log("WARNING", message)
-    
-    async def error(self, message: str):
+
+    def _emit_batch(self, level: str):
+        batch_message = self._format_batch(level)
+        self.buffers[level].clear()
+        self.counts[level] = 0
+        if batch_message:
+            self.logger.log(getattr(logging, level), batch_message)
+
+    def _emit_events(self, now):
+        events, self.events = self.events, {}
+        for key, (level, calls, total, first, last, since) in events.items():
+            if first is None:
+                samples = ""
+            elif last == first:
+                samples = f" (sample: {first})"
+            else:
+                samples = f" (first: {first}, last: {last})"
+            counted = f"{total} in {calls} calls" if total != calls else f"{calls} times"
+            self.logger.log(level, f"{key}: {counted} over {now - since:.1f}s{samples}")
+
+    def flush_all(self):
+        with self._lock:
+            for level in list(self.buffers.keys()):
+                if self.buffers[level]:
+                    self._emit_batch(level)
+            now = time.monotonic()
+            self._emit_events(now)
+            self._last_flush = now
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush_all()
+
+    def _log(self, level: str, message: str):
+        if not self.logger.isEnabledFor(getattr(logging, level)):
+            return
+        if not self.aggregate:
+            self.logger.log(getattr(logging, level), message)
+            return
+        with self._lock:
+            self.buffers[level].append(message)
+            self.counts[level] += 1
+
+            if len(self.buffers[level]) >= self.batch_size:
+                self._emit_batch(level)
+        self._maybe_flush()
+
+    def event(self, key: str, count: int = 1, sample=None, level: int = logging.INFO):
+        """Counts a repetitive event; one summary line per key is logged at flush time"""
+        if not self.logger.isEnabledFor(level):
+            return
+        if not self.aggregate:
+            self.logger.log(level, f"{key}: {count}" + (f" ({sample})" if sample is not None else ""))
+            return
+        with self._lock:
+            entry = self.events.get(key)
+            if entry is None:
+                self.events[key] = [level, 1, count, sample, sample, time.monotonic()]
+            else:
+                entry[1] += 1
+                entry[2] += count
+                if sample is not None:
+                    if entry[3] is None:
+                        entry[3] = sample
+                    entry[4] = sample
+        self._maybe_flush()
+
+    def info(self, message: str):
+        self._log("INFO", message)
+
+    def warning(self, message: str):
+        self._log("WARNING", message)
+
+    def error(self, message: str):
         # Errors are logged immediately
         self.logger.error(message)
-    
-    async def debug(self, message: str):
-        await self._log("DEBUG", message)
\ No newline at end of file
+
+    def debug(self, message: str):
+        self._log("DEBUG", message)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Puts the record on the queue as it is, formatting happens on the writer thread"""
+
+    def prepare(self, record):
+        return record
+
+
+def _flush_loggers(interval, stop):
+    while not stop.wait(interval):
+        for smart_logger in list(_loggers):
+            smart_logger._maybe_flush()
+
+
+def flush_loggers():
+    for smart_logger in list(_loggers):
+        smart_logger.flush_all()
+
+
+def setup_queue_logging(flush_interval=5.0):
+    """Moves the root handlers behind a queue served by a writer thread.
+
+    Logging calls then only enqueue the record; formatting and I/O happen on
+    the listener thread. Also starts a thread that flushes SmartLogger
+    summaries whose interval has passed. Safe to call more than once.
+    """
+    global _listener, _flusher
+    if _listener is not None:
+        return _listener
+
+    root = logging.getLogger()
+    handlers = [handler for handler in root.handlers if not isinstance(handler, QueueHandler)]
+    if not handlers:
+        handlers = [logging.StreamHandler()]
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    records = queue.SimpleQueue()
+    root.addHandler(_DeferredQueueHandler(records))
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    stop = threading.Event()
+    _flusher = (threading.Thread(target=_flush_loggers, args=(flush_interval, stop), name="slogger-flush",
+                                 daemon=True), stop)
+    _flusher[0].start()
+    atexit.register(stop_queue_logging)
+    return _listener
+
+
+def stop_queue_logging():
+    """Flushes pending summaries and records, then restores the original handlers"""
+    global _listener, _flusher
+    if _listener is None:
+        return
+    _flusher[1].set()
+    flush_loggers()
+    _listener.stop()
+
+    root = logging.getLogger()
+    for handler in [handler for handler in root.handlers if isinstance(handler, QueueHandler)]:
+        root.removeHandler(handler)
+    for handler in _listener.handlers:
+        root.addHandler(handler)
+    _listener = _flusher = None
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import os
+
+# New snapshots are newline-delimited JSON, one token per line
+SNAPSHOT_EXTENSION = ".jsonl"
+
+
+class SnapshotWriter:
+    """Writes a snapshot one token at a time as newline-delimited JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._tmp_path = f"{path}.tmp"
+        self._file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self._tmp_path, "w")
+        return self
+
+    def write(self, token):
+        self._file.write(json.dumps(token, separators=(",", ":")))
+        self._file.write("\n")
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        if exc_type is None:
+            # Only complete snapshots become visible, watchers never see half a file
+            os.replace(self._tmp_path, self.path)
+        else:
+            os.remove(self._tmp_path)
+
+
+def write_snapshot(path, tokens):
+    with SnapshotWriter(path) as writer:
+        for token in tokens:
+            writer.write(token)
+    return writer.count
+
+
+def _iter_json_array(f, chunk_size):
+    """Incrementally decodes the elements of a top-level JSON array"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Not a JSON array")
+    pos = 1
+    eof = False
+
+    while True:
+        # Skip separators between elements
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            if pos >= len(buffer):
+                raise json.JSONDecodeError("Need more data", buffer, pos)
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Drop what was consumed and read more
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+
+
+def iter_snapshot(path, chunk_size=1 << 16):
+    """Yields the tokens of a snapshot file without loading it whole.
+
+    Reads newline-delimited snapshots and the older indented JSON array
+    files alike; memory is bounded by the largest single token.
+    """
+    with open(path, "r") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            yield from _iter_json_array(f, chunk_size)
+            return
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+async def aiter_snapshot(path, batch_size=500):
+    """Async generator over a snapshot, parsing batches of tokens in a worker thread"""
+    iterator = iter_snapshot(path)
+
+    def next_batch():
+        batch = []
+        for token in iterator:
+            batch.append(token)
+            if len(batch) >= batch_size:
+                break
+        return batch
+
+    while True:
+        batch = await asyncio.to_thread(next_batch)
+        if not batch:
+            return
+        for token in batch:
+            yield token